@@ -0,0 +1,164 @@
+"""
+Synthetic data for the benchmarks: documents in CSV, JSON, NDJSON and parquet,
+a markdown content tree referencing DOIs, and fake Zotero and Crossref
+responses. The generators are deterministic for a given seed.
+"""
+
+import json
+import random
+import string
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# Number of rows serialized at once when writing JSON files
+JSON_WRITE_BATCH_SIZE = 10_000
+
+# Characters of the suffix of the synthetic DOIs
+DOI_CHARS = string.ascii_lowercase + string.digits
+
+
+def synthetic_table(rows: int, seed: int = 0) -> pa.Table:
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(1000)]
+    return pa.table(
+        {
+            "id": pa.array(range(rows), pa.int64()),
+            "title": [" ".join(rng.choices(words, k=6)) for _ in range(rows)],
+            "description": [" ".join(rng.choices(words, k=40)) for _ in range(rows)],
+            "score": [
+                rng.random() if rng.random() > 0.1 else None for _ in range(rows)
+            ],
+            "count": [rng.randrange(10_000) for _ in range(rows)],
+            "published": [rng.random() > 0.5 for _ in range(rows)],
+            "category": pa.array(rng.choices(words[:20], k=rows)).dictionary_encode(),
+        }
+    )
+
+
+def write_documents(table: pa.Table, path: Path, format: str) -> Path:
+    """
+    Write a table as a CSV, JSON array, NDJSON or parquet file.
+
+    Args:
+      format: csv, json, ndjson or parquet.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if format == "parquet":
+        pq.write_table(table, path)
+    elif format == "csv":
+        pv.write_csv(
+            table.set_column(
+                table.schema.get_field_index("category"),
+                "category",
+                table["category"].cast(pa.string()),
+            ),
+            path,
+        )
+    elif format in ("json", "ndjson"):
+        with open(path, "w") as f:
+            separator = ",\n" if format == "json" else "\n"
+            if format == "json":
+                f.write("[\n")
+            first = True
+            for batch in table.to_batches(max_chunksize=JSON_WRITE_BATCH_SIZE):
+                for row in batch.to_pylist():
+                    if not first:
+                        f.write(separator)
+                    f.write(json.dumps(row))
+                    first = False
+            f.write("\n]\n" if format == "json" else "\n")
+    else:
+        raise ValueError(f"Unknown format: {format}")
+    return path
+
+
+def synthetic_dois(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"10.{rng.randrange(1000, 99999)}/{''.join(rng.choices(DOI_CHARS, k=10))}"
+        for _ in range(count)
+    ]
+
+
+def write_content_tree(
+    root: Path,
+    files: int,
+    dois: List[str],
+    refs_per_file: int = 5,
+    dois_per_ref: int = 3,
+    seed: int = 0,
+) -> Path:
+    """
+    Write a tree of markdown files with a front matter and `:ref{dois=...}`
+    tags citing `dois`, spread over nested directories.
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=7)) for _ in range(500)]
+    for position in range(files):
+        directory = root / f"section-{position % 10}" / f"part-{position % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+        paragraphs = []
+        for _ in range(refs_per_file):
+            text = " ".join(rng.choices(words, k=80))
+            refs = ",".join(rng.sample(dois, min(dois_per_ref, len(dois))))
+            paragraphs.append(f'{text} :ref{{dois="{refs}"}}')
+        content = (
+            f"---\ntitle: Page {position}\ndescription: "
+            f"{' '.join(rng.choices(words, k=10))}\n---\n\n"
+            + "\n\n".join(paragraphs)
+            + "\n"
+        )
+        (directory / f"page-{position}.md").write_text(content)
+    return root
+
+
+def crossref_record(doi: str) -> Dict[str, Any]:
+    """Crossref `/works/{doi}` response of a journal article."""
+    suffix = doi.rsplit("/", 1)[-1]
+    return {
+        "status": "ok",
+        "message-type": "work",
+        "message": {
+            "DOI": doi,
+            "type": "journal-article",
+            "title": [f"A study of {suffix}"],
+            "container-title": ["Journal of Synthetic Data"],
+            "volume": "12",
+            "issue": "3",
+            "page": "100-120",
+            "published": {"date-parts": [[2020, 5, 17]]},
+            "author": [
+                {"given": "Ada", "family": f"Author-{suffix[:4]}", "sequence": "first"},
+                {"given": "Alan", "family": "Coauthor", "sequence": "additional"},
+            ],
+            "abstract": "<jats:p>" + "Lorem ipsum dolor sit amet. " * 20 + "</jats:p>",
+            "URL": f"https://doi.org/{doi}",
+        },
+    }
+
+
+def zotero_csljson_items(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Items of a Zotero collection, as returned in the `csljson` format."""
+    dois = synthetic_dois(count, seed)
+    return [
+        {
+            "id": f"1234567/ITEM{position:06d}",
+            "type": "article-journal",
+            "title": f"A study of {doi.rsplit('/', 1)[-1]}",
+            "container-title": "Journal of Synthetic Data",
+            "volume": str(position % 40),
+            "page": "100-120",
+            "DOI": doi,
+            "author": [
+                {"family": f"Author-{position}", "given": "Ada"},
+                {"family": "Coauthor", "given": "Alan"},
+            ],
+            "issued": {"date-parts": [[2000 + position % 25, position % 12 + 1]]},
+            "abstract": "Lorem ipsum dolor sit amet. " * 10,
+        }
+        for position, doi in enumerate(dois)
+    ]
@@ -0,0 +1,53 @@
+"""
+Compare the serialization of parquet record batches to a Meilisearch payload:
+`to_pylist` + stdlib `json.dumps` versus the Arrow NDJSON fast path.
+
+    python benchmarks/parquet_ndjson.py --rows 500000 --batch-size 10000
+"""
+
+import argparse
+import json
+import time
+
+from datagen import synthetic_table
+
+from gaas_cli.meili.document.serializer import record_batch_to_ndjson
+
+
+def time_path(batches, serialize) -> dict:
+    start = time.perf_counter()
+    size = 0
+    for batch in batches:
+        size += len(serialize(batch))
+    elapsed = time.perf_counter() - start
+    rows = sum(batch.num_rows for batch in batches)
+    return {
+        "seconds": round(elapsed, 4),
+        "rows_per_second": round(rows / elapsed),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    batches = synthetic_table(args.rows).to_batches(max_chunksize=args.batch_size)
+    results = {
+        "rows": args.rows,
+        "batch_size": args.batch_size,
+        "to_pylist_json": time_path(
+            batches, lambda batch: json.dumps(batch.to_pylist()).encode()
+        ),
+        "arrow_ndjson": time_path(batches, record_batch_to_ndjson),
+    }
+    results["speedup"] = round(
+        results["to_pylist_json"]["seconds"] / results["arrow_ndjson"]["seconds"], 2
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
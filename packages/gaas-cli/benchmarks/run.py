@@ -0,0 +1,423 @@
+"""
+Benchmark the data paths of gaas_cli on synthetic data and print the wall
+time, throughput and peak RSS of each case as JSON.
+
+Each case runs in its own process, so that its peak RSS is not inflated by the
+previous ones. The data generation and the stand-in also run in their own
+processes: Linux carries the peak RSS of a process over to its children.
+Meilisearch and Crossref are served by a local stand-in, the suite runs
+offline. Compare two commits with `--baseline`:
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --baseline before.json --cases loader_csv to_parquet_csv
+"""
+
+import argparse
+import json
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DOCUMENT_FORMATS = ["csv", "json", "ndjson", "parquet"]
+
+
+def prepare_data(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Generate the input files in the working directory, unless they were
+    already generated with the same parameters.
+    """
+    from datagen import (
+        synthetic_dois,
+        synthetic_table,
+        write_content_tree,
+        write_documents,
+        zotero_csljson_items,
+    )
+
+    parameters = {
+        "rows": args.rows,
+        "collection_rows": args.collection_rows,
+        "content_files": args.content_files,
+        "dois": args.dois,
+        "zotero_items": args.zotero_items,
+        "seed": args.seed,
+    }
+    workdir: Path = args.workdir
+    marker = workdir / "data.json"
+    if marker.exists() and json.loads(marker.read_text()) == parameters:
+        return parameters
+    shutil.rmtree(workdir / "data", ignore_errors=True)
+    data = workdir / "data"
+    table = synthetic_table(args.rows, args.seed)
+    for format in DOCUMENT_FORMATS:
+        write_documents(table, data / f"documents.{format}", format)
+    write_documents(
+        synthetic_table(args.collection_rows, args.seed), data / "collection.csv", "csv"
+    )
+    dois = synthetic_dois(args.dois, args.seed)
+    (data / "dois.json").write_text(json.dumps(dois))
+    write_content_tree(data / "content", args.content_files, dois, seed=args.seed)
+    (data / "zotero.json").write_text(
+        json.dumps(zotero_csljson_items(args.zotero_items, args.seed))
+    )
+    marker.write_text(json.dumps(parameters))
+    return parameters
+
+
+def invoke_cli(*cli_args: str):
+    from typer.testing import CliRunner
+
+    from gaas_cli.main import app
+
+    result = CliRunner().invoke(app, list(cli_args))
+    if result.exit_code != 0:
+        raise RuntimeError(f"gaas {' '.join(cli_args)} failed:\n{result.output}")
+
+
+def count_documents(batches) -> int:
+    return sum(len(batch) for batch in batches)
+
+
+# Each case returns a function running the measured work, after any setup that
+# should not be timed. The function returns the number of items processed.
+def case_loader(format: str) -> Callable[[argparse.Namespace], Callable[[], int]]:
+    def setup(args: argparse.Namespace) -> Callable[[], int]:
+        from gaas_cli.meili.document.loader import (
+            gen_csv_batches,
+            gen_json_batches,
+            gen_parquet_batches,
+        )
+
+        path = args.workdir / "data" / f"documents.{format}"
+        if format == "csv":
+            return lambda: count_documents(gen_csv_batches(path, args.chunk_size))
+        if format == "parquet":
+            return lambda: count_documents(gen_parquet_batches(path, args.chunk_size))
+        return lambda: count_documents(gen_json_batches(path, args.chunk_size))
+
+    return setup
+
+
+def setup_loader_parquet_ndjson(args: argparse.Namespace) -> Callable[[], int]:
+    from gaas_cli.meili.document.loader import gen_parquet_ndjson_batches
+
+    path = args.workdir / "data" / "documents.parquet"
+    return lambda: sum(
+        count for count, _ in gen_parquet_ndjson_batches(path, args.chunk_size)
+    )
+
+
+def case_to_parquet(format: str) -> Callable[[argparse.Namespace], Callable[[], int]]:
+    def setup(args: argparse.Namespace) -> Callable[[], int]:
+        path = args.workdir / "data" / f"documents.{format}"
+        output = args.workdir / "output" / f"from-{format}.parquet"
+        output.parent.mkdir(parents=True, exist_ok=True)
+
+        def run() -> int:
+            invoke_cli("content", "to-parquet", str(path), "--output", str(output))
+            return args.rows
+
+        return run
+
+    return setup
+
+
+def setup_create_from_csv(args: argparse.Namespace) -> Callable[[], int]:
+    output = args.workdir / "output" / "collection"
+    shutil.rmtree(output, ignore_errors=True)
+
+    def run() -> int:
+        invoke_cli(
+            "content",
+            "collection",
+            "create-from-csv",
+            str(args.workdir / "data" / "collection.csv"),
+            "--output",
+            str(output),
+        )
+        return args.collection_rows
+
+    return run
+
+
+def case_content_dois(warm: bool) -> Callable[[argparse.Namespace], Callable[[], int]]:
+    def setup(args: argparse.Namespace) -> Callable[[], int]:
+        from gaas_cli.biblio.content import gen_content_dois
+
+        content = args.workdir / "data" / "content"
+        cache = args.workdir / "output" / "content-dois.sqlite"
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        cache.unlink(missing_ok=True)
+        if warm:
+            sum(1 for _ in gen_content_dois(str(content), cache_path=cache))
+        return lambda: sum(1 for _ in gen_content_dois(str(content), cache_path=cache))
+
+    return setup
+
+
+def case_document_add(
+    compress: Optional[str],
+) -> Callable[[argparse.Namespace], Callable[[], int]]:
+    def setup(args: argparse.Namespace) -> Callable[[], int]:
+        path = args.workdir / "data" / "documents.ndjson"
+        options = ["--compress", compress] if compress else []
+
+        def run() -> int:
+            invoke_cli(
+                "meili",
+                "--host",
+                args.standin_url,
+                "document",
+                "add",
+                "benchmark",
+                str(path),
+                "--chunk-size",
+                str(args.chunk_size),
+                *options,
+            )
+            return args.rows
+
+        return run
+
+    return setup
+
+
+def setup_crossref_resolve(args: argparse.Namespace) -> Callable[[], int]:
+    import gaas_cli.biblio.crossref as crossref
+
+    crossref.CROSSREF_WORKS_URL = f"{args.standin_url}/works/"
+    dois = json.loads((args.workdir / "data" / "dois.json").read_text())
+
+    def run() -> int:
+        records, errors = crossref.resolve_dois(dois, cache=None)
+        if errors:
+            raise RuntimeError(f"{len(errors)} DOIs not resolved")
+        return len(records)
+
+    return run
+
+
+def case_biblio_output(
+    format: str,
+) -> Callable[[argparse.Namespace], Callable[[], int]]:
+    def setup(args: argparse.Namespace) -> Callable[[], int]:
+        from gaas_cli.biblio.output import write_bulk_output
+        from gaas_cli.biblio.state import BiblioOutputFormat
+
+        items = json.loads((args.workdir / "data" / "zotero.json").read_text())
+        output = args.workdir / "output" / f"zotero.{format}"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        return lambda: write_bulk_output(
+            output, BiblioOutputFormat(format), items, set(), merge=False
+        )
+
+    return setup
+
+
+CASES: Dict[str, Callable[[argparse.Namespace], Callable[[], int]]] = {
+    "loader_csv": case_loader("csv"),
+    "loader_json": case_loader("json"),
+    "loader_ndjson": case_loader("ndjson"),
+    "loader_parquet": case_loader("parquet"),
+    "loader_parquet_ndjson": setup_loader_parquet_ndjson,
+    "to_parquet_csv": case_to_parquet("csv"),
+    "to_parquet_json": case_to_parquet("json"),
+    "to_parquet_ndjson": case_to_parquet("ndjson"),
+    "create_from_csv": setup_create_from_csv,
+    "content_dois_cold": case_content_dois(warm=False),
+    "content_dois_warm": case_content_dois(warm=True),
+    "document_add": case_document_add(None),
+    "document_add_gzip": case_document_add("gzip"),
+    "crossref_resolve": setup_crossref_resolve,
+    "biblio_output_ndjson": case_biblio_output("ndjson"),
+    "biblio_output_parquet": case_biblio_output("parquet"),
+}
+
+# Input files of each case, to report the throughput in bytes
+CASE_INPUTS = {
+    "loader_csv": "documents.csv",
+    "loader_json": "documents.json",
+    "loader_ndjson": "documents.ndjson",
+    "loader_parquet": "documents.parquet",
+    "loader_parquet_ndjson": "documents.parquet",
+    "to_parquet_csv": "documents.csv",
+    "to_parquet_json": "documents.json",
+    "to_parquet_ndjson": "documents.ndjson",
+    "create_from_csv": "collection.csv",
+    "content_dois_cold": "content",
+    "content_dois_warm": "content",
+    "document_add": "documents.ndjson",
+    "document_add_gzip": "documents.ndjson",
+    "crossref_resolve": "dois.json",
+    "biblio_output_ndjson": "zotero.json",
+    "biblio_output_parquet": "zotero.json",
+}
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def input_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+    return path.stat().st_size
+
+
+def run_case(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run a single case in the current process."""
+    run = CASES[args.run_case](args)
+    start = time.perf_counter()
+    items = run()
+    seconds = time.perf_counter() - start
+    size = input_size(args.workdir / "data" / CASE_INPUTS[args.run_case])
+    return {
+        "seconds": round(seconds, 4),
+        "items": items,
+        "items_per_second": round(items / seconds, 1),
+        "input_bytes": size,
+        "megabytes_per_second": round(size / seconds / 1e6, 2),
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def prepare_in_child(args: argparse.Namespace) -> Dict[str, Any]:
+    command = [sys.executable, __file__, "--prepare", "--workdir", str(args.workdir)]
+    for option in ("rows", "collection_rows", "content_files", "dois", "zotero_items"):
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    command += ["--seed", str(args.seed)]
+    completed = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout)
+
+
+def spawn_case(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run a case in a child process and return its results."""
+    command = [
+        sys.executable,
+        __file__,
+        "--run-case",
+        name,
+        "--workdir",
+        str(args.workdir),
+        "--standin-url",
+        args.standin_url,
+        "--chunk-size",
+        str(args.chunk_size),
+        "--rows",
+        str(args.rows),
+        "--collection-rows",
+        str(args.collection_rows),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def spawn_standin() -> Tuple[subprocess.Popen, str]:
+    """
+    Start the Meilisearch and Crossref stand-in on a free port.
+
+    Returns:
+      tuple: The stand-in process and its base URL.
+    """
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("standin.py")), "--port", "0"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return process, process.stdout.readline().strip()
+
+
+def git_commit() -> str | None:
+    completed = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent,
+    )
+    return completed.stdout.strip() or None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]):
+    """Add the baseline time and speedup of each case found in the baseline."""
+    for name, case in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name, {})
+        if "seconds" in case and "seconds" in previous:
+            case["baseline_seconds"] = previous["seconds"]
+            case["speedup"] = round(previous["seconds"] / case["seconds"], 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--collection-rows", type=int, default=10_000)
+    parser.add_argument("--content-files", type=int, default=2_000)
+    parser.add_argument("--dois", type=int, default=1_000)
+    parser.add_argument("--zotero-items", type=int, default=5_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        help="Directory of the generated data, reused by the next runs with "
+        "the same parameters. Defaults to a temporary directory.",
+    )
+    parser.add_argument("--output", type=Path, help="Write the results to a file.")
+    parser.add_argument("--baseline", type=Path, help="Results to compare with.")
+    parser.add_argument("--run-case", choices=list(CASES), help=argparse.SUPPRESS)
+    parser.add_argument("--standin-url", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args)))
+        return
+    if args.prepare:
+        print(json.dumps(prepare_data(args)))
+        return
+
+    temporary = args.workdir is None
+    if temporary:
+        args.workdir = Path(tempfile.mkdtemp(prefix="gaas-benchmarks-"))
+    try:
+        parameters = prepare_in_child(args)
+        standin, args.standin_url = spawn_standin()
+        try:
+            cases = {}
+            for name in args.cases:
+                cases[name] = spawn_case(name, args)
+                print(f"{name}: {cases[name]}", file=sys.stderr)
+        finally:
+            standin.terminate()
+            standin.wait()
+    finally:
+        if temporary:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters | {"chunk_size": args.chunk_size},
+        "cases": cases,
+    }
+    if args.baseline:
+        compare(results, json.loads(args.baseline.read_text()))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Local HTTP stand-in for the Meilisearch and Crossref APIs used by the
+benchmarks and the tests, so that they run offline.
+
+Only the endpoints the CLI calls while adding, syncing and deleting documents
+and resolving DOIs are implemented. Documents are parsed and counted but not
+stored, and tasks succeed as soon as they are enqueued.
+
+    python benchmarks/standin.py --port 7711
+"""
+
+import argparse
+import gzip
+import json
+import threading
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from datagen import crossref_record
+
+
+class StandinState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tasks: Dict[int, Dict[str, Any]] = {}
+        self.indexes: Dict[str, Dict[str, Any]] = {}
+
+    def enqueue(self, index_uid: str, type: str, details: Dict[str, Any]) -> dict:
+        now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        with self.lock:
+            uid = len(self.tasks)
+            self.tasks[uid] = {
+                "uid": uid,
+                "indexUid": index_uid,
+                "status": "succeeded",
+                "type": type,
+                "details": details,
+                "error": None,
+                "duration": "PT0S",
+                "enqueuedAt": now,
+                "startedAt": now,
+                "finishedAt": now,
+            }
+        return {
+            "taskUid": uid,
+            "indexUid": index_uid,
+            "status": "enqueued",
+            "type": type,
+            "enqueuedAt": now,
+        }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StandinState
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: Any):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def not_found(self):
+        self.send_json(
+            404,
+            {
+                "message": f"Not found: {self.path}",
+                "code": "not_found",
+                "type": "invalid_request",
+                "link": "",
+            },
+        )
+
+    def read_body(self) -> bytes:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "deflate":
+            return zlib.decompress(body)
+        if encoding == "br":
+            # Installed with the brotli extra of gaas-cli
+            import brotli
+
+            return brotli.decompress(body)
+        return body
+
+    def route(self) -> Tuple[list, dict]:
+        url = urlparse(self.path)
+        return url.path.strip("/").split("/"), parse_qs(url.query)
+
+    def do_GET(self):
+        parts, query = self.route()
+        if len(parts) > 1 and parts[0] == "works":
+            doi = unquote("/".join(parts[1:]))
+            return self.send_json(200, crossref_record(doi))
+        if parts == ["tasks"]:
+            with self.state.lock:
+                tasks = list(self.state.tasks.values())
+            if "uids" in query:
+                uids = {int(uid) for uid in query["uids"][0].split(",") if uid}
+                tasks = [task for task in tasks if task["uid"] in uids]
+            if "statuses" in query:
+                statuses = query["statuses"][0].split(",")
+                tasks = [task for task in tasks if task["status"] in statuses]
+            return self.send_json(
+                200,
+                {"results": tasks, "total": len(tasks), "limit": len(tasks)}
+                | {"from": None, "next": None},
+            )
+        if len(parts) == 2 and parts[0] == "tasks":
+            task = self.state.tasks.get(int(parts[1]))
+            return self.send_json(200, task) if task else self.not_found()
+        if len(parts) == 2 and parts[0] == "indexes":
+            index = self.state.indexes.get(parts[1])
+            return self.send_json(200, index) if index else self.not_found()
+        self.not_found()
+
+    def do_POST(self):
+        parts, query = self.route()
+        body = self.read_body()
+        if parts[:1] == ["indexes"] and parts[2:] == ["documents", "delete-batch"]:
+            return self.send_json(
+                202,
+                self.state.enqueue(
+                    parts[1],
+                    "documentDeletion",
+                    {"providedIds": len(json.loads(body)), "deletedDocuments": None},
+                ),
+            )
+        if len(parts) == 3 and parts[0] == "indexes" and parts[2] == "documents":
+            content_type = self.headers.get("Content-Type", "")
+            if "ndjson" in content_type:
+                count = sum(1 for line in body.splitlines() if line.strip())
+            elif "csv" in content_type:
+                count = max(0, len(body.splitlines()) - 1)
+            else:
+                count = len(json.loads(body))
+            with self.state.lock:
+                self.state.indexes.setdefault(
+                    parts[1],
+                    {"uid": parts[1], "primaryKey": query.get("primaryKey", [None])[0]},
+                )
+            return self.send_json(
+                202,
+                self.state.enqueue(
+                    parts[1], "documentAdditionOrUpdate", {"receivedDocuments": count}
+                ),
+            )
+        self.not_found()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=7711, help="0 picks a free port.")
+    args = parser.parse_args()
+    handler = type("Handler", (StandinHandler,), {"state": StandinState()})
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    server.daemon_threads = True
+    # The base URL tells the caller which port was picked
+    print(f"http://127.0.0.1:{server.server_address[1]}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
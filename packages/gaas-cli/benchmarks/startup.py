@@ -0,0 +1,95 @@
+"""
+Check that `gaas --help` starts within a time budget, and that the help of the
+root and of the command groups does not import the dependencies of the
+subcommands. Exits with 1 when the check fails. Run by the CI.
+
+    python benchmarks/startup.py --runs 10 --budget 0.5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules only needed by some subcommands, which the help must not import
+HEAVY_MODULES = ["pandas", "pyarrow", "pyzotero", "meilisearch", "pydantic"]
+
+# Commands whose help is checked for heavy imports
+HELP_COMMANDS = [
+    ["--help"],
+    ["meili", "--help"],
+    ["content", "--help"],
+    ["biblio", "--help"],
+]
+
+
+def time_help(runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "gaas_cli.main", "--help"],
+            check=True,
+            capture_output=True,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def imported_modules(args: list) -> set:
+    """
+    Top-level packages imported by a gaas command, from the `-X importtime`
+    report written to stderr.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "gaas_cli.main", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    modules = set()
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and line.count("|") == 2:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+
+def imported_heavy_modules() -> dict:
+    """Heavy modules imported by the help of each command, if any."""
+    heavy_modules = {}
+    for args in HELP_COMMANDS:
+        found = sorted(imported_modules(args) & set(HEAVY_MODULES))
+        if found:
+            heavy_modules[" ".join(args)] = found
+    return heavy_modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--budget", type=float, default=0.5, help="Maximum median time in seconds."
+    )
+    args = parser.parse_args()
+
+    timings = time_help(args.runs)
+    heavy_modules = imported_heavy_modules()
+    results = {
+        "runs": args.runs,
+        "budget_seconds": args.budget,
+        "median_seconds": round(statistics.median(timings), 4),
+        "min_seconds": round(min(timings), 4),
+        "max_seconds": round(max(timings), 4),
+        "heavy_modules_imported": heavy_modules,
+    }
+    results["ok"] = results["median_seconds"] <= args.budget and not heavy_modules
+    print(json.dumps(results, indent=2))
+    if not results["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,21 @@
-import json
-from typing import Annotated
-import typer
+import time
 from pathlib import Path
-from dotenv import load_dotenv
-from gaas_cli.biblio.crossref import gen_crossref_record
-from gaas_cli.biblio.zotero import (
-    add_doi,
-    gen_get_dois_from_collection,
-    gen_fetch_from_zotero,
-)
+from typing import Annotated, Optional
+
+import typer
 from rich.console import Console
 
+from gaas_cli.biblio.state import (
+    BiblioOutputFormat,
+    load_fetch_state,
+    new_fetch_state,
+    save_fetch_state,
+)
 
 console = Console(stderr=True)
 
 app = typer.Typer(no_args_is_help=True)
 
-load_dotenv()  # take environment variables
-
 
 @app.command()
 def fetch(
@@ -26,7 +24,8 @@ def fetch(
         str,
         typer.Option(
             envvar="GAAS_ZOTERO_API_KEY",
-            help="Zotero API key used for authenticating requests to the Zotero service.",
+            help="Zotero API key used for authenticating requests to the Zotero "
+            "service.",
         ),
     ],
     library_id: Annotated[
@@ -42,10 +41,36 @@ def fetch(
     batch_size: int = 100,
     lib_type: str = "user",
     output: Path = Path("biblio"),
+    concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of Zotero pages fetched concurrently."),
+    ] = 4,
+    state: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="File keeping the library and item versions of the last fetch. "
+            "Defaults to '<output>.zotero-state.json'."
+        ),
+    ] = None,
+    full: Annotated[
+        bool,
+        typer.Option("--full", help="Fetch all the items, ignoring the last fetch."),
+    ] = False,
+    output_format: Annotated[
+        BiblioOutputFormat,
+        typer.Option(
+            help="One JSON file per item in the output directory (files), or a "
+            "single NDJSON or parquet file ('<output>.ndjson' or "
+            "'<output>.parquet' if output has no extension)."
+        ),
+    ] = BiblioOutputFormat.files,
 ):
     """
     Fetch items from a specified Zotero library collection and save them to a JSON file.
 
+    Only the items modified since the last fetch are downloaded, and the files
+    of the items removed from the collection are deleted.
+
     Args:
         key (str):
             Zotero API key used for authenticating requests to the Zotero service.
@@ -58,31 +83,115 @@ def fetch(
         lib_type (str, optional):
             Type of Zotero library, either "user" or "group". Defaults to "group".
         output (Path, optional):
-            Path to the output JSON file where the fetched items are saved. Defaults to "articles.json".
+            Path to the output JSON file where the fetched items are saved.
+            Defaults to "articles.json".
+        concurrency (int, optional):
+            Number of Zotero pages fetched concurrently. Defaults to 4.
+        state (Path, optional):
+            File keeping the versions of the last fetch. Defaults to
+            "<output>.zotero-state.json".
+        full (bool, optional):
+            Fetch all the items, ignoring the last fetch. Defaults to False.
+        output_format (BiblioOutputFormat, optional):
+            files, ndjson or parquet. Only modified files are rewritten in files
+            mode. Defaults to "files".
 
     Returns:
         None
     """
+    from gaas_cli.biblio.output import write_bulk_output, write_item_file
+    from gaas_cli.biblio.zotero import (
+        fetch_collection_changes,
+        gen_fetch_from_zotero,
+        gen_fetch_items_by_key,
+    )
+
     # verbose = ctx.obj.get("verbose", False)
     # if verbose:
     verbose = ctx.obj["verbose"]
-    params = {
-        "key": key,
-        "library_id": library_id,
-        "collection_id": collection_id,
-        "batch_size": batch_size,
-        "lib_type": lib_type,
-        "verbose": verbose,
-    }
-    items = list(gen_fetch_from_zotero(**params))
-    if not output.exists():
+    output_path = output
+    if output_format != BiblioOutputFormat.files and not output.suffix:
+        output_path = output.with_suffix(f".{output_format.value}")
+    if state is None:
+        state = Path(f"{output}.zotero-state.json")
+    fetch_state = None if full else load_fetch_state(state, library_id, collection_id)
+    if fetch_state is not None and (
+        fetch_state.get("output_format", BiblioOutputFormat.files.value)
+        != output_format.value
+        or (output_format != BiblioOutputFormat.files and not output_path.exists())
+    ):
+        # The previous output cannot be updated incrementally
+        fetch_state = None
+    previous = fetch_state or new_fetch_state(library_id, collection_id)
+    since = fetch_state["library_version"] if fetch_state else None
+
+    library_version, versions, removed = fetch_collection_changes(
+        key, library_id, collection_id, lib_type, since
+    )
+    if fetch_state is None:
+        # Everything is fetched again, the items not listed anymore are removed
+        removed = set(previous["items"]) - set(versions)
+        items = gen_fetch_from_zotero(
+            key, library_id, collection_id, lib_type, batch_size, verbose, concurrency
+        )
+    else:
+        changed_keys = [
+            item_key
+            for item_key, version in versions.items()
+            if previous["items"].get(item_key, {}).get("version") != version
+        ]
+        items = gen_fetch_items_by_key(
+            key, library_id, changed_keys, lib_type, concurrency
+        )
+
+    count_updated = 0
+    count_written = 0
+    bulk_items = []
+    if output_format == BiblioOutputFormat.files and not output.exists():
         output.mkdir(parents=True, exist_ok=True)
     for item in items:
         item.pop("data", None)
-        json_object = json.dumps(item, indent=2)
-        filename = item["id"].replace("/", "-")
-        with open(output / f"{filename}.json", "w") as outfile:
-            outfile.write(json_object)
+        item_key = item["id"].rsplit("/", 1)[-1]
+        entry = {"version": versions.get(item_key), "id": item["id"]}
+        if output_format == BiblioOutputFormat.files:
+            entry["file"], written = write_item_file(output, item)
+            count_written += written
+        else:
+            bulk_items.append(item)
+        previous["items"][item_key] = entry
+        count_updated += 1
+
+    removed_ids = set()
+    count_removed = 0
+    for item_key in removed:
+        entry = previous["items"].pop(item_key, None)
+        if entry is None:
+            continue
+        count_removed += 1
+        if entry.get("file"):
+            (output / entry["file"]).unlink(missing_ok=True)
+        if entry.get("id"):
+            removed_ids.add(entry["id"])
+
+    if output_format != BiblioOutputFormat.files:
+        count_items = write_bulk_output(
+            output_path,
+            output_format,
+            bulk_items,
+            removed_ids | {item["id"] for item in bulk_items},
+            merge=fetch_state is not None,
+        )
+        console.print(f"{count_items} items written to {output_path}")
+    else:
+        console.print(f"{count_written} files written")
+
+    previous["library_version"] = library_version
+    previous["output_format"] = output_format.value
+    save_fetch_state(state, previous)
+    console.print(
+        f"{count_updated} items updated, {count_removed} removed "
+        f"(library version {library_version})"
+    )
 
 
 @app.command()
@@ -96,6 +205,8 @@ def fetch_crossref():
     Returns:
         dict: The JSON response from CrossRef.
     """
+    from gaas_cli.biblio.crossref import gen_crossref_record
+
     doi = "10.1016/0042-6822(73)90432-7"
     record = gen_crossref_record(doi)
     return record
@@ -108,7 +219,8 @@ def sync_dois(
         str,
         typer.Option(
             envvar="GAAS_ZOTERO_API_KEY",
-            help="Zotero API key used for authenticating requests to the Zotero service.",
+            help="Zotero API key used for authenticating requests to the Zotero "
+            "service.",
         ),
     ],
     library_id: Annotated[
@@ -129,14 +241,82 @@ def sync_dois(
     ],
     batch_size: int = 100,
     lib_type: str = "user",
+    concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of Zotero pages fetched concurrently."),
+    ] = 4,
+    crossref_cache: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="SQLite cache of the Crossref records. "
+            "Defaults to '~/.cache/gaas/crossref.sqlite'."
+        ),
+    ] = None,
+    crossref_cache_ttl: Annotated[
+        float,
+        typer.Option(min=0, help="Number of days a cached Crossref record is used."),
+    ] = 30.0,
+    no_crossref_cache: Annotated[
+        bool,
+        typer.Option("--no-crossref-cache", help="Always query Crossref."),
+    ] = False,
+    crossref_concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of concurrent Crossref requests."),
+    ] = 8,
+    mailto: Annotated[
+        Optional[str],
+        typer.Option(
+            envvar="GAAS_CROSSREF_MAILTO",
+            help="Contact email sent to Crossref to use its polite pool.",
+        ),
+    ] = None,
 ):
     """
     Fetches DOIs from the specified content directory.
     """
+    from gaas_cli.biblio.crossref import CrossrefCache, default_cache_path
+    from gaas_cli.biblio.zotero import add_doi
 
     verbose = ctx.obj["verbose"]
 
-    add_doi(key, library_id, collection_id, lib_type, batch_size, content_dir, verbose)
+    cache = None
+    if not no_crossref_cache:
+        cache = CrossrefCache(
+            crossref_cache or default_cache_path(), ttl=crossref_cache_ttl * 86400
+        )
+    start = time.perf_counter()
+    try:
+        results = add_doi(
+            key,
+            library_id,
+            collection_id,
+            lib_type,
+            batch_size,
+            content_dir,
+            verbose,
+            concurrency,
+            cache,
+            crossref_concurrency,
+            mailto,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - start
+    count_resolved, errors, resolve_seconds, count_created, count_failed = results
+    count_dois = count_resolved + len(errors)
+    console.print(
+        f"Resolved {count_resolved}/{count_dois} missing DOIs with Crossref "
+        f"in {resolve_seconds:.2f}s "
+        f"({count_dois / resolve_seconds if resolve_seconds else 0:.1f} DOIs/s), "
+        f"{elapsed:.2f}s in total"
+    )
+    for doi, error in errors.items():
+        console.print(f"[red]{doi}: {error}[/red]")
+    console.print(f"Zotero items: {count_created} created, {count_failed} failed")
+    if errors or count_failed:
+        raise typer.Exit(code=1)
 
 
 @app.command()
@@ -146,7 +326,8 @@ def dois_in_zotero(
         str,
         typer.Option(
             envvar="GAAS_ZOTERO_API_KEY",
-            help="Zotero API key used for authenticating requests to the Zotero service.",
+            help="Zotero API key used for authenticating requests to the Zotero "
+            "service.",
         ),
     ],
     library_id: Annotated[
@@ -161,12 +342,21 @@ def dois_in_zotero(
     ],
     batch_size: int = 100,
     lib_type: str = "user",
+    concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of Zotero pages fetched concurrently."),
+    ] = 4,
 ):
+    from gaas_cli.biblio.zotero import (
+        gen_fetch_from_zotero,
+        gen_get_dois_from_collection,
+    )
+
     verbose = ctx.obj["verbose"]
 
     collection_items = gen_fetch_from_zotero(
-        key, library_id, collection_id, lib_type, batch_size, verbose
+        key, library_id, collection_id, lib_type, batch_size, verbose, concurrency
     )
-    dois_in_collection = gen_get_dois_from_collection(collection_items, verbose)
+    dois_in_collection = gen_get_dois_from_collection(collection_items)
     dois = list(dois_in_collection)
     console.print(dois)
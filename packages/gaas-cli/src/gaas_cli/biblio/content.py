@@ -1,30 +1,158 @@
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from rich.console import Console
+from typing import Dict, List, Optional, Tuple
+
 import frontmatter
-import re
+from rich.console import Console
+
+from gaas_cli.biblio.state import cache_dir
+from gaas_cli.profiling import stage
 
 console = Console()
 
+DOI_REF_PATTERN = re.compile(r":ref{dois=(?:\"|\')(.*?)(?:\"|\')}")
+DOI_SEPARATOR_PATTERN = re.compile(",")
+
+# Below this number of files to parse, starting worker processes costs more
+# than it saves
+MIN_FILES_FOR_PROCESS_POOL = 64
+
+
+def default_content_cache_path() -> Path:
+    return cache_dir() / "content-dois.sqlite"
+
+
+def extract_file_dois(file: str) -> List[str]:
+    """DOIs referenced in the content of a markdown file, in order."""
+    with open(file) as f:
+        _, content = frontmatter.parse(f.read())
+    dois = []
+    for group in DOI_REF_PATTERN.findall(content):
+        for doi in DOI_SEPARATOR_PATTERN.split(group):
+            dois.append(doi.lower().strip())
+    return dois
+
 
-def gen_content_dois(content_dir: str, verbose: bool = False):
+def open_content_cache(path: Path) -> sqlite3.Connection:
+    """
+    Open (and create if needed) the SQLite cache of the DOIs of each content
+    file, keyed on its path, modification time and size.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, "
+        "mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, dois TEXT NOT NULL)"
+    )
+    return conn
+
+
+def scan_content_dois(
+    files: List[Path],
+    conn: Optional[sqlite3.Connection] = None,
+    workers: Optional[int] = None,
+) -> List[List[str]]:
+    """
+    DOIs of each file, read from the cache for the unchanged files and
+    extracted by a pool of processes for the others.
+    """
+    keys: List[Tuple[str, int, int]] = []
+    for file in files:
+        stat = file.stat()
+        keys.append((os.path.abspath(file), stat.st_mtime_ns, stat.st_size))
+
+    # DOIs are decoded lazily, only for the files still present
+    cached: Dict[Tuple[str, int, int], str] = {}
+    if conn is not None:
+        for path, mtime_ns, size, dois in conn.execute(
+            "SELECT path, mtime_ns, size, dois FROM files"
+        ):
+            cached[(path, mtime_ns, size)] = dois
+
+    stale = [key for key in keys if key not in cached]
+    stale_paths = [path for path, _, _ in stale]
+    with stage("parse", sum(size for _, _, size in stale), len(stale)):
+        if len(stale) >= MIN_FILES_FOR_PROCESS_POOL and workers != 1:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(stale) // (4 * workers))
+                extracted = list(
+                    pool.map(extract_file_dois, stale_paths, chunksize=chunksize)
+                )
+        else:
+            extracted = [extract_file_dois(path) for path in stale_paths]
+    extracted_by_key = dict(zip(stale, extracted, strict=True))
+
+    if conn is not None:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, dois) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (path, mtime_ns, size, json.dumps(dois))
+                    for (path, mtime_ns, size), dois in zip(
+                        stale, extracted, strict=True
+                    )
+                ],
+            )
+    return [
+        extracted_by_key[key] if key in extracted_by_key else json.loads(cached[key])
+        for key in keys
+    ]
+
+
+def prune_content_cache(conn: sqlite3.Connection, root: Path, files: List[Path]):
+    """Remove the cached files under `root` that do not exist anymore."""
+    paths = {os.path.abspath(file) for file in files}
+    prefix = os.path.abspath(root) + os.sep
+    removed = [
+        (path,)
+        for (path,) in conn.execute("SELECT path FROM files")
+        if path.startswith(prefix) and path not in paths
+    ]
+    with conn:
+        conn.executemany("DELETE FROM files WHERE path = ?", removed)
+
+
+def gen_content_dois(
+    content_dir: str,
+    verbose: bool = False,
+    cache_path: Optional[Path] = None,
+    workers: Optional[int] = None,
+):
+    """
+    Generator of the DOIs referenced in the markdown files of a content
+    directory.
+
+    Args:
+      content_dir: Directory containing the content files.
+      verbose: Print the scanned files.
+      cache_path: SQLite cache of the DOIs of each file, the unchanged files
+        are not parsed again. Defaults to `default_content_cache_path()`.
+      workers: Number of processes parsing the files. Defaults to the number
+        of CPUs.
+    Yields:
+      str: A DOI, in the order of the files and of their references.
+    """
     content_path = Path(content_dir)
     if verbose:
         console.rule(
             f"[bold blue]Check for references in content: {content_path}", style="blue"
         )
 
-    for file in content_path.rglob("*"):
-        if file.suffix == ".md":
-            if verbose:
-                console.print(f"[green]{file.name}", style="blue")
-
-            with open(file) as f:
-                _, content = frontmatter.parse(f.read())
-                # handle content
-                group = re.findall(r":ref{dois=(?:\"|\')(.*?)(?:\"|\')}", content)
-                for g in group:
-                    splitted = [doi.lower().strip() for doi in re.split(",", g)]
-                    for item in splitted:
-                        if type(item) is str:
-                            item = item.strip()
-                            yield item
+    files = [file for file in content_path.rglob("*") if file.suffix == ".md"]
+    conn = open_content_cache(cache_path or default_content_cache_path())
+    try:
+        all_dois = scan_content_dois(files, conn, workers)
+        prune_content_cache(conn, content_path, files)
+    finally:
+        conn.close()
+
+    for file, dois in zip(files, all_dois, strict=True):
+        if verbose:
+            console.print(f"[green]{file.name}", style="blue")
+        yield from dois
@@ -1,22 +1,317 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from gaas_cli.biblio.state import cache_dir
+from gaas_cli.profiling import stage
+
+CROSSREF_WORKS_URL = "https://api.crossref.org/works/"
+
+# Prefixes removed from DOIs before caching and querying them
+DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "doi:")
+
+# Crossref records rarely change, missing DOIs may be registered later
+DEFAULT_CACHE_TTL = 30 * 24 * 3600
+DEFAULT_NEGATIVE_CACHE_TTL = 24 * 3600
+
+# Initial number of seconds before retrying a failed Crossref request
+RETRY_BACKOFF = 1.0
+
+# Seconds to connect to Crossref and between two bytes of a response
+REQUEST_TIMEOUT = (10.0, 30.0)
+
+# Request failures worth retrying: refused or reset connections, timeouts and
+# responses cut short
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def normalize_doi(doi: str) -> str:
+    """DOIs are case-insensitive, they are lowercased and stripped of URL prefixes."""
+    doi = doi.strip().lower()
+    for prefix in DOI_PREFIXES:
+        if doi.startswith(prefix):
+            return doi[len(prefix) :]
+    return doi
+
+
+def default_cache_path() -> Path:
+    return cache_dir() / "crossref.sqlite"
+
+
+def crossref_session(
+    pool_size: int = 10, mailto: Optional[str] = None
+) -> requests.Session:
+    """
+    HTTP session reusing the connections to Crossref. With `mailto`, the
+    requests identify themselves for the Crossref polite pool.
+    """
+    session = requests.Session()
+    user_agent = "gaas-cli/0.1"
+    if mailto:
+        user_agent += f" (mailto:{mailto})"
+    session.headers.update({"Accept": "application/json", "User-Agent": user_agent})
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return session
+
 
+class CrossrefCache:
+    """
+    SQLite cache of the Crossref responses keyed by normalized DOI.
 
-def gen_crossref_record(dois):
+    Records are kept for `ttl` seconds and 404 responses, for DOIs unknown to
+    Crossref, for `negative_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = DEFAULT_CACHE_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL,
+    ):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS records "
+                "(doi TEXT PRIMARY KEY, status INTEGER NOT NULL, body TEXT, "
+                "fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, doi: str) -> Optional[Tuple[int, Optional[Dict[str, Any]]]]:
+        """
+        Returns:
+          tuple: The HTTP status and record of the DOI, or None if the DOI is
+            not cached or expired.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, body, fetched_at FROM records WHERE doi = ?",
+                (normalize_doi(doi),),
+            ).fetchone()
+        if row is None:
+            return None
+        status, body, fetched_at = row
+        ttl = self.ttl if status == 200 else self.negative_ttl
+        if time.time() - fetched_at > ttl:
+            return None
+        return status, json.loads(body) if body is not None else None
+
+    def put(self, doi: str, status: int, record: Optional[Dict[str, Any]] = None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO records (doi, status, body, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    normalize_doi(doi),
+                    status,
+                    json.dumps(record) if record is not None else None,
+                    time.time(),
+                ),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class CrossrefError(Exception):
+    def __init__(self, doi: str, status: Optional[int], message: str):
+        super().__init__(message)
+        self.doi = doi
+        self.status = status
+
+
+class CrossrefRateLimiter:
+    """
+    Space the requests shared by all the threads according to the
+    `X-Rate-Limit-Limit` and `X-Rate-Limit-Interval` headers sent by Crossref.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.delay = 0.0
+        self.next_request = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_request)
+            self.next_request = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.next_request = max(self.next_request, time.monotonic() + seconds)
+
+    def update(self, headers):
+        try:
+            limit = int(headers["X-Rate-Limit-Limit"])
+            interval = float(headers["X-Rate-Limit-Interval"].rstrip("s"))
+        except (KeyError, ValueError):
+            return
+        if limit > 0:
+            with self.lock:
+                self.delay = interval / limit
+
+
+def request_crossref_record(
+    doi: str,
+    session: requests.Session,
+    rate_limiter: Optional[CrossrefRateLimiter] = None,
+    retries: int = 3,
+    mailto: Optional[str] = None,
+    timeout: Tuple[float, float] = REQUEST_TIMEOUT,
+) -> requests.Response:
+    """
+    Query Crossref for a DOI, retrying with an exponential backoff on
+    connection errors, timeouts, truncated responses, 429 and 5xx responses.
+    """
+    params = {"mailto": mailto} if mailto else None
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        delay = RETRY_BACKOFF * 2**attempt
+        try:
+            with stage("network", items=1) as call:
+                response = session.get(
+                    CROSSREF_WORKS_URL + normalize_doi(doi),
+                    params=params,
+                    timeout=timeout,
+                )
+                call.bytes = len(response.content)
+        except TRANSIENT_ERRORS as e:
+            if attempt >= retries:
+                raise CrossrefError(doi, None, f"Request failed: {e}") from e
+        else:
+            if rate_limiter is not None:
+                rate_limiter.update(response.headers)
+            transient = response.status_code == 429 or response.status_code >= 500
+            if not transient or attempt >= retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+        if rate_limiter is not None:
+            rate_limiter.pause(delay)
+        else:
+            time.sleep(delay)
+        attempt += 1
+
+
+def fetch_crossref_record(
+    doi: str,
+    cache: Optional[CrossrefCache] = None,
+    session: Optional[requests.Session] = None,
+    rate_limiter: Optional[CrossrefRateLimiter] = None,
+    retries: int = 0,
+    mailto: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch the Crossref record of a DOI, from the cache when possible.
+
+    Only successful responses and 404 are cached.
+    Raises:
+      CrossrefError: Crossref did not answer with a record.
+    """
+    cached = cache.get(doi) if cache is not None else None
+    if cached is not None:
+        status, record = cached
+    else:
+        session = session or crossref_session()
+        response = request_crossref_record(doi, session, rate_limiter, retries, mailto)
+        status = response.status_code
+        try:
+            record = response.json() if status == 200 else None
+        except ValueError as e:
+            raise CrossrefError(doi, status, f"Invalid JSON response: {e}") from e
+        if cache is not None and status in (200, 404):
+            cache.put(doi, status, record)
+    if status != 200:
+        raise CrossrefError(doi, status, f"Error fetching data from CrossRef: {status}")
+    return record
+
+
+def gen_crossref_record(
+    dois,
+    cache: Optional[CrossrefCache] = None,
+    session: Optional[requests.Session] = None,
+):
     """
     Fetches a record from CrossRef using the provided DOI.
 
     Args:
-        doi (str): The DOI of the item to fetch.
+        dois (Iterable[str]): The DOIs of the items to fetch.
+        cache (CrossrefCache, optional): Cache of the Crossref responses.
+        session (requests.Session, optional): Session reused for all the requests.
 
-    Returns:
+    Yields:
         dict: The JSON response from CrossRef.
     """
-
+    session = session or crossref_session()
     for doi in dois:
-        url = f"https://api.crossref.org/works/{doi}"
-        headers = {"Accept": "application/json", "User-Agent": "gaas-cli/0.1"}
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            yield response.json()
-        else:
-            raise Exception(f"Error fetching data from CrossRef: {response.status_code}")
+        yield fetch_crossref_record(doi, cache, session)
+
+
+def resolve_dois(
+    dois: Iterable[str],
+    cache: Optional[CrossrefCache] = None,
+    concurrency: int = 8,
+    mailto: Optional[str] = None,
+    retries: int = 3,
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Fetch the Crossref records of DOIs concurrently, within the rate limit
+    announced by Crossref.
+
+    Args:
+        dois (Iterable[str]): The DOIs to resolve.
+        cache (CrossrefCache, optional): Cache of the Crossref responses.
+        concurrency (int): Number of concurrent requests.
+        mailto (str, optional): Contact email identifying the requests to the
+            Crossref polite pool.
+        retries (int): Number of retries of the transient failures.
+
+    Returns:
+        tuple: The records in the order of `dois`, and the error of each DOI
+        that could not be resolved.
+    """
+    session = crossref_session(pool_size=concurrency, mailto=mailto)
+    rate_limiter = CrossrefRateLimiter()
+
+    def resolve(doi: str) -> Union[Dict[str, Any], CrossrefError]:
+        try:
+            return fetch_crossref_record(
+                doi, cache, session, rate_limiter, retries, mailto
+            )
+        except CrossrefError as e:
+            return e
+        except (requests.RequestException, ValueError) as e:
+            # Any other failure is an error of this DOI, not of the batch
+            return CrossrefError(doi, None, f"Request failed: {e}")
+
+    records = []
+    errors = {}
+    dois = list(dois)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for doi, result in zip(dois, pool.map(resolve, dois), strict=True):
+            if isinstance(result, CrossrefError):
+                errors[doi] = str(result)
+            else:
+                records.append(result)
+    return records, errors
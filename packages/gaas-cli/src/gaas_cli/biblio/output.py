@@ -0,0 +1,177 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from gaas_cli.biblio.state import BiblioOutputFormat
+from gaas_cli.profiling import stage
+
+# Parts of the CSL-JSON names stored in their own struct field, the others
+# (e.g. comma-suffix, parse-names) are kept as JSON in the `extra` field
+CSL_NAME_PARTS = [
+    "family",
+    "given",
+    "dropping-particle",
+    "non-dropping-particle",
+    "suffix",
+    "literal",
+]
+CSL_NAME = pa.struct(
+    [(part, pa.string()) for part in CSL_NAME_PARTS] + [("extra", pa.string())]
+)
+
+# CSL-JSON variables stored in their own parquet column, the others are kept
+# as JSON in the `extra` column so that the schema does not depend on the items
+CSL_STRING_FIELDS = [
+    "id",
+    "type",
+    "title",
+    "container-title",
+    "container-title-short",
+    "page",
+    "volume",
+    "issue",
+    "DOI",
+    "ISSN",
+    "URL",
+    "abstract",
+    "language",
+    "source",
+]
+CSL_NAME_FIELDS = ["author", "editor"]
+CSL_DATE_FIELDS = ["issued", "accessed"]
+
+CSL_SCHEMA = pa.schema(
+    [(field, pa.string()) for field in CSL_STRING_FIELDS]
+    + [(field, pa.list_(CSL_NAME)) for field in CSL_NAME_FIELDS]
+    + [(field, pa.string()) for field in CSL_DATE_FIELDS]
+    + [("extra", pa.string())]
+)
+
+
+def csl_date(value: Any) -> Any:
+    """ISO-like date (YYYY, YYYY-MM or YYYY-MM-DD) of a CSL-JSON date variable."""
+    try:
+        parts = value["date-parts"][0]
+    except (KeyError, IndexError, TypeError):
+        return value.get("raw") if isinstance(value, dict) else None
+    return "-".join(
+        str(part).zfill(2) if position else str(part)
+        for position, part in enumerate(parts)
+    )
+
+
+def csl_name(name: Dict[str, Any]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {
+        part: None if name.get(part) is None else str(name[part])
+        for part in CSL_NAME_PARTS
+    }
+    extra = {key: value for key, value in name.items() if key not in CSL_NAME_PARTS}
+    row["extra"] = json.dumps(extra) if extra else None
+    return row
+
+
+def csl_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {}
+    for field in CSL_STRING_FIELDS:
+        value = item.get(field)
+        row[field] = None if value is None else str(value)
+    for field in CSL_NAME_FIELDS:
+        names = item.get(field)
+        row[field] = None if names is None else [csl_name(name) for name in names]
+    for field in CSL_DATE_FIELDS:
+        row[field] = csl_date(item[field]) if field in item else None
+    extra = {
+        key: value
+        for key, value in item.items()
+        if key not in CSL_SCHEMA.names or key in CSL_DATE_FIELDS
+    }
+    row["extra"] = json.dumps(extra) if extra else None
+    return row
+
+
+def csl_items_to_table(items: Iterable[Dict[str, Any]]) -> pa.Table:
+    """
+    Arrow table of CSL-JSON items with the stable `CSL_SCHEMA`. Date variables
+    are kept verbatim in `extra`, next to their ISO-like column, and the name
+    parts that are not in `CSL_NAME_PARTS` in the `extra` field of the name.
+    """
+    return pa.Table.from_pylist([csl_row(item) for item in items], schema=CSL_SCHEMA)
+
+
+def item_filename(item: Dict[str, Any]) -> str:
+    return item["id"].replace("/", "-") + ".json"
+
+
+def write_item_file(output: Path, item: Dict[str, Any]) -> Tuple[str, bool]:
+    """
+    Write an item to its own JSON file, unless the file already has this
+    content.
+
+    Returns:
+      tuple: The file name and whether the file was written.
+    """
+    filename = item_filename(item)
+    path = output / filename
+    content = json.dumps(item, indent=2).encode()
+    try:
+        if path.stat().st_size == len(content) and path.read_bytes() == content:
+            return filename, False
+    except FileNotFoundError:
+        pass
+    with stage("write", len(content), 1):
+        path.write_bytes(content)
+    return filename, True
+
+
+def write_bulk_output(
+    path: Path,
+    output_format: BiblioOutputFormat,
+    items: List[Dict[str, Any]],
+    drop_ids: Set[str],
+    merge: bool,
+) -> int:
+    """
+    Write the items to a single NDJSON or parquet file, sorted by id.
+
+    With `merge`, the items of the existing file are kept, except those whose
+    id is in `drop_ids`. The file is replaced atomically.
+
+    Returns:
+      int: The number of items in the file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    merge = merge and path.exists()
+    if output_format == BiblioOutputFormat.ndjson:
+        lines = {}
+        if merge:
+            with open(path, "rb") as infile:
+                for line in infile:
+                    if line.strip():
+                        item_id = json.loads(line)["id"]
+                        if item_id not in drop_ids:
+                            lines[item_id] = line
+        for item in items:
+            lines[item["id"]] = json.dumps(item).encode() + b"\n"
+        with stage("write", sum(map(len, lines.values())), len(lines)):
+            with open(tmp_path, "wb") as outfile:
+                outfile.writelines(lines[item_id] for item_id in sorted(lines))
+        tmp_path.replace(path)
+        return len(lines)
+
+    table = csl_items_to_table(items)
+    if merge:
+        previous = pq.read_table(path, schema=CSL_SCHEMA)
+        keep = pc.invert(
+            pc.is_in(previous["id"], pa.array(list(drop_ids), pa.string()))
+        )
+        table = pa.concat_tables([previous.filter(keep), table])
+    table = table.sort_by("id")
+    with stage("write", table.nbytes, table.num_rows):
+        pq.write_table(table, tmp_path)
+    tmp_path.replace(path)
+    return table.num_rows
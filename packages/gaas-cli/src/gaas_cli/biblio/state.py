@@ -0,0 +1,57 @@
+import json
+import os
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class BiblioOutputFormat(str, Enum):
+    files = "files"
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+
+def cache_dir() -> Path:
+    """Directory of the gaas caches, following the XDG base directories."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "gaas"
+
+
+def load_fetch_state(
+    path: Path, library_id: str, collection_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Load the state of the last Zotero fetch: the library version and the
+    version and output file of each item.
+
+    Returns:
+      dict: The state, or None if there is no state for this collection.
+    """
+    if not path.exists():
+        return None
+    with open(path) as infile:
+        state = json.load(infile)
+    if (
+        state.get("library_id") != library_id
+        or state.get("collection_id") != collection_id
+    ):
+        return None
+    return state
+
+
+def new_fetch_state(library_id: str, collection_id: str) -> Dict[str, Any]:
+    return {
+        "library_id": library_id,
+        "collection_id": collection_id,
+        "library_version": None,
+        "items": {},
+    }
+
+
+def save_fetch_state(path: Path, state: Dict[str, Any]):
+    """Write the fetch state, replacing the previous one atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as outfile:
+        json.dump(state, outfile, indent=2)
+    tmp_path.replace(path)
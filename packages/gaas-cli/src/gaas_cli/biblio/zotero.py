@@ -1,12 +1,114 @@
-from gaas_cli.biblio.content import gen_content_dois
-from gaas_cli.biblio.crossref import gen_crossref_record
+import copy
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import batched, chain
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
 from pyzotero import zotero
-from typing import Any, Generator
-from rich.console import Console
 from rich.columns import Columns
+from rich.console import Console
+
+from gaas_cli.biblio.content import gen_content_dois
+from gaas_cli.biblio.crossref import CrossrefCache, resolve_dois
+from gaas_cli.profiling import stage
 
 console = Console(stderr=True)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+ZOTERO_ITEM_TYPES = "journalArticle || Preprint"
+
+# Maximum number of item keys in a single Zotero items request
+ZOTERO_KEYS_PER_REQUEST = 50
+# Maximum number of items created by a single Zotero write request
+ZOTERO_WRITE_BATCH_SIZE = 50
+
+
+def thread_local_zotero(
+    library_id: str, lib_type: str, key: str
+) -> Callable[[], zotero.Zotero]:
+    """
+    Return a function giving one Zotero instance per calling thread.
+
+    `zotero.Zotero` keeps the state of the last request on the instance, so a
+    single instance must not be shared between concurrent threads.
+    """
+    local = threading.local()
+
+    def get_zotero() -> zotero.Zotero:
+        zot = getattr(local, "zot", None)
+        if zot is None:
+            zot = local.zot = zotero.Zotero(library_id, lib_type, key)
+        return zot
+
+    return get_zotero
+
+
+class SharedBackoff:
+    """
+    Backoff requested by the Zotero API through the `Backoff` or `Retry-After`
+    headers, shared by all the threads fetching from the API.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.until = 0.0
+
+    def wait(self):
+        with self.lock:
+            until = self.until
+        remainder = until - time.time()
+        if remainder > 0:
+            time.sleep(remainder)
+
+    def update(self, response):
+        if response is None:
+            return
+        duration = response.headers.get("backoff") or response.headers.get(
+            "retry-after"
+        )
+        if not duration:
+            return
+        try:
+            until = time.time() + float(duration)
+        except ValueError:
+            return
+        with self.lock:
+            self.until = max(self.until, until)
+
+
+def gen_concurrent_results(
+    function: Callable[[T], R], arguments: Iterable[T], concurrency: int
+) -> Generator[R, None, None]:
+    """
+    Generator of the results of `function` applied to `arguments` by a pool of
+    `concurrency` threads, in the order of `arguments`.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Bound the number of results computed ahead of the consumer
+        futures: Deque[Future] = deque()
+        for argument in arguments:
+            futures.append(pool.submit(function, argument))
+            if len(futures) >= 2 * concurrency:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
 
 def gen_fetch_from_zotero(
     key: str,
@@ -15,40 +117,132 @@ def gen_fetch_from_zotero(
     lib_type: str = "user",
     batch_size: int = 100,
     verbose: bool = False,
+    concurrency: int = 4,
 ) -> Generator[dict, None, None]:
     """
     Generator function to fetch items from a Zotero collection in batches.
+
+    The pages of the collection are fetched concurrently by at most
+    `concurrency` threads, the items are yielded in the collection order.
     Args:
-      zot: Zotero instance for making API calls.
+      key: Zotero API key.
+      library_id: ID of the Zotero library.
       collection_id: ID of the Zotero collection to fetch items from.
-      count_items: Total number of items in the collection.
+      lib_type: Type of the Zotero library, user or group.
       batch_size: Number of items to fetch in each batch.
+      verbose: Print the fetched items.
+      concurrency: Number of pages fetched concurrently.
     Yields:
       dict: A single item from the Zotero collection.
     """
-    zot = zotero.Zotero(library_id, lib_type, key)
-    collection: Any = zot.collection(collection_id)
+    get_zotero = thread_local_zotero(library_id, lib_type, key)
+    backoff = SharedBackoff()
+    collection: Any = get_zotero().collection(collection_id)
     count_items = collection["meta"]["numItems"]
     starts = range(0, count_items, batch_size)
-    for i in starts:
-        collection_items: Any = zot.collection_items(
-            collection_id,
-            format="csljson",
-            limit=batch_size,
-            start=i,
-            itemType="journalArticle || Preprint",
-            sort="title",
+
+    def fetch_page(start: int) -> List[dict]:
+        zot = get_zotero()
+        backoff.wait()
+        with stage("network") as call:
+            collection_items: Any = zot.collection_items(
+                collection_id,
+                format="csljson",
+                limit=batch_size,
+                start=start,
+                itemType=ZOTERO_ITEM_TYPES,
+                sort="title",
+            )
+            call.bytes = len(zot.request.content)
+            call.items = len(collection_items["items"])
+        backoff.update(zot.request)
+        return collection_items["items"]
+
+    if verbose:
+        console.rule(
+            f"[bold blue]References in Zotero collection: {collection['data']['name']}",
+            style="blue",
         )
-        items = collection_items["items"]
+    pages = gen_concurrent_results(fetch_page, starts, concurrency)
+    for i, item in enumerate(chain.from_iterable(pages)):
         if verbose:
-            console.rule(
-                f"[bold blue]References in Zotero collection: {collection['data']['name']}",
-                style="blue",
+            console.print(f"Item {i + 1}: {item['title']}")
+        yield item
+
+
+def fetch_collection_changes(
+    key: str,
+    library_id: str,
+    collection_id: str,
+    lib_type: str = "user",
+    since: Optional[int] = None,
+) -> Tuple[int, Dict[str, int], Set[str]]:
+    """
+    Fetch the versions of the items of a Zotero collection modified since a
+    library version, and the items removed from the collection since then.
+
+    Args:
+      key: Zotero API key.
+      library_id: ID of the Zotero library.
+      collection_id: ID of the Zotero collection.
+      lib_type: Type of the Zotero library, user or group.
+      since: Library version of the last fetch. All the items of the
+        collection are listed if None.
+    Returns:
+      tuple: The current library version, the version of each new or
+        modified item by key, and the keys of the items deleted from the
+        library or modified since without being in the collection anymore.
+    """
+    zot = zotero.Zotero(library_id, lib_type, key)
+    parameters: Dict[str, Any] = {"itemType": ZOTERO_ITEM_TYPES}
+    if since is not None:
+        parameters["since"] = since
+    changed: Any = zot.collection_items(
+        collection_id, format="versions", limit=None, **parameters
+    )
+    library_version = int(zot.request.headers.get("last-modified-version", 0))
+    removed: Set[str] = set()
+    if since is not None:
+        deleted: Any = zot.deleted(since=since)
+        removed.update(deleted.get("items", []))
+        # Items leaving the collection get a new version without being
+        # listed in the collection anymore
+        modified: Any = zot.item_versions(since=since)
+        removed.update(set(modified) - set(changed))
+    return library_version, dict(changed), removed
+
+
+def gen_fetch_items_by_key(
+    key: str,
+    library_id: str,
+    item_keys: Iterable[str],
+    lib_type: str = "user",
+    concurrency: int = 4,
+) -> Generator[dict, None, None]:
+    """
+    Generator of the CSL JSON items with the given keys, fetched concurrently
+    by requests of at most `ZOTERO_KEYS_PER_REQUEST` keys.
+    """
+    get_zotero = thread_local_zotero(library_id, lib_type, key)
+    backoff = SharedBackoff()
+
+    def fetch_items(keys: Tuple[str, ...]) -> List[dict]:
+        zot = get_zotero()
+        backoff.wait()
+        with stage("network", items=len(keys)) as call:
+            items: Any = zot.items(
+                itemKey=",".join(keys), format="csljson", limit=len(keys)
             )
-        for i, item in enumerate(items):
-            if verbose:
-                console.print(f"Item {i + 1}: {item['title']}")
-            yield item
+            call.bytes = len(zot.request.content)
+        backoff.update(zot.request)
+        return items["items"]
+
+    pages = gen_concurrent_results(
+        fetch_items,
+        batched(item_keys, ZOTERO_KEYS_PER_REQUEST, strict=False),
+        concurrency,
+    )
+    yield from chain.from_iterable(pages)
 
 
 def gen_get_dois_from_collection(
@@ -108,10 +302,24 @@ def add_doi(
     batch_size: int = 100,
     content_dir: str = "content",
     verbose: bool = False,
-):
+    concurrency: int = 4,
+    crossref_cache: Optional[CrossrefCache] = None,
+    crossref_concurrency: int = 8,
+    mailto: Optional[str] = None,
+) -> Tuple[int, Dict[str, str], float, int, int]:
+    """
+    Add the DOIs found in the content directory and missing from the Zotero
+    collection, with their metadata from Crossref.
+
+    Returns:
+      tuple: The number of DOIs resolved with Crossref, the error of each DOI
+        that could not be resolved, the seconds taken to resolve them, the
+        number of Zotero items created and the number of items Zotero failed
+        to create.
+    """
     # get dois in zotero collection
     collection_items = gen_fetch_from_zotero(
-        key, library_id, collection_id, lib_type, batch_size, verbose
+        key, library_id, collection_id, lib_type, batch_size, verbose, concurrency
     )
     dois_in_collection = gen_get_dois_from_collection(collection_items)
 
@@ -123,12 +331,66 @@ def add_doi(
 
     # get metedata from crossref to dois not in zotero collection
 
-    records = gen_crossref_record(missing_dois)
-    zotero_item = crossref_to_zotero(
-        records, key, library_id, collection_id, lib_type, verbose
+    start = time.perf_counter()
+    records, errors = resolve_dois(
+        missing_dois, crossref_cache, crossref_concurrency, mailto
     )
+    resolve_seconds = time.perf_counter() - start
 
     # add dois to zotero collection
+    count_created, count_failed = 0, 0
+    if records:
+        count_created, count_failed = crossref_to_zotero(
+            records, key, library_id, collection_id, lib_type, verbose, concurrency
+        )
+    return len(records), errors, resolve_seconds, count_created, count_failed
+
+
+def crossref_record_to_zotero_item(
+    record: Dict[str, Any], templates: Dict[str, dict], zot: zotero.Zotero
+) -> dict:
+    """
+    Zotero item built from a Crossref record. The item templates are fetched
+    once per item type and cached in `templates`.
+    """
+    message = record["message"]
+    message_type = message["type"]
+    if message_type == "posted-content":
+        itemtype = "Preprint"
+    elif message_type == "journal-article":
+        itemtype = "journalArticle"
+    else:
+        raise NotImplementedError(f"type {message['type']} need to be implemented")
+    if itemtype not in templates:
+        templates[itemtype] = zot.item_template(itemtype)
+    zitem = copy.deepcopy(templates[itemtype])
+    zitem["title"] = message["title"][0]
+    if "page" in message:
+        zitem["pages"] = message["page"]
+    if "abstract" in message:
+        zitem["abstractNote"] = message["abstract"]
+
+    if "container-title" in message and len(message["container-title"]) > 0:
+        zitem["publicationTitle"] = message["container-title"][0]
+    if "short-container-title" in message and len(message["short-container-title"]) > 0:
+        zitem["journalAbbreviation"] = message["short-container-title"][0]
+    zitem["creators"] = [
+        {
+            "creatorType": "author",
+            "firstName": author["given"],
+            "lastName": author["family"],
+        }
+        for author in message["author"]
+    ]
+    zitem["libraryCatalog"] = "DOI.org (Crossref)"
+    if "ISSN" in message:
+        zitem["ISSN"] = ", ".join(message["ISSN"])
+    zitem["url"] = message["resource"]["primary"]["URL"]
+    zitem["date"] = "/".join([str(d) for d in message["published"]["date-parts"][0]])
+    for field in ["DOI", "volume", "issue", "language"]:
+        if field in message:
+            zitem[field] = message[field]
+    return zitem
 
 
 def crossref_to_zotero(
@@ -138,64 +400,45 @@ def crossref_to_zotero(
     collection_id: str,
     lib_type: str = "user",
     verbose: bool = False,
-):
+    concurrency: int = 4,
+) -> Tuple[int, int]:
     """
-    Fetches DOIs from the specified content directory.
+    Create Zotero items in a collection from Crossref records.
+
+    The items are created with the collection in their payload, by requests
+    of at most `ZOTERO_WRITE_BATCH_SIZE` items sent concurrently.
+
+    Returns:
+      tuple: The number of items created and the number of items Zotero
+        failed to create.
     """
-    zot = zotero.Zotero(library_id, lib_type, key)
+    get_zotero = thread_local_zotero(library_id, lib_type, key)
+    backoff = SharedBackoff()
+    templates: Dict[str, dict] = {}
     zotero_items = []
     for record in records:
-        message = record["message"]
-        message_type = message["type"]
-        if message_type == "posted-content":
-            itemtype = "Preprint"
-        elif message_type == "journal-article":
-            itemtype = "journalArticle"
-        else:
-            raise NotImplementedError(f"type {message['type']} need to be implemented")
-        zitem = zot.item_template(itemtype)
-        zitem["title"] = message["title"][0]
-        if "page" in message:
-            zitem["pages"] = message["page"]
-        if "abstract" in message:
-            zitem["abstractNote"] = message["abstract"]
-
-        if "container-title" in message and len(message["container-title"]) > 0:
-            zitem["publicationTitle"] = message["container-title"][0]
-        if (
-            "short-container-title" in message
-            and len(message["short-container-title"]) > 0
-        ):
-            zitem["journalAbbreviation"] = message["short-container-title"][0]
-        zitem["creators"] = [
-            {
-                "creatorType": "author",
-                "firstName": author["given"],
-                "lastName": author["family"],
-            }
-            for author in message["author"]
-        ]
-        zitem["libraryCatalog"] = "DOI.org (Crossref)"
-        if "ISSN" in message:
-            zitem["ISSN"] = ", ".join(message["ISSN"])
-        zitem["url"] = message["resource"]["primary"]["URL"]
-        zitem["date"] = "/".join(
-            [str(d) for d in message["published"]["date-parts"][0]]
-        )
-        for key in ["DOI", "volume", "issue", "language"]:
-            if key in message:
-                zitem[key] = message[key]
-
+        zitem = crossref_record_to_zotero_item(record, templates, get_zotero())
+        zitem["collections"] = [collection_id]
         zotero_items.append(zitem)
 
-    # validate zotero items
-    zot.check_items(zotero_items)
-
-    response = zot.create_items(zotero_items)
+    def create_items(chunk: Tuple[dict, ...]) -> dict:
+        zot = get_zotero()
+        backoff.wait()
+        # validate zotero items
+        zot.check_items(list(chunk))
+        response = zot.create_items(list(chunk))
+        backoff.update(zot.request)
+        return response
 
-    new_items = response["successful"]
-    for new_item in new_items.values():
-        if verbose:
-            console.print(f"Added item: {new_item['data']['title']}")
-        # add item to collection
-        zot.addto_collection(collection_id, new_item)
+    count_created = 0
+    count_failed = 0
+    chunks = batched(zotero_items, ZOTERO_WRITE_BATCH_SIZE, strict=False)
+    for response in gen_concurrent_results(create_items, chunks, concurrency):
+        for new_item in response.get("successful", {}).values():
+            count_created += 1
+            if verbose:
+                console.print(f"Added item: {new_item['data']['title']}")
+        for failure in response.get("failed", {}).values():
+            count_failed += 1
+            console.print(f"[red]Item not created: {failure.get('message')}[/red]")
+    return count_created, count_failed
@@ -1,10 +1,11 @@
-import typer
-from typing import Annotated
 from pathlib import Path
-import pandas as pd
-import gaas_cli.content.collection as collection
+from typing import Annotated, List, Optional
+
+import typer
 from rich.console import Console
 
+import gaas_cli.content.collection as collection
+from gaas_cli.schema.parquet import ParquetCompression
 
 console = Console(stderr=True)
 
@@ -24,33 +25,95 @@ def to_parquet(
         Path | None,
         typer.Option("--output", "-o", help="Path to the output Parquet file"),
     ] = None,
+    csv_block_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1,
+            help="Size in bytes of the blocks parsed by the CSV and NDJSON readers.",
+        ),
+    ] = None,
+    column_type: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            help="Type of a column as name=type with an Arrow type alias "
+            "(e.g. price=float64), instead of inferring it. Can be repeated.",
+        ),
+    ] = None,
+    schema: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Pydantic model used to coerce the columns, as module:Model "
+            "or path/to/file.py:Model.",
+        ),
+    ] = None,
+    compression: Annotated[
+        ParquetCompression, typer.Option(help="Parquet compression codec.")
+    ] = ParquetCompression.snappy,
+    compression_level: Annotated[
+        Optional[int], typer.Option(help="Compression level of the codec.")
+    ] = None,
+    row_group_size: Annotated[
+        int, typer.Option(min=1, help="Number of rows per parquet row group.")
+    ] = 128
+    * 1024,
+    dictionary: Annotated[
+        bool, typer.Option(help="Dictionary encode the columns.")
+    ] = True,
 ):
     """
     Convert csv or json files to parquet format for faster processing.
+
+    The input is streamed block by block and written one row group at a time,
+    so that memory does not grow with the size of the file. JSON files can hold
+    an array or newline-delimited values. They are parsed once and spilled to a
+    temporary Arrow file until the types of all their rows are known, so that
+    fields first seen late in the file are kept.
     """
+    import pyarrow as pa
+
+    from gaas_cli.content.parquet import gen_input_batches, write_parquet_stream
+    from gaas_cli.schema.arrow import parse_column_types
+    from gaas_cli.schema.coerce import SchemaCoercer, load_model
+
     if not input_file.exists():
         typer.echo(f"Error: Input file '{input_file}' does not exist.", err=True)
         raise typer.Exit(code=1)
 
-    if input_file.suffix.lower() == ".csv":
-        df = pd.read_csv(input_file)
-    elif input_file.suffix.lower() == ".json":
-        console.print("Reading JSON file...")
+    try:
+        column_types = parse_column_types(column_type)
+    except (KeyError, ValueError) as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(code=1) from None
+
+    coercer = None
+    if schema is not None:
         try:
-            df = pd.read_json(input_file)
-        except ValueError:
-            # Fallback for newline-delimited JSON payloads
-            df = pd.read_json(input_file, lines=True)
-    else:
-        typer.echo("Error: Input file must be a CSV or JSON file.", err=True)
-        raise typer.Exit(code=1)
+            coercer = SchemaCoercer(load_model(schema))
+        except (ImportError, ValueError) as e:
+            typer.echo(f"Error: Cannot load schema: {e}", err=True)
+            raise typer.Exit(code=1) from None
 
     if output_file is None:
         output_file = input_file.with_suffix(".parquet")
 
     try:
-        df.to_parquet(output_file, index=False)
-        typer.echo(f"Successfully converted '{input_file}' to '{output_file}'")
-    except Exception as e:
+        record_batches = gen_input_batches(input_file, csv_block_size, column_types)
+        count_rows = write_parquet_stream(
+            record_batches,
+            output_file,
+            compression.value,
+            compression_level,
+            row_group_size,
+            dictionary,
+            coercer,
+        )
+    except (ValueError, pa.ArrowException) as e:
         typer.echo(f"Error converting file: {e}", err=True)
-        raise typer.Exit(code=1)
+        raise typer.Exit(code=1) from None
+
+    if coercer is not None:
+        for line in coercer.report():
+            console.print(f"[yellow]{line}[/yellow]")
+    typer.echo(
+        f"Successfully converted '{input_file}' to '{output_file}' ({count_rows} rows)"
+    )
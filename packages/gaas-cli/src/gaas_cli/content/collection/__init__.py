@@ -1,11 +1,63 @@
-import typer
-from typing import Annotated
-from pathlib import Path
 import csv
+import hashlib
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Annotated, Dict, Set
+
+import typer
+from rich.console import Console
+
+from gaas_cli.profiling import stage
+
+console = Console(stderr=True)
 
 app = typer.Typer(no_args_is_help=True)
 
+# File of the collection directory listing the files written by
+# create-from-csv, the only ones it may delete. Nuxt content ignores dotfiles.
+MANIFEST_NAME = ".gaas-collection.json"
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def write_if_changed(file_path: Path, content: bytes) -> str:
+    """
+    Write `content` to a file unless it already has the same content hash.
+
+    Returns:
+      str: created, updated or unchanged.
+    """
+    try:
+        if file_path.stat().st_size == len(content) and content_hash(
+            file_path.read_bytes()
+        ) == content_hash(content):
+            return "unchanged"
+        status = "updated"
+    except FileNotFoundError:
+        status = "created"
+    with stage("write", len(content), 1):
+        file_path.write_bytes(content)
+    return status
+
+
+def read_manifest(output_dir: Path) -> Set[str]:
+    """Names of the files previously written to a collection directory."""
+    try:
+        return set(json.loads((output_dir / MANIFEST_NAME).read_text())["files"])
+    except FileNotFoundError:
+        return set()
+
+
+def write_manifest(output_dir: Path, filenames: Set[str]):
+    manifest = output_dir / MANIFEST_NAME
+    partial = manifest.with_name(manifest.name + ".tmp")
+    partial.write_text(json.dumps({"files": sorted(filenames)}, indent=2) + "\n")
+    partial.replace(manifest)
+
 
 @app.command()
 def create_from_csv(
@@ -18,10 +70,26 @@ def create_from_csv(
         str, typer.Option(help="Name of the column id that will be used as filename")
     ] = "id",
     output: Path = Path("content/collection"),
+    concurrency: Annotated[
+        int, typer.Option(min=1, help="Number of files written concurrently.")
+    ] = 8,
+    prune: Annotated[
+        bool,
+        typer.Option(
+            "--prune",
+            help="Delete the files written by a previous run for rows that "
+            "disappeared from the CSV file.",
+        ),
+    ] = False,
 ):
     """
     Create a nuxt content collection from a CSV file.
-    This command reads a CSV file and for each row, create a json file in the content collection.
+    This command reads a CSV file and for each row, create a json file in the
+    content collection.
+    Only the files whose content changed are written. The files written are
+    listed in a manifest of the collection directory: with --prune, those of
+    the rows that disappeared from the CSV file are deleted. Other files of
+    the directory are never deleted.
     """
 
     with open(file, newline="") as csvfile:  # Ensure the file is opened correctly
@@ -30,10 +98,38 @@ def create_from_csv(
         output_dir = output / name
         if not output_dir.exists():
             output_dir.mkdir(parents=True, exist_ok=True)
-        for row in csv_reader:
-            # Create a filename based on the name field in the row
-            filename = f"{row.get(id)}.json"
-            file_path = output_dir / filename
-            # Write the row data to a JSON file
-            with open(file_path, "w") as json_file:
-                json_file.write(json.dumps(row))
+        # The last row wins when several rows have the same id
+        contents: Dict[str, bytes] = {}
+        with stage("parse") as call:
+            for row in csv_reader:
+                # Create a filename based on the name field in the row
+                filename = f"{row.get(id)}.json"
+                contents[filename] = json.dumps(row).encode()
+                call.items += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        statuses = Counter(
+            pool.map(
+                lambda item: write_if_changed(output_dir / item[0], item[1]),
+                contents.items(),
+            )
+        )
+
+    stale = read_manifest(output_dir) - contents.keys()
+    if prune:
+        for filename in stale:
+            (output_dir / filename).unlink(missing_ok=True)
+            statuses["deleted"] += 1
+        stale = set()
+    # Stale files stay in the manifest so that a later --prune deletes them
+    write_manifest(output_dir, contents.keys() | stale)
+
+    console.print(
+        f"{statuses['created']} created, {statuses['updated']} updated, "
+        f"{statuses['deleted']} deleted, {statuses['unchanged']} unchanged"
+    )
+    if stale:
+        console.print(
+            f"{len(stale)} file(s) of rows no longer in the CSV file kept, "
+            "delete them with --prune"
+        )
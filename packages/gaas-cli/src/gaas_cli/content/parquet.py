@@ -0,0 +1,131 @@
+from itertools import batched
+from pathlib import Path
+from typing import Callable, Dict, Generator, Iterable, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from gaas_cli.profiling import gen_staged, stage
+from gaas_cli.schema.arrow import (
+    documents_to_table,
+    gen_ndjson_record_batches,
+    gen_rebatched,
+    gen_unified_batches,
+    open_csv,
+)
+from gaas_cli.schema.json_stream import gen_json_values
+
+# Number of bytes read to detect whether a JSON file holds an array
+JSON_SNIFF_SIZE = 4096
+
+# Number of JSON array elements converted to a record batch at once
+JSON_ARRAY_BATCH_SIZE = 10000
+
+
+def is_json_array(path: Path) -> bool:
+    """
+    Whether a JSON file holds a top-level array rather than newline-delimited
+    values, from its first non-whitespace character.
+    """
+    with open(path, "rb") as f:
+        while chunk := f.read(JSON_SNIFF_SIZE):
+            stripped = chunk.lstrip().removeprefix(b"\xef\xbb\xbf").lstrip()
+            if stripped:
+                return stripped.startswith(b"[")
+    return False
+
+
+def gen_json_array_batches(
+    path: Path,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+    batch_size: int = JSON_ARRAY_BATCH_SIZE,
+) -> Generator[pa.RecordBatch, None, None]:
+    """
+    Generator of the record batches of a JSON array, parsed incrementally.
+    Each batch is typed from its own elements, the types of `column_types`
+    replace the inferred ones.
+    """
+    with open(path, "r") as f:
+        for values in batched(gen_json_values(f), batch_size, strict=False):
+            yield from documents_to_table(list(values), column_types).to_batches()
+
+
+def gen_input_batches(
+    input_file: Path,
+    block_size: Optional[int] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> Iterable[pa.RecordBatch]:
+    """
+    Stream the record batches of a CSV, JSON array or NDJSON file, block by
+    block.
+
+    The types of a CSV file are inferred from its first block. JSON files are
+    parsed once and their batches cast to the schema of all their rows, so
+    that fields missing from the first rows are kept.
+
+    Raises:
+      ValueError: The file is not a CSV or JSON file, or a JSON field does
+        not match its type in `column_types`.
+    """
+    suffix = input_file.suffix.lower()
+    if suffix == ".csv":
+        return open_csv(input_file, block_size, column_types)
+    if suffix in (".json", ".ndjson", ".jsonl"):
+        if is_json_array(input_file):
+            record_batches = gen_json_array_batches(input_file, column_types)
+        else:
+            record_batches = gen_ndjson_record_batches(
+                input_file, block_size, column_types
+            )
+        return gen_unified_batches(record_batches)
+    raise ValueError("Input file must be a CSV or JSON file.")
+
+
+def write_parquet_stream(
+    record_batches: Iterable[pa.RecordBatch],
+    output_file: Path,
+    compression: str = "snappy",
+    compression_level: Optional[int] = None,
+    row_group_size: int = 128 * 1024,
+    use_dictionary: bool = True,
+    transform: Optional[Callable[[pa.Table], pa.Table]] = None,
+) -> int:
+    """
+    Write a stream of record batches to a parquet file, one row group of
+    `row_group_size` rows at a time.
+
+    The schema of the file is the schema of the first row group, the next row
+    groups are cast to it.
+
+    Returns:
+      int: The number of rows written.
+    """
+    writer = None
+    count_rows = 0
+    try:
+        tables = gen_rebatched(record_batches, row_group_size)
+        for table in gen_staged("parse", tables, lambda table: table.num_rows):
+            if transform is not None:
+                table = transform(table)
+            if writer is None:
+                writer = pq.ParquetWriter(
+                    output_file,
+                    table.schema,
+                    compression=compression,
+                    compression_level=compression_level,
+                    use_dictionary=use_dictionary,
+                )
+            elif table.schema != writer.schema:
+                table = table.cast(writer.schema)
+            with stage("write", table.nbytes, table.num_rows):
+                writer.write_table(table, row_group_size=row_group_size)
+            count_rows += table.num_rows
+    except Exception:
+        if writer is not None:
+            writer.close()
+        output_file.unlink(missing_ok=True)
+        raise
+    if writer is None:
+        raise ValueError("Input file has no rows.")
+    writer.close()
+    return count_rows
@@ -0,0 +1,81 @@
+import importlib
+from difflib import get_close_matches
+from typing import Dict, List, Optional, Tuple
+
+import typer
+from typer.core import TyperGroup
+
+# Typer may vendor its own copy of click, whose usage errors are the parent
+# class of `typer.BadParameter`
+UsageError = typer.BadParameter.__base__
+
+
+class LazyTyperGroup(TyperGroup):
+    """
+    Typer group whose sub-apps are imported only when one of their commands
+    is invoked.
+
+    `lazy_subcommands` maps each subcommand name to the `module:attribute`
+    path of its Typer app and its help text, which is displayed without
+    importing the module.
+    """
+
+    lazy_subcommands: Dict[str, Tuple[str, str]] = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.formatting_help = False
+
+    def list_commands(self, ctx: typer.Context):
+        return super().list_commands(ctx) + [
+            name for name in self.lazy_subcommands if name not in self.commands
+        ]
+
+    def get_command(self, ctx: typer.Context, cmd_name: str) -> Optional[TyperGroup]:
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            import_path, help = self.lazy_subcommands[cmd_name]
+            if self.formatting_help:
+                # Listing the subcommands only requires their help text
+                return TyperGroup(name=cmd_name, help=help)
+            self.commands[cmd_name] = load_typer_group(cmd_name, import_path, help)
+        return super().get_command(ctx, cmd_name)
+
+    def resolve_command(self, ctx: typer.Context, args: List[str]):
+        try:
+            return super().resolve_command(ctx, args)
+        except UsageError as e:
+            # Typer only suggests the commands already loaded
+            if self.suggest_commands and args and "Did you mean" not in e.message:
+                matches = get_close_matches(args[0], self.list_commands(ctx))
+                if matches:
+                    suggestions = ", ".join(f"{match!r}" for match in matches)
+                    e.message = f"{e.message.rstrip('.')}. Did you mean {suggestions}?"
+            raise
+
+    def format_help(self, ctx: typer.Context, formatter):
+        self.formatting_help = True
+        try:
+            return super().format_help(ctx, formatter)
+        finally:
+            self.formatting_help = False
+
+
+def load_typer_group(name: str, import_path: str, help: str) -> TyperGroup:
+    module_name, _, attribute = import_path.partition(":")
+    sub_app: typer.Typer = getattr(importlib.import_module(module_name), attribute)
+    command = typer.main.get_group(sub_app)
+    command.name = name
+    command.help = help
+    return command
+
+
+def lazy_group(subcommands: Dict[str, Tuple[str, str]]) -> type[LazyTyperGroup]:
+    """
+    Group class, to be given as `cls` to `typer.Typer`, loading the given
+    subcommands lazily.
+
+    Args:
+      subcommands: Map of each subcommand name to the `module:attribute` path
+        of its Typer app and its help text.
+    """
+    return type("LazyTyperGroup", (LazyTyperGroup,), {"lazy_subcommands": subcommands})
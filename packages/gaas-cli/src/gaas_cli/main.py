@@ -1,12 +1,11 @@
-from typing import Optional
+from pathlib import Path
+from typing import Annotated, Optional
 
 import typer
 from rich.console import Console
 
 # from dotenv import dotenv_values
-import gaas_cli.biblio as biblio
-import gaas_cli.content as content
-import gaas_cli.meili as meili
+from gaas_cli.lazy import lazy_group
 
 # Get version from _version.py (generated at build time by uv-dynamic-versioning)
 try:
@@ -21,23 +20,20 @@ console = Console(stderr=True)
 # print(config)
 
 
-app = typer.Typer(no_args_is_help=True)
-app.add_typer(
-    biblio.app,
-    name="biblio",
-    help="Manage bibliographic data.",
-)
-
-app.add_typer(
-    content.app,
-    name="content",
-    help="Manage Nuxt content (Wiki).",
-)
-
-app.add_typer(
-    meili.app,
-    name="meili",
-    help="Manage MeiliSearch instances and indexes.",
+# Subcommands are imported only when invoked, so that the help and version do
+# not pay for their dependencies
+app = typer.Typer(
+    no_args_is_help=True,
+    cls=lazy_group(
+        {
+            "biblio": ("gaas_cli.biblio:app", "Manage bibliographic data."),
+            "content": ("gaas_cli.content:app", "Manage Nuxt content (Wiki)."),
+            "meili": (
+                "gaas_cli.meili:app",
+                "Manage MeiliSearch instances and indexes.",
+            ),
+        }
+    ),
 )
 
 # @app.command()
@@ -63,14 +59,40 @@ def main(
         is_eager=True,
         help="Show version and exit.",
     ),
+    profile: Annotated[
+        bool,
+        typer.Option(
+            "--profile",
+            help="Print the time, bytes and memory of each stage of the command.",
+        ),
+    ] = False,
+    trace_out: Annotated[
+        Optional[Path],
+        typer.Option(help="Write the stages of the command to a JSON trace file."),
+    ] = None,
+    cprofile_out: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="Run the command under cProfile (main thread) and write the "
+            "statistics to a pstats file. Implies tracing the stages.",
+        ),
+    ] = None,
 ):
     """
     Tool kit to manage gaas related tasks.
     """
+    from dotenv import load_dotenv
+
+    # Run before the options of the subcommand are read from the environment
+    load_dotenv()  # take environment variables
     console.print(f"About to execute command: {ctx.invoked_subcommand}")
     if verbose:
         console.print("Verbose mode is enabled.")
     ctx.obj = {"verbose": verbose}
+    if profile or trace_out is not None or cprofile_out is not None:
+        from gaas_cli.profiling import start_profiling
+
+        start_profiling(ctx, profile, trace_out, cprofile_out)
 
 
 if __name__ == "__main__":
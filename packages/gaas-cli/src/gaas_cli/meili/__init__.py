@@ -1,37 +1,24 @@
 from typing import Annotated
+
 import typer
-import meilisearch
 from rich.console import Console
-import gaas_cli.meili.index as index
-import gaas_cli.meili.document as document
-import gaas_cli.meili.task as task
-import gaas_cli.meili.key as key
-
-app = typer.Typer(no_args_is_help=True)
-
-app.add_typer(
-    index.app,
-    name="index",
-    help="Manage MeiliSearch indexes.",
-)
-
-app.add_typer(
-    document.app,
-    name="document",
-    help="Manage MeiliSearch documents.",
-)
 
-app.add_typer(
-    task.app,
-    name="task",
-    help="Manage MeiliSearch tasks.",
-)
-
-
-app.add_typer(
-    key.app,
-    name="key",
-    help="Manage MeiliSearch API keys.",
+from gaas_cli.lazy import lazy_group
+
+app = typer.Typer(
+    no_args_is_help=True,
+    cls=lazy_group(
+        {
+            "index": ("gaas_cli.meili.index:app", "Manage MeiliSearch indexes."),
+            "document": (
+                "gaas_cli.meili.document:app",
+                "Manage MeiliSearch documents.",
+            ),
+            "task": ("gaas_cli.meili.task:app", "Manage MeiliSearch tasks."),
+            "key": ("gaas_cli.meili.key:app", "Manage MeiliSearch API keys."),
+            "search": ("gaas_cli.meili.search:app", "Benchmark MeiliSearch searches."),
+        }
+    ),
 )
 
 console = Console()
@@ -48,5 +35,7 @@ def main(
     ] = "MASTER_KEY",
 ):
     """Initialize MeiliSearch client."""
+    import meilisearch
+
     client = meilisearch.Client(host, key)
-    ctx.obj = {"client": client, "host": host}
+    ctx.obj = {"client": client, "host": host, "key": key}
@@ -0,0 +1,22 @@
+import threading
+from typing import Callable
+
+import meilisearch
+
+
+def thread_local_client(host: str, key: str) -> Callable[[], meilisearch.Client]:
+    """
+    Return a function giving one MeiliSearch client per calling thread.
+
+    `meilisearch.Client` mutates its request headers on every call, so a single
+    instance must not be shared between concurrent threads.
+    """
+    local = threading.local()
+
+    def get_client() -> meilisearch.Client:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = meilisearch.Client(host, key)
+        return client
+
+    return get_client
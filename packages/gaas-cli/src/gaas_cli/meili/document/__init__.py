@@ -1,25 +1,59 @@
-from enum import Enum
+import sys
+import time
+import warnings
+from itertools import batched
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import (
+    Annotated,
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import pyarrow as pa
+import requests
+import typer
+from meilisearch.errors import MeilisearchApiError
+from meilisearch.models.task import Task, TaskInfo
+from rich.console import Console
 
+from gaas_cli.meili.client import thread_local_client
 from gaas_cli.meili.document.loader import (
+    Transform,
+    gen_csv_batches,
+    gen_json_batches,
+    gen_parquet_batches,
+    gen_parquet_ndjson_batches,
     load_csv_documents,
     load_json_documents,
     load_parquet_documents,
 )
-import requests
-import typer
-from rich.console import Console
+from gaas_cli.meili.document.manifest import (
+    commit_manifest,
+    gen_changed_batches,
+    gen_removed_keys,
+    open_manifest,
+)
+from gaas_cli.meili.document.upload import Batch, Compressor, upload_batches
+from gaas_cli.meili.formats import ContentEncoding, DocumentFormat, ExportFormat
+from gaas_cli.meili.settings import apply_settings
+from gaas_cli.meili.task.wait import wait_for_tasks
+from gaas_cli.profiling import stage
+from gaas_cli.schema.arrow import parse_column_types
+from gaas_cli.schema.coerce import SchemaCoercer, load_model
+from gaas_cli.schema.parquet import ParquetCompression
 
 console = Console(stderr=True)
 
 app = typer.Typer(no_args_is_help=True)
 
-
-class DocumentFormat(str, Enum):
-    json = "json"
-    csv = "csv"
-    parquet = "parquet"
+# Maximum number of primary keys sent in a single deletion request
+DELETE_BATCH_SIZE = 10000
 
 
 @app.command()
@@ -29,7 +63,8 @@ def add(
     primary_key: Annotated[
         Optional[str],
         typer.Option(
-            help="Primary key for the documents. If not provided, uses 'id' as the default."
+            help="Primary key for the documents. If not provided, uses 'id' as "
+            "the default."
         ),
     ] = "id",
     format: Annotated[
@@ -43,38 +78,524 @@ def add(
             "Use '-' or omit to read from stdin."
         ),
     ] = None,
+    chunk_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1,
+            help="Stream the documents and send them in batches of N documents "
+            "instead of loading the whole file in memory.",
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of batches uploaded concurrently."),
+    ] = 4,
+    wait: Annotated[
+        bool,
+        typer.Option(
+            "--wait",
+            help="Wait for all the enqueued tasks to finish and report the "
+            "indexing throughput and failed tasks.",
+        ),
+    ] = False,
+    csv_block_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1, help="Size in bytes of the blocks parsed by the CSV reader."
+        ),
+    ] = None,
+    column_type: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            help="Type of a CSV column as name=type with an Arrow type alias "
+            "(e.g. price=float64). Can be repeated.",
+        ),
+    ] = None,
+    schema: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Pydantic model used to coerce the document columns, as "
+            "module:Model or path/to/file.py:Model.",
+        ),
+    ] = None,
+    ndjson: Annotated[
+        bool,
+        typer.Option(
+            "--ndjson",
+            help="Serialize parquet record batches straight to NDJSON with Arrow "
+            "instead of converting rows to Python dicts (parquet only).",
+        ),
+    ] = False,
+    compress: Annotated[
+        Optional[ContentEncoding],
+        typer.Option(
+            help="Compress the request bodies: gzip, deflate or br (requires "
+            "the brotli extra, e.g. pip install 'gaas-cli[brotli]').",
+        ),
+    ] = None,
+    compress_level: Annotated[
+        Optional[int],
+        typer.Option(
+            help="Compression level: 0-9 for gzip and deflate, 0-11 for br. "
+            "Defaults to 6 for gzip, 5 for br and the zlib default for deflate.",
+        ),
+    ] = None,
 ):
     """Add documents to a specific MeiliSearch index."""
     client = ctx.obj["client"]
+    coercer = load_schema_coercer(schema)
+    compressor = None
+    if compress is not None:
+        try:
+            compressor = Compressor(compress.value, compress_level)
+        except (ImportError, ValueError) as e:
+            console.print(f"[red]Cannot compress the uploads: {e}[/red]")
+            raise typer.Exit(code=1) from None
 
-    # Read documents from file or stdin
-    if format == DocumentFormat.json:
-        docs = load_json_documents(documents)
-    elif format == DocumentFormat.csv:
-        docs = load_csv_documents(documents)
-    elif format == DocumentFormat.parquet:
-        docs = load_parquet_documents(documents)
+    if ndjson:
+        if format != DocumentFormat.parquet:
+            console.print("[red]--ndjson is only supported for parquet files[/red]")
+            raise typer.Exit(code=1)
+        batches = gen_parquet_ndjson_batches(documents, chunk_size, coercer)
     else:
-        console.print(f"[red]Unsupported document format: {format}[/red]")
+        batches = read_document_batches(
+            format,
+            documents,
+            chunk_size,
+            csv_block_size,
+            parse_csv_column_types(column_type),
+            coercer,
+        )
+    start = time.perf_counter()
+    tasks, count_documents, upload_errors = send_batches(
+        ctx, index_name, batches, primary_key, concurrency, compressor
+    )
+    report_coercion(coercer)
+    if wait and tasks:
+        failed_tasks = wait_and_report(client, tasks, count_documents, start)
+        if failed_tasks:
+            raise typer.Exit(code=1)
+    if upload_errors:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def sync(
+    ctx: typer.Context,
+    index_name: str,
+    primary_key: Annotated[
+        str,
+        typer.Option(
+            help="Primary key for the documents. If not provided, uses 'id' as "
+            "the default."
+        ),
+    ] = "id",
+    format: Annotated[
+        DocumentFormat,
+        typer.Option(help="Format of the documents: json, parquet, or csv"),
+    ] = DocumentFormat.json,
+    documents: Annotated[
+        Optional[Path],
+        typer.Argument(
+            help="Path to file containing the full set of documents. "
+            "Use '-' or omit to read from stdin."
+        ),
+    ] = None,
+    manifest: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="SQLite manifest of the documents already sent to the index. "
+            "Defaults to '<index_name>.manifest.sqlite'."
+        ),
+    ] = None,
+    chunk_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1,
+            help="Stream the documents and send them in batches of N documents "
+            "instead of loading the whole file in memory.",
+        ),
+    ] = None,
+    csv_block_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1, help="Size in bytes of the blocks parsed by the CSV reader."
+        ),
+    ] = None,
+    column_type: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            help="Type of a CSV column as name=type with an Arrow type alias "
+            "(e.g. price=float64). Can be repeated.",
+        ),
+    ] = None,
+    schema: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Pydantic model used to coerce the document columns, as "
+            "module:Model or path/to/file.py:Model.",
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of batches uploaded concurrently."),
+    ] = 4,
+):
+    """
+    Synchronize an index with a set of documents.
+
+    Only the documents added or changed since the last sync are sent, and the
+    documents that disappeared from the input are deleted from the index. The
+    manifest is updated once all the tasks succeeded.
+    """
+    client = ctx.obj["client"]
+    if manifest is None:
+        manifest = Path(f"{index_name}.manifest.sqlite")
+
+    coercer = load_schema_coercer(schema)
+    conn = open_manifest(manifest)
+    try:
+        batches = gen_changed_batches(
+            conn,
+            read_document_batches(
+                format,
+                documents,
+                chunk_size,
+                csv_block_size,
+                parse_csv_column_types(column_type),
+                coercer,
+            ),
+            primary_key,
+        )
+        start = time.perf_counter()
+        tasks, count_documents, upload_errors = send_batches(
+            ctx, index_name, batches, primary_key, concurrency
+        )
+        report_coercion(coercer)
+        if upload_errors:
+            raise typer.Exit(code=1)
+
+        count_removed = 0
+        index = client.index(index_name)
+        for keys in batched(gen_removed_keys(conn), DELETE_BATCH_SIZE, strict=False):
+            with warnings.catch_warnings():
+                # Deleting by filter would require the primary key to be filterable
+                warnings.simplefilter("ignore", DeprecationWarning)
+                tasks.append(index.delete_documents(list(keys)))
+            count_removed += len(keys)
+
+        (count_seen,) = conn.execute("SELECT COUNT(*) FROM seen").fetchone()
+        console.print(
+            f"{count_documents} documents added or updated, {count_removed} deleted, "
+            f"{count_seen - count_documents} unchanged"
+        )
+        if tasks:
+            failed_tasks = wait_and_report(client, tasks, count_documents, start)
+            if failed_tasks:
+                console.print("[red]Manifest not updated[/red]")
+                raise typer.Exit(code=1)
+        commit_manifest(conn)
+    finally:
+        conn.close()
+
+
+@app.command()
+def export(
+    ctx: typer.Context,
+    index_name: Annotated[str, typer.Argument(help="Name of the exported index")],
+    output: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--output",
+            "-o",
+            help="File receiving the documents. NDJSON is written to stdout "
+            "if not given.",
+        ),
+    ] = None,
+    format: Annotated[
+        ExportFormat, typer.Option(help="Format of the output: ndjson or parquet")
+    ] = ExportFormat.ndjson,
+    field: Annotated[
+        Optional[List[str]],
+        typer.Option(help="Field of the documents exported. Can be repeated."),
+    ] = None,
+    filter: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            help="Filter expression selecting the documents exported. When "
+            "repeated, each filter is a partition of the documents paged on its "
+            "own, which keeps the offsets small on large indexes. The partitions "
+            "must not overlap.",
+        ),
+    ] = None,
+    page_size: Annotated[
+        int, typer.Option(min=1, help="Number of documents fetched per request.")
+    ] = 1000,
+    concurrency: Annotated[
+        int, typer.Option(min=1, help="Number of pages fetched concurrently.")
+    ] = 4,
+    compression: Annotated[
+        ParquetCompression, typer.Option(help="Parquet compression codec.")
+    ] = ParquetCompression.snappy,
+    row_group_size: Annotated[
+        int, typer.Option(min=1, help="Number of rows per parquet row group.")
+    ] = 64
+    * 1024,
+):
+    """
+    Export the documents of an index to NDJSON or parquet.
+
+    Pages of documents are fetched concurrently and written as they arrive,
+    so that memory stays bounded whatever the size of the index. The parquet
+    schema is inferred from the first page of documents. Documents added or
+    deleted during the export can be missed or exported twice.
+    """
+    from gaas_cli.content.parquet import write_parquet_stream
+    from gaas_cli.meili.document.export import (
+        count_documents,
+        gen_document_pages,
+        gen_page_parameters,
+        gen_page_record_batches,
+        write_ndjson_pages,
+    )
+
+    if format == ExportFormat.parquet and output is None:
+        console.print("[red]Parquet export requires --output[/red]")
         raise typer.Exit(code=1)
+    client = ctx.obj["client"]
+    try:
+        index = client.get_index(index_name)
+        partitions = [
+            (partition, count_documents(index, partition))
+            for partition in filter or [None]
+        ]
+    except MeilisearchApiError as e:
+        console.print(f"[red]Cannot export index '{index_name}': {e.message}[/red]")
+        raise typer.Exit(code=1) from None
+    total = sum(count for _, count in partitions)
+    console.print(
+        f"Exporting {total} documents of index '{index_name}' "
+        f"in {len(partitions)} partition(s)"
+    )
+
+    pages = gen_document_pages(
+        thread_local_client(ctx.obj["host"], ctx.obj["key"]),
+        index_name,
+        gen_page_parameters(partitions, page_size, field),
+        concurrency,
+    )
+    start = time.perf_counter()
+    dropped_fields: Set[str] = set()
+    try:
+        if format == ExportFormat.ndjson:
+            if output is None:
+                count = write_ndjson_pages(pages, sys.stdout)
+            else:
+                with open(output, "w") as f:
+                    count = write_ndjson_pages(pages, f)
+        elif total == 0:
+            console.print("No documents to export")
+            return
+        else:
+            count = write_parquet_stream(
+                gen_page_record_batches(pages, dropped_fields),
+                output,
+                compression.value,
+                row_group_size=row_group_size,
+            )
+    except MeilisearchApiError as e:
+        console.print(f"[red]Cannot fetch documents: {e.message}[/red]")
+        raise typer.Exit(code=1) from None
+    except (ValueError, pa.ArrowException) as e:
+        console.print(
+            f"[red]Cannot convert documents to parquet: {e}. Select the fields "
+            "with --field or export to ndjson.[/red]"
+        )
+        raise typer.Exit(code=1) from None
+    elapsed = time.perf_counter() - start
+
+    if dropped_fields:
+        console.print(
+            "[yellow]Fields absent from the first page left out of the parquet "
+            f"file: {', '.join(sorted(dropped_fields))}[/yellow]"
+        )
+    console.print(
+        f"Exported {count} documents in {elapsed:.2f}s "
+        f"({count / elapsed:.0f} docs/s)"
+    )
+
+
+def parse_csv_column_types(
+    column_type: Optional[List[str]],
+) -> Dict[str, pa.DataType]:
+    try:
+        return parse_column_types(column_type)
+    except (KeyError, ValueError) as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1) from None
+
+
+def load_schema_coercer(schema: Optional[str]) -> Optional[SchemaCoercer]:
+    if schema is None:
+        return None
+    try:
+        return SchemaCoercer(load_model(schema))
+    except (ImportError, ValueError) as e:
+        console.print(f"[red]Cannot load schema: {e}[/red]")
+        raise typer.Exit(code=1) from None
+
+
+def report_coercion(coercer: Optional[SchemaCoercer]):
+    if coercer is None:
+        return
+    for line in coercer.report():
+        console.print(f"[yellow]{line}[/yellow]")
+
+
+def read_document_batches(
+    format: DocumentFormat,
+    documents: Optional[Path],
+    chunk_size: Optional[int],
+    csv_block_size: Optional[int] = None,
+    csv_column_types: Optional[Dict[str, pa.DataType]] = None,
+    transform: Optional[Transform] = None,
+) -> Iterable[List[Dict[Hashable, Any]]]:
+    """
+    Read documents from file or stdin, as a single batch or streamed in
+    batches of `chunk_size` documents, applying `transform` to each batch.
+    """
+    if chunk_size is not None:
+        if format == DocumentFormat.json:
+            return gen_json_batches(documents, chunk_size, transform)
+        elif format == DocumentFormat.csv:
+            return gen_csv_batches(
+                documents, chunk_size, csv_block_size, csv_column_types, transform
+            )
+        elif format == DocumentFormat.parquet:
+            return gen_parquet_batches(documents, chunk_size, transform)
+    else:
+        try:
+            with stage("parse"):
+                if format == DocumentFormat.json:
+                    return [load_json_documents(documents, transform)]
+                elif format == DocumentFormat.csv:
+                    return [
+                        load_csv_documents(
+                            documents, csv_block_size, csv_column_types, transform
+                        )
+                    ]
+                elif format == DocumentFormat.parquet:
+                    return [load_parquet_documents(documents, transform)]
+        except ValueError as e:
+            console.print(f"[red]Cannot read the documents: {e}[/red]")
+            raise typer.Exit(code=1) from None
+    console.print(f"[red]Unsupported document format: {format}[/red]")
+    raise typer.Exit(code=1)
+
 
-    response = client.index(index_name).add_documents(docs, primary_key)
-    console.print(f"Add documents response: {response}")
+def send_batches(
+    ctx: typer.Context,
+    index_name: str,
+    batches: Iterable[Batch],
+    primary_key: Optional[str],
+    concurrency: int,
+    compressor: Optional[Compressor] = None,
+) -> Tuple[List[TaskInfo], int, List[Exception]]:
+    """
+    Upload batches of documents and print the enqueued tasks and upload errors.
+
+    Returns:
+      tuple: The enqueued tasks, the number of documents enqueued and the
+        upload errors.
+    """
+    start = time.perf_counter()
+    try:
+        results = upload_batches(
+            thread_local_client(ctx.obj["host"], ctx.obj["key"]),
+            index_name,
+            batches,
+            primary_key,
+            concurrency=concurrency,
+            compressor=compressor,
+        )
+    except ValueError as e:
+        # Batches are read lazily while uploading
+        console.print(f"[red]Cannot read the documents: {e}[/red]")
+        raise typer.Exit(code=1) from None
+    tasks = []
+    upload_errors = []
+    count_documents = 0
+    for count, result in results:
+        if isinstance(result, Exception):
+            upload_errors.append(result)
+            continue
+        count_documents += count
+        tasks.append(result)
+        console.print(f"Add {count} documents response: {result}")
+    elapsed = time.perf_counter() - start
+    console.print(
+        f"Enqueued {count_documents} documents in {len(tasks)} task(s) "
+        f"in {elapsed:.2f}s ({count_documents / elapsed:.0f} docs/s)"
+    )
+    if compressor is not None:
+        console.print(compressor.report())
+    for error in upload_errors:
+        console.print(f"[red]Upload failed: {error}[/red]")
+    return tasks, count_documents, upload_errors
+
+
+def wait_and_report(
+    client, tasks: List[TaskInfo], count_documents: int, start: float
+) -> List[Task]:
+    """
+    Wait for the tasks to finish, print the indexing throughput since `start`
+    and the failed tasks.
+
+    Returns:
+      list: The tasks that did not succeed.
+    """
+    finished = wait_for_tasks(client, [task.task_uid for task in tasks])
+    elapsed = time.perf_counter() - start
+    failed_tasks = [task for task in finished if task.status != "succeeded"]
+    console.print(
+        f"Indexed {count_documents} documents in {elapsed:.2f}s "
+        f"({count_documents / elapsed:.0f} docs/s)"
+    )
+    for task in failed_tasks:
+        console.print(f"[red]Task {task.uid} {task.status}: {task.error}[/red]")
+    return failed_tasks
+
+
+def update_dataset_settings(index, settings: dict):
+    """
+    Apply the settings of a sample dataset in a single update, skipped when
+    the index already has them so that adding the dataset again does not
+    reindex it twice.
+    """
+    changes, task = apply_settings(index, settings)
+    if task is None:
+        console.print(f"Settings of index '{index.uid}' are up to date")
+    else:
+        console.print(
+            f"Updating settings {', '.join(changes)} of index '{index.uid}' "
+            f"(task {task.task_uid})"
+        )
 
 
 @app.command()
 def add_movies(ctx: typer.Context):
     client = ctx.obj["client"]
     index_name = "movies"
-    client.index(index_name).update_settings(
+    update_dataset_settings(
+        client.index(index_name),
         {
             "filterableAttributes": [
                 "genres",
             ],
             "sortableAttributes": ["release_date", "title", "genres"],
-        }
+            "pagination": {"maxTotalHits": 40000},
+        },
     )
-    client.index(index_name).update_pagination_settings({"maxTotalHits": 40000})
     url = "https://raw.githubusercontent.com/meilisearch/datasets/main/datasets/movies/movies.json"
     console.print(f"Downloading sample movies data from {url}...")
     response = requests.get(url)
@@ -90,7 +611,8 @@ def add_movies(ctx: typer.Context):
 def add_books(ctx: typer.Context):
     client = ctx.obj["client"]
     index_name = "books"
-    client.index(index_name).update_settings(
+    update_dataset_settings(
+        client.index(index_name),
         {
             "filterableAttributes": [
                 "author",
@@ -101,9 +623,9 @@ def add_books(ctx: typer.Context):
                 "details.rating",
             ],
             "sortableAttributes": ["title", "author", "isbn13"],
-        }
+            "pagination": {"maxTotalHits": 40000},
+        },
     )
-    client.index(index_name).update_pagination_settings({"maxTotalHits": 40000})
     url = "https://raw.githubusercontent.com/meilisearch/datasets/main/datasets/books/books.json"
     console.print(f"Downloading sample books data from {url}...")
     response = requests.get(url)
@@ -124,7 +646,8 @@ def add_books(ctx: typer.Context):
 def add_world_cities(ctx: typer.Context):
     client = ctx.obj["client"]
     index_name = "world_cities"
-    client.index(index_name).update_settings(
+    update_dataset_settings(
+        client.index(index_name),
         {
             "filterableAttributes": [
                 "country",
@@ -139,16 +662,13 @@ def add_world_cities(ctx: typer.Context):
                 "country",
                 "country_code",
             ],
-        }
-    )
-    # client.index(index_name).update_pagination_settings({"maxTotalHits": 40000})
-
-    client.index(index_name).update_faceting_settings(
-        {
-            "sortFacetValuesBy": {
-                "*": "count",
-            }
-        }
+            # "pagination": {"maxTotalHits": 40000},
+            "faceting": {
+                "sortFacetValuesBy": {
+                    "*": "count",
+                }
+            },
+        },
     )
 
     url = "https://raw.githubusercontent.com/meilisearch/datasets/main/datasets/world_cities/world-cities.json"
@@ -0,0 +1,147 @@
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, Generator, Iterable, List, Optional, Set
+
+import pyarrow as pa
+
+from gaas_cli.profiling import stage
+from gaas_cli.schema.arrow import documents_to_table
+
+# Number of pages fetched ahead of the writer, per concurrent request
+PAGES_AHEAD = 2
+
+
+def count_documents(index, filter: Optional[str] = None) -> int:
+    """Number of documents of an index matching `filter`."""
+    parameters: Dict[str, Any] = {"limit": 1}
+    if filter is not None:
+        parameters["filter"] = filter
+    with stage("network"):
+        return index.get_documents(parameters).total
+
+
+def gen_page_parameters(
+    partitions: Iterable[tuple],
+    page_size: int,
+    fields: Optional[List[str]] = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """
+    Generator of the parameters of the `get_documents` requests fetching the
+    pages of each partition.
+
+    Args:
+      partitions: (filter expression or None, number of documents) tuples.
+      page_size: Number of documents per page.
+      fields: Fields of the documents returned, all if None.
+    """
+    for filter, total in partitions:
+        for offset in range(0, total, page_size):
+            parameters: Dict[str, Any] = {"offset": offset, "limit": page_size}
+            if filter is not None:
+                parameters["filter"] = filter
+            if fields:
+                parameters["fields"] = fields
+            yield parameters
+
+
+def gen_document_pages(
+    get_client: Callable,
+    index_name: str,
+    pages: Iterable[Dict[str, Any]],
+    concurrency: int = 4,
+) -> Generator[List[Dict[str, Any]], None, None]:
+    """
+    Generator of the pages of documents of an index, fetched with concurrent
+    `get_documents` requests and yielded in order.
+
+    At most `concurrency * PAGES_AHEAD` pages are fetched ahead of the
+    consumer, so that memory stays bounded whatever the size of the index.
+
+    Args:
+      get_client: Function returning a MeiliSearch client for the current thread.
+      index_name: Name of the exported index.
+      pages: Parameters of the `get_documents` request of each page.
+      concurrency: Number of requests in flight at the same time.
+    """
+
+    def fetch(parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with stage("network") as call:
+            results = get_client().index(index_name).get_documents(parameters)
+            call.items = len(results.results)
+        return [dict(document) for document in results.results]
+
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            for parameters in pages:
+                pending.append(executor.submit(fetch, parameters))
+                if len(pending) >= concurrency * PAGES_AHEAD:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def write_ndjson_pages(pages: Iterable[List[Dict[str, Any]]], f: IO[str]) -> int:
+    """
+    Write pages of documents as newline-delimited JSON.
+
+    Returns:
+      int: The number of documents written.
+    """
+    count = 0
+    for page in pages:
+        with stage("serialize", items=len(page)) as call:
+            text = "".join(
+                json.dumps(document, ensure_ascii=False) + "\n" for document in page
+            )
+            call.bytes = len(text)
+        with stage("write", len(text), len(page)):
+            f.write(text)
+        count += len(page)
+    return count
+
+
+def gen_page_record_batches(
+    pages: Iterable[List[Dict[str, Any]]], dropped_fields: Set[str]
+) -> Generator[pa.RecordBatch, None, None]:
+    """
+    Generator of the record batches of pages of documents, all with the
+    schema inferred from the first page: every field found in any of its
+    documents, typed from all of its values. Columns with only nulls in the
+    first page are typed as strings.
+
+    Args:
+      pages: Pages of documents.
+      dropped_fields: Set receiving the fields absent from the first page,
+        which are not part of the schema and are left out.
+    Raises:
+      ValueError: The values of a field of the first page have incompatible
+        types.
+      pa.ArrowException: A value does not match the type of its column.
+    """
+    schema = None
+    for page in pages:
+        if not page:
+            continue
+        with stage("transform", items=len(page)):
+            if schema is None:
+                table = documents_to_table(page)
+                schema = pa.schema(
+                    (
+                        field.with_type(pa.string())
+                        if pa.types.is_null(field.type)
+                        else field
+                    )
+                    for field in table.schema
+                )
+                names = set(schema.names)
+                record_batch = table.cast(schema).combine_chunks().to_batches()[0]
+            else:
+                for document in page:
+                    dropped_fields.update(document.keys() - names)
+                record_batch = pa.RecordBatch.from_pylist(page, schema=schema)
+        yield record_batch
@@ -1,36 +1,186 @@
-from pathlib import Path
-from typing import Any, Dict, Hashable, List, Optional, TypeGuard
-import pyarrow.parquet as pq
 import json
 import sys
+from itertools import batched
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeGuard,
+)
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from gaas_cli.meili.document.serializer import record_batch_to_ndjson
+from gaas_cli.schema.arrow import (
+    documents_to_table,
+    gen_rebatched,
+    open_csv,
+    read_csv,
+)
+from gaas_cli.schema.json_stream import gen_json_values
+
+# Function applied to the Arrow tables before they are converted to documents
+Transform = Callable[[pa.Table], pa.Table]
 
 
 def is_path(file_path: Optional[Path]) -> TypeGuard[Path]:
     return not (file_path == "-" or file_path is None)
 
 
-def load_parquet_documents(file_path: Optional[Path]) -> List[Dict[Hashable, Any]]:
+def to_documents(
+    table: pa.Table | pa.RecordBatch, transform: Optional[Transform] = None
+) -> List[Dict[Hashable, Any]]:
+    if transform is not None:
+        if isinstance(table, pa.RecordBatch):
+            table = pa.Table.from_batches([table])
+        table = transform(table)
+    return table.to_pylist()
+
+
+def transform_documents(
+    documents: List[Dict[Hashable, Any]], transform: Optional[Transform] = None
+) -> List[Dict[Hashable, Any]]:
+    if transform is None:
+        return documents
+    rows = to_documents(documents_to_table(documents), transform)
+    # The table has a column for every field, the fields a document lacks are
+    # left out rather than set to null
+    return [
+        (
+            row
+            if len(row) == len(document)
+            else {name: value for name, value in row.items() if name in document}
+        )
+        for document, row in zip(documents, rows, strict=True)
+    ]
+
+
+def load_parquet_documents(
+    file_path: Optional[Path], transform: Optional[Transform] = None
+) -> List[Dict[Hashable, Any]]:
     if is_path(file_path):
         docs = pq.read_table(file_path)
 
     else:
         docs = pq.read_table(sys.stdin)
-    return docs.to_pylist()
+    return to_documents(docs, transform)
 
 
-def load_json_documents(documents: Optional[Path]) -> List[Dict[Hashable, Any]]:
+def load_json_documents(
+    documents: Optional[Path], transform: Optional[Transform] = None
+) -> List[Dict[Hashable, Any]]:
     if is_path(documents):
         with open(documents, "r") as f:
-            return json.load(f)
+            return transform_documents(json.load(f), transform)
     else:
-        return json.load(sys.stdin)
+        return transform_documents(json.load(sys.stdin), transform)
+
+
+def load_csv_documents(
+    file_path: Optional[Path],
+    block_size: Optional[int] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+    transform: Optional[Transform] = None,
+) -> List[Dict[Hashable, Any]]:
+    source = file_path if is_path(file_path) else sys.stdin.buffer
+    docs = read_csv(source, block_size, column_types)
+    return to_documents(docs, transform)
+
+
+def gen_batches(
+    documents: Iterable[Dict[Hashable, Any]], chunk_size: int
+) -> Generator[List[Dict[Hashable, Any]], None, None]:
+    for batch in batched(documents, chunk_size, strict=False):
+        yield list(batch)
 
 
-def load_csv_documents(file_path: Optional[Path]) -> List[Dict[Hashable, Any]]:
-    import pandas as pd
+def gen_parquet_batches(
+    file_path: Optional[Path], chunk_size: int, transform: Optional[Transform] = None
+) -> Generator[List[Dict[Hashable, Any]], None, None]:
+    """
+    Generator yielding documents of a parquet file in batches of at most
+    `chunk_size` documents, one record batch in memory at a time.
 
+    Parquet stores its metadata at the end of the file, so stdin is buffered
+    before reading.
+    """
     if is_path(file_path):
-        docs = pd.read_csv(file_path)
+        source = file_path
     else:
-        docs = pd.read_csv(sys.stdin)
-    return docs.to_dict(orient="records")
+        source = pa.BufferReader(sys.stdin.buffer.read())
+    parquet_file = pq.ParquetFile(source)
+    for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield to_documents(record_batch, transform)
+
+
+def gen_parquet_ndjson_batches(
+    file_path: Optional[Path],
+    chunk_size: Optional[int] = None,
+    transform: Optional[Transform] = None,
+) -> Generator[Tuple[int, bytes], None, None]:
+    """
+    Generator yielding the record batches of a parquet file serialized to
+    NDJSON payloads, without converting the rows to Python dicts.
+
+    Without `chunk_size` the whole file is serialized as a single payload.
+
+    Yields:
+      tuple: The number of documents and the NDJSON payload.
+    """
+    if is_path(file_path):
+        source = file_path
+    else:
+        source = pa.BufferReader(sys.stdin.buffer.read())
+    if chunk_size is None:
+        tables = [pq.read_table(source)]
+    else:
+        parquet_file = pq.ParquetFile(source)
+        tables = (
+            pa.Table.from_batches([record_batch])
+            for record_batch in parquet_file.iter_batches(batch_size=chunk_size)
+        )
+    for table in tables:
+        if transform is not None:
+            table = transform(table)
+        yield table.num_rows, record_batch_to_ndjson(table)
+
+
+def gen_json_batches(
+    documents: Optional[Path], chunk_size: int, transform: Optional[Transform] = None
+) -> Generator[List[Dict[Hashable, Any]], None, None]:
+    """
+    Generator yielding documents of a JSON array or NDJSON file in batches of
+    at most `chunk_size` documents.
+    """
+    if is_path(documents):
+        with open(documents, "r") as f:
+            for batch in gen_batches(gen_json_values(f), chunk_size):
+                yield transform_documents(batch, transform)
+    else:
+        for batch in gen_batches(gen_json_values(sys.stdin), chunk_size):
+            yield transform_documents(batch, transform)
+
+
+def gen_csv_batches(
+    file_path: Optional[Path],
+    chunk_size: int,
+    block_size: Optional[int] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+    transform: Optional[Transform] = None,
+) -> Generator[List[Dict[Hashable, Any]], None, None]:
+    """
+    Generator yielding rows of a CSV file in batches of at most `chunk_size`
+    documents, parsed block by block with the Arrow CSV reader.
+    """
+    source = file_path if is_path(file_path) else sys.stdin.buffer
+    with open_csv(source, block_size, column_types) as reader:
+        for table in gen_rebatched(reader, chunk_size):
+            yield to_documents(table, transform)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+from itertools import batched
+from pathlib import Path
+from typing import Any, Dict, Generator, Hashable, Iterable, List
+
+# Maximum number of SQL variables bound in a single query
+SQLITE_MAX_VARIABLES = 900
+
+
+def document_hash(document: Dict[Hashable, Any]) -> str:
+    """
+    Content hash of a document, independent of the order of its keys.
+    """
+    payload = json.dumps(
+        document, sort_keys=True, separators=(",", ":"), default=str
+    ).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def open_manifest(path: Path) -> sqlite3.Connection:
+    """
+    Open (and create if needed) the SQLite manifest mapping the primary key of
+    each document sent to an index to its content hash.
+
+    Temporary tables record the documents seen during the current sync, they
+    are merged into the manifest by `commit_manifest`.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS documents (pk TEXT PRIMARY KEY, hash TEXT NOT NULL)"
+    )
+    conn.execute("CREATE TEMP TABLE seen (pk TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+    return conn
+
+
+def gen_changed_batches(
+    conn: sqlite3.Connection,
+    batches: Iterable[List[Dict[Hashable, Any]]],
+    primary_key: str,
+) -> Generator[List[Dict[Hashable, Any]], None, None]:
+    """
+    Generator filtering batches of documents down to the documents that are
+    new or whose content changed since the last sync.
+
+    Every document is recorded as seen, so that documents absent from the
+    input can be listed afterwards with `gen_removed_keys`.
+
+    Raises:
+      ValueError: A document has no `primary_key` field.
+    """
+    for batch in batches:
+        keys = []
+        for document in batch:
+            if primary_key not in document:
+                raise ValueError(f"Document without primary key '{primary_key}'")
+            keys.append(str(document[primary_key]))
+        hashes = {key: document_hash(doc) for key, doc in zip(keys, batch, strict=True)}
+
+        known = {}
+        for chunk in batched(hashes, SQLITE_MAX_VARIABLES, strict=False):
+            placeholders = ",".join("?" * len(chunk))
+            known.update(
+                conn.execute(
+                    f"SELECT pk, hash FROM documents WHERE pk IN ({placeholders})",
+                    chunk,
+                )
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO seen (pk, hash) VALUES (?, ?)", hashes.items()
+        )
+        changed = [
+            document
+            for key, document in zip(keys, batch, strict=True)
+            if known.get(key) != hashes[key]
+        ]
+        if changed:
+            yield changed
+
+
+def gen_removed_keys(conn: sqlite3.Connection) -> Generator[str, None, None]:
+    """
+    Generator of the primary keys in the manifest that were not seen during
+    the current sync.
+    """
+    cursor = conn.execute(
+        "SELECT pk FROM documents WHERE pk NOT IN (SELECT pk FROM seen)"
+    )
+    for (pk,) in cursor:
+        yield pk
+
+
+def commit_manifest(conn: sqlite3.Connection):
+    """
+    Replace the manifest content with the documents seen during the sync.
+    """
+    with conn:
+        conn.execute("DELETE FROM documents WHERE pk NOT IN (SELECT pk FROM seen)")
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (pk, hash) SELECT pk, hash FROM seen"
+        )
@@ -0,0 +1,106 @@
+import json
+from typing import Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# JSON escapes applied to string values, backslash first
+JSON_STRING_ESCAPES = [
+    ("\\", "\\\\"),
+    ('"', '\\"'),
+    ("\n", "\\n"),
+    ("\r", "\\r"),
+    ("\t", "\\t"),
+]
+# Control characters left after the escapes above
+JSON_CONTROL_CHARACTERS = r"[\x00-\x08\x0b\x0c\x0e-\x1f]"
+
+
+def _quote(values: pa.Array) -> pa.Array:
+    return pc.binary_join_element_wise('"', values, '"', "")
+
+
+def _json_strings(values: pa.Array) -> pa.Array:
+    for target, replacement in JSON_STRING_ESCAPES:
+        values = pc.replace_substring(values, target, replacement)
+    return _quote(values)
+
+
+def _json_fallback(values: pa.Array) -> pa.Array:
+    return pa.array(
+        [json.dumps(value, default=str) for value in values.to_pylist()],
+        type=pa.string(),
+    )
+
+
+def json_values(values: pa.Array) -> pa.Array:
+    """
+    Encode each value of an Arrow array as a JSON string with Arrow compute
+    kernels. Nulls, NaN and infinite floats are encoded as `null`.
+
+    Nested and binary types fall back to the stdlib encoder for this column.
+    """
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    value_type = values.type
+    if pa.types.is_dictionary(value_type):
+        values = values.dictionary_decode()
+        value_type = values.type
+
+    if pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+        if pc.any(pc.match_substring_regex(values, JSON_CONTROL_CHARACTERS)).as_py():
+            return _json_fallback(values)
+        encoded = _json_strings(values)
+    elif pa.types.is_floating(value_type):
+        finite = pc.if_else(pc.is_finite(values), values, None)
+        encoded = pc.cast(finite, pa.string())
+    elif (
+        pa.types.is_integer(value_type)
+        or pa.types.is_boolean(value_type)
+        or pa.types.is_decimal(value_type)
+    ):
+        encoded = pc.cast(values, pa.string())
+    elif pa.types.is_temporal(value_type):
+        encoded = _quote(pc.cast(values, pa.string()))
+    elif pa.types.is_null(value_type):
+        encoded = pa.nulls(len(values), pa.string())
+    else:
+        return _json_fallback(values)
+    return pc.fill_null(encoded, "null")
+
+
+def record_batch_to_ndjson(batch: Union[pa.RecordBatch, pa.Table]) -> bytes:
+    """
+    Serialize a record batch (or table) to newline-delimited JSON.
+
+    Each document line is assembled column-wise with Arrow string kernels, so
+    no Python object is created per row for flat columns.
+    """
+    if batch.num_rows == 0:
+        return b""
+    if batch.num_columns == 0:
+        return b"{}\n" * batch.num_rows
+    parts = []
+    for position, (name, column) in enumerate(
+        zip(batch.column_names, batch.columns, strict=True)
+    ):
+        separator = "{" if position == 0 else ","
+        parts.append(f"{separator}{json.dumps(name)}:")
+        parts.append(json_values(column))
+    parts.append("}\n")
+    return _string_data(pc.binary_join_element_wise(*parts, ""))
+
+
+def _string_data(lines: pa.Array) -> bytes:
+    """
+    Concatenated bytes of a string array without nulls, sliced from its data
+    buffer instead of converting each value to Python.
+    """
+    _, offsets, data = lines.buffers()
+    offset_type = pa.int64() if pa.types.is_large_string(lines.type) else pa.int32()
+    offset_values = pa.Array.from_buffers(
+        offset_type, len(lines) + 1, [None, offsets], offset=lines.offset
+    )
+    start = offset_values[0].as_py()
+    end = offset_values[-1].as_py()
+    return data.slice(start, end - start).to_pybytes()
@@ -0,0 +1,249 @@
+import json
+import queue
+import threading
+import zlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from rich.console import Console
+
+from gaas_cli.profiling import gen_staged, stage
+
+console = Console(stderr=True)
+
+# Default levels of the codecs, trading a little ratio for compression speed
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+
+# Highest level of each content encoding
+MAX_COMPRESSION_LEVELS = {"gzip": 9, "deflate": 9, "br": 11}
+
+# zlib window bits producing the gzip format
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Number of documents serialized at once, and size in bytes of the slices of
+# NDJSON payloads, fed to the streaming compressors
+BODY_CHUNK_DOCUMENTS = 1000
+BODY_CHUNK_SIZE = 1 << 20
+
+# A batch is either a list of documents or an already serialized NDJSON payload
+# with its number of documents
+Batch = Union[List[Dict[Hashable, Any]], Tuple[int, bytes]]
+
+
+def encode_batch(batch: Batch) -> Tuple[int, bytes, str]:
+    """
+    Serialize a batch of documents for the request body.
+
+    Returns:
+      tuple: The number of documents, the payload and its content type.
+    """
+    if isinstance(batch, tuple):
+        count, payload = batch
+        return count, payload, "application/x-ndjson"
+    return len(batch), json.dumps(batch).encode(), "application/json"
+
+
+def batch_size(batch: Batch) -> int:
+    return batch[0] if isinstance(batch, tuple) else len(batch)
+
+
+def gen_body_chunks(batch: Batch) -> Generator[bytes, None, None]:
+    """
+    Request body of a batch of documents, as the same bytes as `encode_batch`
+    split in chunks, serializing `BODY_CHUNK_DOCUMENTS` documents at a time.
+    """
+    if isinstance(batch, tuple):
+        payload = memoryview(batch[1])
+        for start in range(0, len(payload), BODY_CHUNK_SIZE):
+            yield payload[start : start + BODY_CHUNK_SIZE]
+        return
+    yield b"["
+    for start in range(0, len(batch), BODY_CHUNK_DOCUMENTS):
+        items = json.dumps(batch[start : start + BODY_CHUNK_DOCUMENTS])[1:-1]
+        yield (b", " if start else b"") + items.encode()
+    yield b"]"
+
+
+class Compressor:
+    """
+    Compress the request bodies of the uploads with a content encoding
+    accepted by Meilisearch (gzip, deflate or br), and count the bytes before
+    and after compression.
+
+    Batches are serialized and compressed chunk by chunk with a streaming
+    compressor, so that the uncompressed body of a batch is never held in
+    memory as a whole.
+
+    Raises:
+      ValueError: The level is out of the range of the codec.
+      ImportError: The brotli package is missing for the br encoding.
+    """
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        max_level = MAX_COMPRESSION_LEVELS[encoding]
+        if level is not None and not 0 <= level <= max_level:
+            raise ValueError(f"{encoding} level must be between 0 and {max_level}")
+        if encoding == "br":
+            try:
+                import brotli
+            except ImportError:
+                raise ImportError(
+                    "br encoding requires the brotli package, install the "
+                    "brotli extra of gaas-cli"
+                ) from None
+            self.brotli = brotli
+            level = DEFAULT_BROTLI_QUALITY if level is None else level
+        elif encoding == "gzip":
+            level = DEFAULT_GZIP_LEVEL if level is None else level
+        elif level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        self.encoding = encoding
+        self.level = level
+        self.lock = threading.Lock()
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+
+    def compress_chunks(self, chunks: Iterable[bytes]) -> bytes:
+        """Compress a request body given as a stream of chunks."""
+        if self.encoding == "br":
+            stream = self.brotli.Compressor(quality=self.level)
+            compress, flush = stream.process, stream.finish
+        else:
+            # HTTP deflate is the zlib format, gzip adds its own header
+            wbits = GZIP_WBITS if self.encoding == "gzip" else zlib.MAX_WBITS
+            stream = zlib.compressobj(self.level, zlib.DEFLATED, wbits)
+            compress, flush = stream.compress, stream.flush
+        raw_bytes = 0
+        parts = []
+        for chunk in chunks:
+            raw_bytes += len(chunk)
+            parts.append(compress(chunk))
+        parts.append(flush())
+        payload = b"".join(parts)
+        with self.lock:
+            self.raw_bytes += raw_bytes
+            self.wire_bytes += len(payload)
+        return payload
+
+    def encode_batch(self, batch: Batch) -> Tuple[int, bytes, str]:
+        """
+        Serialize and compress a batch of documents for the request body.
+
+        Returns:
+          tuple: The number of documents, the compressed payload and its
+            content type.
+        """
+        if isinstance(batch, tuple):
+            content_type = "application/x-ndjson"
+        else:
+            content_type = "application/json"
+        return (
+            batch_size(batch),
+            self.compress_chunks(gen_body_chunks(batch)),
+            content_type,
+        )
+
+    def report(self) -> str:
+        ratio = self.raw_bytes / self.wire_bytes if self.wire_bytes else 0
+        return (
+            f"Sent {self.raw_bytes / 1e6:.1f} MB of documents as "
+            f"{self.wire_bytes / 1e6:.1f} MB with {self.encoding} ({ratio:.1f}x)"
+        )
+
+
+def upload_batches(
+    get_client: Callable,
+    index_name: str,
+    batches: Iterable[Batch],
+    primary_key: Optional[str] = None,
+    concurrency: int = 4,
+    max_queued: Optional[int] = None,
+    verbose: bool = False,
+    compressor: Optional[Compressor] = None,
+) -> List[Tuple[int, Any]]:
+    """
+    Upload batches of documents to an index with concurrent uploader threads.
+
+    The calling thread reads the batches and feeds a bounded queue, so reading
+    and parsing overlap with the serialization and HTTP uploads while at most
+    `max_queued` batches wait in memory. Reading stops at the first upload
+    error.
+
+    Args:
+      get_client: Function returning a MeiliSearch client for the current thread.
+      index_name: Name of the index receiving the documents.
+      batches: Batches of documents or serialized NDJSON payloads to upload.
+      primary_key: Primary key of the documents.
+      concurrency: Number of uploads in flight at the same time.
+      max_queued: Number of batches read ahead of the uploads.
+        Defaults to `concurrency`.
+      verbose: Print each task as it is enqueued.
+      compressor: Serialize and compress the payloads chunk by chunk, in the
+        uploader threads.
+    Returns:
+      list: One (number of documents, TaskInfo or exception) tuple per batch,
+        in input order.
+    """
+    work: queue.Queue = queue.Queue(maxsize=max_queued or concurrency)
+    results: Dict[int, Tuple[int, Any]] = {}
+    failed = threading.Event()
+
+    def uploader():
+        index = get_client().index(index_name)
+        if compressor is not None:
+            # The index of the thread only sends document uploads
+            index.http.headers["Content-Encoding"] = compressor.encoding
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            position, batch = item
+            count = None
+            try:
+                if compressor is None:
+                    with stage("serialize") as call:
+                        count, payload, content_type = encode_batch(batch)
+                        call.bytes, call.items = len(payload), count
+                else:
+                    # Serialization and compression are interleaved
+                    with stage("compress") as call:
+                        count, payload, content_type = compressor.encode_batch(batch)
+                        call.bytes, call.items = len(payload), count
+                with stage("network", len(payload), count):
+                    task = index.add_documents_raw(payload, primary_key, content_type)
+            except Exception as e:
+                failed.set()
+                results[position] = (count or 0, e)
+                continue
+            results[position] = (count, task)
+            if verbose:
+                console.print(f"Enqueued {count} documents: {task}")
+
+    threads = [
+        threading.Thread(target=uploader, daemon=True) for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        # Reading the batches parses the documents lazily
+        for position, batch in enumerate(gen_staged("parse", batches, batch_size)):
+            if failed.is_set():
+                break
+            work.put((position, batch))
+    finally:
+        for _ in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+    return [results[position] for position in sorted(results)]
@@ -0,0 +1,18 @@
+from enum import Enum
+
+
+class DocumentFormat(str, Enum):
+    json = "json"
+    csv = "csv"
+    parquet = "parquet"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+
+class ContentEncoding(str, Enum):
+    gzip = "gzip"
+    deflate = "deflate"
+    br = "br"
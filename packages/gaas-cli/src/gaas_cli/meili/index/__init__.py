@@ -1,25 +1,102 @@
-from typing import Annotated
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import Annotated, Any, List, Optional
+
 import typer
-from rich.pretty import pprint
+from meilisearch.errors import MeilisearchApiError
 from rich.console import Console
+from rich.pretty import pprint
 from rich.table import Table
 
+from gaas_cli.meili.client import thread_local_client
+from gaas_cli.meili.formats import DocumentFormat
+from gaas_cli.meili.settings import (
+    diff_settings,
+    format_setting,
+    get_current_settings,
+    load_settings_file,
+)
+from gaas_cli.meili.task.wait import wait_for_tasks
 
 console = Console(stderr=True)
 app = typer.Typer(no_args_is_help=True)
 
+# Number of indexes requested per page when listing indexes
+INDEXES_PAGE_SIZE = 100
+
 
 # @app.callback()
 # def main(ctx: typer.Context, index: Annotated[str, typer.Option(help="Index name")]):
 #     pass
 
 
+class OutputFormat(str, Enum):
+    table = "table"
+    json = "json"
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(by_alias=True, exclude_none=True)
+    return str(value)
+
+
 @app.command()
-def ls(ctx: typer.Context, settings: bool = False):
+def ls(
+    ctx: typer.Context,
+    settings: bool = False,
+    format: Annotated[
+        OutputFormat, typer.Option(help="Output format: table or json")
+    ] = OutputFormat.table,
+    concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of indexes fetched concurrently."),
+    ] = 8,
+):
     """List all MeiliSearch indexes."""
     client = ctx.obj["client"]
-    indexes = client.get_indexes()
-    for index in indexes["results"]:
+    get_client = thread_local_client(ctx.obj["host"], ctx.obj["key"])
+
+    indexes = []
+    while True:
+        page = client.get_indexes({"offset": len(indexes), "limit": INDEXES_PAGE_SIZE})
+        indexes.extend(page["results"])
+        if not page["results"] or len(indexes) >= page["total"]:
+            break
+    # A single call gives the statistics of every index
+    all_stats = client.get_all_stats()["indexes"]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        all_settings = list(
+            pool.map(
+                lambda index: get_client().index(index.uid).get_settings(), indexes
+            )
+        )
+
+    if format == OutputFormat.json:
+        rows = []
+        for index, index_settings in zip(indexes, all_settings, strict=True):
+            statistics = all_stats.get(index.uid, {})
+            row = {
+                "uid": index.uid,
+                "primaryKey": index.primary_key,
+                "createdAt": index.created_at,
+                "updatedAt": index.updated_at,
+                "numberOfDocuments": statistics.get("numberOfDocuments"),
+                "isIndexing": statistics.get("isIndexing"),
+                "searchableAttributes": index_settings.get("searchableAttributes"),
+                "sortableAttributes": index_settings.get("sortableAttributes"),
+                "pagination": index_settings.get("pagination"),
+            }
+            if settings:
+                row["settings"] = index_settings
+            rows.append(row)
+        print(json.dumps(rows, indent=2, default=_jsonable))
+        return
+
+    for index, index_settings in zip(indexes, all_settings, strict=True):
         console.rule(f"[bold] Index: {index.uid} [/bold]")
         table = Table(title="MeiliSearch Index: " + index.uid)
         table.add_column("Attribute", justify="right", style="cyan", no_wrap=True)
@@ -32,23 +109,23 @@ def ls(ctx: typer.Context, settings: bool = False):
         table.add_row("Updated At", str(index.updated_at))
         table.add_row(
             "Searchable Attributes",
-            str(client.index(index.uid).get_searchable_attributes()),
+            str(index_settings.get("searchableAttributes")),
         )
         table.add_row(
             "Sortable Attributes",
-            str(client.index(index.uid).get_sortable_attributes()),
+            str(index_settings.get("sortableAttributes")),
         )
         table.add_row(
             "Pagination Settings",
-            str(client.index(index.uid).get_pagination_settings()),
+            str(index_settings.get("pagination")),
         )
         table.add_section()
-        statistics = client.index(index.uid).get_stats()
+        statistics = all_stats.get(index.uid, {})
         pprint(statistics, expand_all=True, console=console)
-        table.add_row("Number of Documents", str(statistics.number_of_documents))
-        table.add_row("Is Indexing", str(statistics.is_indexing))
+        table.add_row("Number of Documents", str(statistics.get("numberOfDocuments")))
+        table.add_row("Is Indexing", str(statistics.get("isIndexing")))
         if settings:
-            table.add_row("Settings", str(client.index(index.uid).get_settings()))
+            table.add_row("Settings", str(index_settings))
         console.print(table)
 
     """
@@ -71,3 +148,226 @@ def get(ctx: typer.Context, name: Annotated[str, typer.Argument(help="Index name
     client = ctx.obj["client"]
     index = client.get_index(name)
     console.print(f"Index details: {index}")
+
+
+@app.command("apply-settings")
+def apply_settings(
+    ctx: typer.Context,
+    name: Annotated[str, typer.Argument(help="Index name")],
+    settings_file: Annotated[
+        Path,
+        typer.Argument(
+            exists=True,
+            dir_okay=False,
+            help="JSON file of the settings of the index, as accepted by the "
+            "Meilisearch settings route.",
+        ),
+    ],
+    dry_run: Annotated[
+        bool, typer.Option(help="Show the changed settings without updating them.")
+    ] = False,
+    wait: Annotated[
+        bool, typer.Option(help="Wait until the settings update is processed.")
+    ] = False,
+):
+    """
+    Update the settings of an index to match a settings file.
+
+    The file is compared with the current settings and only the changed
+    settings are sent, in a single update. Nothing is sent when the index
+    already has these settings, so that its documents are not reindexed. The
+    index is created if it does not exist.
+    """
+    client = ctx.obj["client"]
+    try:
+        desired = load_settings_file(settings_file)
+    except ValueError as e:
+        console.print(f"[red]Invalid settings file: {e}[/red]")
+        raise typer.Exit(code=1) from None
+    index = client.index(name)
+    current = get_current_settings(index)
+    changes = diff_settings(desired, current)
+    if not changes:
+        console.print(f"Settings of index '{name}' are up to date")
+        return
+
+    table = Table(title=f"Settings of '{name}' to update")
+    table.add_column("Setting")
+    table.add_column("Current")
+    table.add_column("New")
+    for key, value in changes.items():
+        current_value = current.get(key)
+        if isinstance(value, dict) and isinstance(current_value, dict):
+            current_value = {item: current_value.get(item) for item in value}
+        table.add_row(key, format_setting(current_value), format_setting(value))
+    console.print(table)
+    if dry_run:
+        return
+
+    task = index.update_settings(changes)
+    console.print(f"Settings update enqueued (task {task.task_uid})")
+    if wait:
+        [finished] = wait_for_tasks(client, [task.task_uid])
+        if finished.status != "succeeded":
+            console.print(
+                f"[red]Task {finished.uid} {finished.status}: {finished.error}[/red]"
+            )
+            raise typer.Exit(code=1)
+        console.print(f"Settings of index '{name}' updated")
+
+
+@app.command()
+def rebuild(
+    ctx: typer.Context,
+    name: Annotated[str, typer.Argument(help="Name of the live index")],
+    documents: Annotated[
+        Optional[Path],
+        typer.Argument(
+            help="Path to file containing the full set of documents. "
+            "Use '-' or omit to read from stdin."
+        ),
+    ] = None,
+    format: Annotated[
+        DocumentFormat,
+        typer.Option(help="Format of the documents: json, parquet, or csv"),
+    ] = DocumentFormat.json,
+    shadow: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Name of the temporary index loaded with the documents. "
+            "Defaults to '<name>_rebuild'."
+        ),
+    ] = None,
+    chunk_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1,
+            help="Stream the documents and send them in batches of N documents "
+            "instead of loading the whole file in memory.",
+        ),
+    ] = None,
+    csv_block_size: Annotated[
+        Optional[int],
+        typer.Option(
+            min=1, help="Size in bytes of the blocks parsed by the CSV reader."
+        ),
+    ] = None,
+    column_type: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            help="Type of a CSV column as name=type with an Arrow type alias "
+            "(e.g. price=float64). Can be repeated.",
+        ),
+    ] = None,
+    schema: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Pydantic model used to coerce the document columns, as "
+            "module:Model or path/to/file.py:Model.",
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(min=1, help="Number of batches uploaded concurrently."),
+    ] = 4,
+):
+    """
+    Rebuild an index without downtime.
+
+    The documents are loaded into a shadow index created with the settings of
+    the live index. Once indexed, the shadow index is swapped with the live
+    one and the old documents are deleted. The live index is left untouched
+    if anything fails.
+    """
+    from gaas_cli.meili.document import (
+        load_schema_coercer,
+        parse_csv_column_types,
+        read_document_batches,
+        report_coercion,
+        send_batches,
+        wait_and_report,
+    )
+
+    client = ctx.obj["client"]
+    shadow = shadow or f"{name}_rebuild"
+    try:
+        live = client.get_index(name)
+    except MeilisearchApiError as e:
+        console.print(f"[red]Cannot rebuild index '{name}': {e.message}[/red]")
+        raise typer.Exit(code=1) from None
+    try:
+        client.get_index(shadow)
+    except MeilisearchApiError as e:
+        if e.code != "index_not_found":
+            raise
+    else:
+        console.print(
+            f"[red]Shadow index '{shadow}' already exists, "
+            f"delete it with 'gaas meili index rm {shadow}'[/red]"
+        )
+        raise typer.Exit(code=1)
+
+    coercer = load_schema_coercer(schema)
+    batches = read_document_batches(
+        format,
+        documents,
+        chunk_size,
+        csv_block_size,
+        parse_csv_column_types(column_type),
+        coercer,
+    )
+
+    primary_key = live.primary_key or "id"
+    console.print(f"Create shadow index '{shadow}' with the settings of '{name}'")
+    try:
+        # Settings are applied before loading the documents so that they are
+        # indexed once
+        setup_tasks = [
+            client.create_index(shadow, {"primaryKey": primary_key}),
+            client.index(shadow).update_settings(live.get_settings()),
+        ]
+        if not wait_shadow_tasks(client, setup_tasks):
+            raise typer.Exit(code=1)
+
+        start = time.perf_counter()
+        tasks, count_documents, upload_errors = send_batches(
+            ctx, shadow, batches, primary_key, concurrency
+        )
+        report_coercion(coercer)
+        if upload_errors or (
+            tasks and wait_and_report(client, tasks, count_documents, start)
+        ):
+            raise typer.Exit(code=1)
+
+        console.print(f"Swap '{shadow}' with '{name}'")
+        swap_task = client.swap_indexes([{"indexes": [name, shadow]}])
+        if not wait_shadow_tasks(client, [swap_task]):
+            raise typer.Exit(code=1)
+    except BaseException:
+        # Whatever stopped the rebuild, interruptions and unreadable documents
+        # included, the shadow index must not block the next one
+        delete_shadow(client, shadow)
+        raise
+    # After the swap, the shadow index holds the old documents
+    client.index(shadow).delete()
+    console.print(f"Index '{name}' rebuilt with {count_documents} documents")
+
+
+def wait_shadow_tasks(client, tasks) -> bool:
+    """
+    Wait for the tasks preparing or swapping the shadow index and print the
+    failed ones.
+
+    Returns:
+      bool: Whether all the tasks succeeded.
+    """
+    finished = wait_for_tasks(client, [task.task_uid for task in tasks])
+    failed_tasks = [task for task in finished if task.status != "succeeded"]
+    for task in failed_tasks:
+        console.print(f"[red]Task {task.uid} {task.status}: {task.error}[/red]")
+    return not failed_tasks
+
+
+def delete_shadow(client, shadow: str):
+    console.print(f"[red]Rebuild failed, delete shadow index '{shadow}'[/red]")
+    client.index(shadow).delete()
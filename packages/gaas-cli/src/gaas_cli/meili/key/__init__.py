@@ -1,7 +1,8 @@
+from pathlib import Path
 from typing import Annotated
+
 import typer
 from rich.console import Console
-from pathlib import Path
 
 console = Console(stderr=True)
 app = typer.Typer(no_args_is_help=True)
@@ -29,4 +30,4 @@ def env_var(
     if len(api_key) == 1:
         with open(output, "a") as outfile:
             outfile.write(f"{nuxt_prefix_str}MEILI_HOST={ctx.obj['host']}\n")
-            outfile.write(f"{nuxt_prefix_str}MEILI_API_KEY={api_key[0]}\n")
\ No newline at end of file
+            outfile.write(f"{nuxt_prefix_str}MEILI_API_KEY={api_key[0]}\n")
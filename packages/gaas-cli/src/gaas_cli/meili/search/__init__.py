@@ -0,0 +1,157 @@
+import json
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+from meilisearch.errors import MeilisearchApiError
+from rich.console import Console
+from rich.table import Table
+
+from gaas_cli.meili.client import thread_local_client
+from gaas_cli.meili.search.bench import (
+    attribute_names,
+    build_requests,
+    read_queries,
+    run_search_bench,
+    sample_filter_values,
+    sample_terms,
+)
+
+console = Console(stderr=True)
+
+app = typer.Typer(no_args_is_help=True)
+
+
+def print_bench_results(results: dict):
+    table = Table(title="Search benchmark")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Requests", str(results["requests"]))
+    table.add_row("Errors", str(sum(results["errors"].values())))
+    table.add_row("Duration", f"{results['duration_seconds']:.2f}s")
+    table.add_row("Throughput", f"{results['requests_per_second']:.1f} req/s")
+    for name, value in results["latency_ms"].items():
+        table.add_row(f"Latency {name}", "-" if value is None else f"{value:.2f} ms")
+    for name, value in results["processing_time_ms"].items():
+        table.add_row(f"Processing {name}", "-" if value is None else f"{value:.0f} ms")
+    console.print(table)
+    for code, count in results["errors"].items():
+        console.print(f"[red]{count} request(s) failed: {code}[/red]")
+
+
+@app.command()
+def bench(
+    ctx: typer.Context,
+    index_name: Annotated[str, typer.Argument(help="Name of the searched index")],
+    queries: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="File of queries, one per line: the text of the query or a JSON "
+            "object of search parameters with the query in 'q'. Defaults to "
+            "terms sampled from the documents of the index.",
+        ),
+    ] = None,
+    requests: Annotated[
+        int, typer.Option(min=1, help="Number of search requests sent.")
+    ] = 1000,
+    concurrency: Annotated[
+        int, typer.Option(min=1, help="Number of requests in flight at once.")
+    ] = 8,
+    rate: Annotated[
+        Optional[float],
+        typer.Option(
+            min=0.001,
+            help="Requests sent per second. As fast as possible if not given.",
+        ),
+    ] = None,
+    filter_ratio: Annotated[
+        float,
+        typer.Option(
+            min=0, max=1, help="Fraction of the requests filtered on an attribute."
+        ),
+    ] = 0.3,
+    sort_ratio: Annotated[
+        float,
+        typer.Option(min=0, max=1, help="Fraction of the requests sorted."),
+    ] = 0.3,
+    facet_ratio: Annotated[
+        float,
+        typer.Option(min=0, max=1, help="Fraction of the requests asking for facets."),
+    ] = 0.3,
+    sample_documents: Annotated[
+        int,
+        typer.Option(
+            min=1,
+            help="Number of documents sampled for query terms and filter values.",
+        ),
+    ] = 1000,
+    seed: Annotated[int, typer.Option(help="Seed of the random workload.")] = 0,
+    output: Annotated[
+        Optional[Path], typer.Option(help="Write the results to a JSON file.")
+    ] = None,
+):
+    """
+    Benchmark the search of an index.
+
+    Queries are replayed from a file or built from terms sampled from the
+    documents. A fraction of them is filtered, sorted and faceted on the
+    filterable and sortable attributes of the index. Reports the latency
+    percentiles, the throughput and the errors.
+    """
+    client = ctx.obj["client"]
+    try:
+        index = client.get_index(index_name)
+    except MeilisearchApiError as e:
+        console.print(f"[red]Cannot search index '{index_name}': {e.message}[/red]")
+        raise typer.Exit(code=1) from None
+
+    settings = index.get_settings()
+    filterable = attribute_names(settings.get("filterableAttributes"))
+    sortable = attribute_names(settings.get("sortableAttributes"))
+    searchable = attribute_names(settings.get("searchableAttributes"))
+    documents = [
+        dict(document)
+        for document in index.get_documents({"limit": sample_documents}).results
+    ]
+
+    if queries is not None:
+        search_queries = read_queries(queries)
+    else:
+        search_queries = [{"q": term} for term in sample_terms(documents, searchable)]
+    if not search_queries:
+        console.print("[red]No queries to send: the query file or index is empty[/red]")
+        raise typer.Exit(code=1)
+    search_requests = build_requests(
+        search_queries,
+        requests,
+        sample_filter_values(documents, filterable),
+        sortable,
+        filter_ratio,
+        sort_ratio,
+        facet_ratio,
+        shuffle=queries is None,
+        seed=seed,
+    )
+    console.print(
+        f"Sending {requests} requests ({len(search_queries)} distinct queries) "
+        f"with concurrency {concurrency}"
+        + (f" at {rate:g} req/s" if rate else "")
+        + f". Filterable: {', '.join(filterable) or '-'}. "
+        f"Sortable: {', '.join(sortable) or '-'}."
+    )
+
+    results = run_search_bench(
+        thread_local_client(ctx.obj["host"], ctx.obj["key"]),
+        index_name,
+        search_requests,
+        concurrency,
+        rate,
+    )
+    results["index"] = index_name
+    results["concurrency"] = concurrency
+    results["rate"] = rate
+    print_bench_results(results)
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+    if results["succeeded"] == 0:
+        raise typer.Exit(code=1)
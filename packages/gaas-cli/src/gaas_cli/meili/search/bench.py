@@ -0,0 +1,243 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from itertools import count
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from meilisearch.errors import MeilisearchApiError
+
+# Words of at least this number of letters are sampled as query terms
+MIN_TERM_LENGTH = 3
+TERM_PATTERN = re.compile(r"\w{%d,}" % MIN_TERM_LENGTH)
+
+# Number of distinct values kept per filterable attribute
+MAX_FILTER_VALUES = 100
+
+PERCENTILES = (50, 95, 99)
+
+
+def read_queries(path: Path) -> List[Dict[str, Any]]:
+    """
+    Search requests of a query file, one per line: either the text of the
+    query, or a JSON object of search parameters with the query in `q`.
+    """
+    queries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                queries.append(json.loads(line))
+            else:
+                queries.append({"q": line})
+    return queries
+
+
+def attribute_names(setting: Optional[List[Any]]) -> List[str]:
+    """
+    Plain attribute names of a filterable or sortable attributes setting,
+    without wildcards and granular attribute patterns.
+    """
+    return [
+        attribute
+        for attribute in setting or []
+        if isinstance(attribute, str) and "*" not in attribute
+    ]
+
+
+def gen_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from gen_strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from gen_strings(item)
+
+
+def sample_terms(
+    documents: List[Dict[str, Any]], attributes: Optional[List[str]] = None
+) -> List[str]:
+    """
+    Distinct words of the string fields of the documents, restricted to
+    `attributes` if given, in order of appearance.
+    """
+    terms: Dict[str, None] = {}
+    for document in documents:
+        for name, value in document.items():
+            if attributes and name not in attributes:
+                continue
+            for text in gen_strings(value):
+                for term in TERM_PATTERN.findall(text):
+                    terms.setdefault(term.lower())
+    return list(terms)
+
+
+def sample_filter_values(
+    documents: List[Dict[str, Any]], attributes: List[str]
+) -> Dict[str, List[Any]]:
+    """Distinct scalar values of each filterable attribute in the documents."""
+    values: Dict[str, Dict[Any, None]] = {attribute: {} for attribute in attributes}
+    for document in documents:
+        for attribute in attributes:
+            value = document.get(attribute)
+            for item in value if isinstance(value, list) else [value]:
+                if (
+                    isinstance(item, (str, int, float, bool))
+                    and len(values[attribute]) < MAX_FILTER_VALUES
+                ):
+                    values[attribute].setdefault(item)
+    return {attribute: list(found) for attribute, found in values.items() if found}
+
+
+def filter_expression(attribute: str, value: Any) -> str:
+    if isinstance(value, bool):
+        return f"{attribute} = {str(value).lower()}"
+    if isinstance(value, (int, float)):
+        return f"{attribute} = {value}"
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'{attribute} = "{escaped}"'
+
+
+def build_requests(
+    queries: List[Dict[str, Any]],
+    count_requests: int,
+    filter_values: Dict[str, List[Any]],
+    sortable: List[str],
+    filter_ratio: float = 0.3,
+    sort_ratio: float = 0.3,
+    facet_ratio: float = 0.3,
+    shuffle: bool = False,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Search requests of the benchmark: the queries replayed in order (or drawn
+    at random with `shuffle`), a fraction of them with a filter, a sort and
+    facets derived from the filterable and sortable attributes. Parameters
+    already given by a query are kept.
+    """
+    rng = random.Random(seed)
+    facets = list(filter_values)
+    requests = []
+    for position in range(count_requests):
+        query = rng.choice(queries) if shuffle else queries[position % len(queries)]
+        request = dict(query)
+        if filter_values and "filter" not in request and rng.random() < filter_ratio:
+            attribute = rng.choice(facets)
+            request["filter"] = filter_expression(
+                attribute, rng.choice(filter_values[attribute])
+            )
+        if sortable and "sort" not in request and rng.random() < sort_ratio:
+            direction = rng.choice(["asc", "desc"])
+            request["sort"] = [f"{rng.choice(sortable)}:{direction}"]
+        if facets and "facets" not in request and rng.random() < facet_ratio:
+            request["facets"] = facets
+        requests.append(request)
+    return requests
+
+
+def percentile(sorted_values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted values, rounded to 2 decimals."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return round(sorted_values[rank - 1], 2)
+
+
+def error_name(error: Exception) -> str:
+    if isinstance(error, MeilisearchApiError) and error.code:
+        return error.code
+    return type(error).__name__
+
+
+def run_search_bench(
+    get_client: Callable,
+    index_name: str,
+    requests: List[Dict[str, Any]],
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Send search requests with `concurrency` threads and measure their latency.
+
+    With a `rate`, request N is not sent before N / rate seconds after the
+    start, whatever the time taken by the previous ones. Its latency is then
+    measured from that scheduled time rather than from when it is actually
+    sent, so that the requests held back by a server falling behind count
+    their wait (no coordinated omission).
+
+    Args:
+      get_client: Function returning a MeiliSearch client for the current thread.
+      index_name: Name of the searched index.
+      requests: Search parameters of each request, with the query in `q`.
+      concurrency: Number of requests in flight at the same time.
+      rate: Maximum number of requests sent per second, unlimited if None.
+    Returns:
+      dict: The number of requests and errors (by error code), the duration,
+        the throughput, and the latency and Meilisearch processing time
+        percentiles in milliseconds.
+    """
+    positions = count()
+    lock = threading.Lock()
+    latencies: List[float] = []
+    processing_times: List[float] = []
+    errors: Counter = Counter()
+
+    def worker():
+        index = get_client().index(index_name)
+        while True:
+            with lock:
+                position = next(positions)
+            if position >= len(requests):
+                return
+            parameters = dict(requests[position])
+            query = parameters.pop("q", "") or ""
+            if rate:
+                # The latency counts from the scheduled time
+                sent = start + position / rate
+                delay = sent - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                sent = time.perf_counter()
+            try:
+                result = index.search(query, parameters)
+            except Exception as e:
+                with lock:
+                    errors[error_name(e)] += 1
+                continue
+            latency = time.perf_counter() - sent
+            with lock:
+                latencies.append(latency * 1000)
+                if result.get("processingTimeMs") is not None:
+                    processing_times.append(result["processingTimeMs"])
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    processing_times.sort()
+    return {
+        "requests": len(requests),
+        "succeeded": len(latencies),
+        "errors": dict(errors),
+        "duration_seconds": round(duration, 3),
+        "requests_per_second": round(len(latencies) / duration, 1),
+        "latency_ms": {f"p{p}": percentile(latencies, p) for p in PERCENTILES}
+        | {"max": percentile(latencies, 100)},
+        "processing_time_ms": {
+            f"p{p}": percentile(processing_times, p) for p in PERCENTILES
+        },
+    }
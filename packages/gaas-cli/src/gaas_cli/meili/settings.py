@@ -0,0 +1,126 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from meilisearch.errors import MeilisearchApiError
+
+# Settings whose object is updated key by key by Meilisearch: the keys absent
+# from the settings file keep their current value
+MERGED_SETTINGS = {"typoTolerance", "faceting", "pagination", "embedders"}
+
+# Lists whose order has no meaning, and that Meilisearch may return sorted
+UNORDERED_SETTINGS = {
+    "filterableAttributes",
+    "sortableAttributes",
+    "stopWords",
+    "nonSeparatorTokens",
+    "separatorTokens",
+    "dictionary",
+    "disableOnWords",
+    "disableOnAttributes",
+}
+
+
+def load_settings_file(path: Path) -> Dict[str, Any]:
+    """
+    Read the declarative settings of an index from a JSON file.
+
+    Raises:
+      ValueError: The file does not hold a JSON object.
+    """
+    with open(path) as f:
+        settings = json.load(f)
+    if not isinstance(settings, dict):
+        raise ValueError(f"{path} must hold a JSON object of settings")
+    return settings
+
+
+def canonical(key: str, value: Any) -> Any:
+    """
+    Value of a setting with its unordered lists sorted, at any depth, so that
+    the settings files and the server answers compare equal whatever their
+    order.
+    """
+    if isinstance(value, list) and key in UNORDERED_SETTINGS:
+        return sorted(value, key=lambda item: json.dumps(item, sort_keys=True))
+    if isinstance(value, dict):
+        if key == "synonyms":
+            # Synonyms map each word to an unordered list of words
+            return {
+                word: sorted(synonyms) if isinstance(synonyms, list) else synonyms
+                for word, synonyms in value.items()
+            }
+        return {name: canonical(name, item) for name, item in value.items()}
+    return value
+
+
+def is_subset(desired: Any, current: Any) -> bool:
+    """Whether the keys given in `desired` have the same value in `current`."""
+    if isinstance(desired, dict) and isinstance(current, dict):
+        return all(
+            name in current and is_subset(value, current[name])
+            for name, value in desired.items()
+        )
+    return desired == current
+
+
+def diff_settings(desired: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Settings of `desired` that differ from the `current` settings of an
+    index, as the body of a single settings update.
+
+    The objects of `MERGED_SETTINGS` are compared key by key and only their
+    changed keys are kept, since Meilisearch merges them with the current
+    value. The other settings are replaced as a whole.
+    """
+    changes: Dict[str, Any] = {}
+    for key, value in desired.items():
+        current_value = current.get(key)
+        if (
+            key in MERGED_SETTINGS
+            and isinstance(value, dict)
+            and isinstance(current_value, dict)
+        ):
+            changed = {
+                name: item
+                for name, item in value.items()
+                if not is_subset(
+                    canonical(name, item), canonical(name, current_value.get(name))
+                )
+            }
+            if changed:
+                changes[key] = changed
+        elif canonical(key, value) != canonical(key, current_value):
+            changes[key] = value
+    return changes
+
+
+def get_current_settings(index) -> Dict[str, Any]:
+    """Settings of an index, empty if the index does not exist yet."""
+    try:
+        return index.get_settings()
+    except MeilisearchApiError as e:
+        if e.code == "index_not_found":
+            return {}
+        raise
+
+
+def apply_settings(index, desired: Dict[str, Any]) -> tuple:
+    """
+    Update the settings of an index that differ from `desired` in a single
+    request, and send nothing when they are all up to date. Every settings
+    update makes Meilisearch reindex the documents.
+
+    Returns:
+      tuple: The changed settings and the enqueued TaskInfo, None if nothing
+        changed.
+    """
+    changes = diff_settings(desired, get_current_settings(index))
+    if not changes:
+        return changes, None
+    return changes, index.update_settings(changes)
+
+
+def format_setting(value: Optional[Any], width: int = 80) -> str:
+    text = json.dumps(value)
+    return text if len(text) <= width else text[: width - 1] + "…"
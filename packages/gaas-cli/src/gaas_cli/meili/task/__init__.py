@@ -1,8 +1,15 @@
+import sys
+from typing import Annotated, Dict, List, Optional
+
 import typer
+from meilisearch.errors import MeilisearchTimeoutError
+from rich.console import Console
 
 # from rich import print_json
 from rich.pretty import pprint
-from rich.console import Console
+from rich.table import Table
+
+from gaas_cli.meili.task.wait import gen_task_transitions, wait_for_tasks
 
 console = Console(stderr=True)
 
@@ -17,3 +24,169 @@ def get(ctx: typer.Context, task_id: int):
     console.print("Task details")
     pprint(task, expand_all=True, console=console)
     # print_json(json.dumps(task, indent=2))
+
+
+def read_task_uids(task_uids: Optional[List[str]]) -> List[int]:
+    """
+    Task uids given as arguments, or read from stdin (whitespace separated)
+    when none or `-` is given.
+    """
+    if not task_uids or task_uids == ["-"]:
+        task_uids = sys.stdin.read().split()
+    try:
+        return [int(uid) for uid in task_uids]
+    except ValueError as e:
+        raise typer.BadParameter(f"Invalid task uid: {e}") from e
+
+
+def task_latency(task) -> Optional[float]:
+    """Number of seconds between the enqueuing and the end of a task."""
+    if task.finished_at is None:
+        return None
+    return (task.finished_at - task.enqueued_at).total_seconds()
+
+
+@app.command()
+def wait(
+    ctx: typer.Context,
+    task_uids: Annotated[
+        Optional[List[str]],
+        typer.Argument(help="Task uids, read from stdin if none or '-' is given"),
+    ] = None,
+    timeout: Annotated[
+        Optional[float], typer.Option(help="Maximum number of seconds to wait")
+    ] = None,
+    interval: Annotated[
+        float, typer.Option(help="Initial number of seconds between two polls")
+    ] = 0.5,
+    max_interval: Annotated[
+        float, typer.Option(help="Maximum number of seconds between two polls")
+    ] = 5.0,
+):
+    """Wait for MeiliSearch tasks to finish. Exit with 1 if any task did not succeed."""
+    client = ctx.obj["client"]
+    uids = read_task_uids(task_uids)
+    if not uids:
+        console.print("No task to wait for")
+        return
+    try:
+        tasks = wait_for_tasks(client, uids, timeout, interval, max_interval)
+    except (ValueError, MeilisearchTimeoutError) as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1) from None
+
+    table = Table(title="MeiliSearch tasks")
+    table.add_column("UID", justify="right", style="cyan", no_wrap=True)
+    table.add_column("Status")
+    table.add_column("Index", style="magenta")
+    table.add_column("Type")
+    table.add_column("Latency (s)", justify="right")
+    for task in tasks:
+        color = "green" if task.status == "succeeded" else "red"
+        latency = task_latency(task)
+        table.add_row(
+            str(task.uid),
+            f"[{color}]{task.status}[/{color}]",
+            str(task.index_uid),
+            task.type,
+            "" if latency is None else f"{latency:.3f}",
+        )
+    console.print(table)
+    failed_tasks = [task for task in tasks if task.status != "succeeded"]
+    for task in failed_tasks:
+        console.print(f"[red]Task {task.uid} {task.status}: {task.error}[/red]")
+    if failed_tasks:
+        raise typer.Exit(code=1)
+
+
+def count_task_documents(task) -> int:
+    """Number of documents handled by a task, from its details."""
+    details = task.details or {}
+    for key in ("indexedDocuments", "receivedDocuments", "deletedDocuments"):
+        if details.get(key) is not None:
+            return details[key]
+    return 0
+
+
+def print_watch_summary(statistics: Dict[str, Dict]):
+    table = Table(title="MeiliSearch tasks per index")
+    table.add_column("Index", style="magenta", no_wrap=True)
+    table.add_column("Tasks", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Mean latency (s)", justify="right")
+    table.add_column("Max latency (s)", justify="right")
+    table.add_column("Documents", justify="right")
+    table.add_column("Docs/s", justify="right")
+    for index_uid, stats in sorted(statistics.items()):
+        latencies = stats["latencies"]
+        span = (stats["last_finished"] - stats["first_enqueued"]).total_seconds()
+        table.add_row(
+            index_uid,
+            str(len(latencies)),
+            str(stats["failed"]),
+            f"{sum(latencies) / len(latencies):.3f}",
+            f"{max(latencies):.3f}",
+            str(stats["documents"]),
+            f"{stats['documents'] / span:.0f}" if span > 0 else "",
+        )
+    console.print(table)
+
+
+@app.command()
+def watch(
+    ctx: typer.Context,
+    task_uids: Annotated[
+        Optional[List[int]],
+        typer.Argument(help="Task uids, all the unfinished tasks if none is given"),
+    ] = None,
+    index: Annotated[
+        Optional[List[str]],
+        typer.Option(help="Only watch the unfinished tasks of this index"),
+    ] = None,
+    interval: Annotated[
+        float, typer.Option(help="Initial number of seconds between two polls")
+    ] = 0.5,
+    max_interval: Annotated[
+        float, typer.Option(help="Maximum number of seconds between two polls")
+    ] = 5.0,
+):
+    """
+    Stream the status transitions of MeiliSearch tasks until they are finished,
+    then print the enqueued-to-finished latency and throughput per index.
+    """
+    client = ctx.obj["client"]
+    statistics: Dict[str, Dict] = {}
+    transitions = gen_task_transitions(
+        client, task_uids or None, index, interval, max_interval
+    )
+    try:
+        for previous, task in transitions:
+            console.print(
+                f"task {task.uid} ({task.index_uid}, {task.type}): "
+                f"{previous or 'new'} → {task.status}"
+            )
+            latency = task_latency(task)
+            if latency is None:
+                continue
+            stats = statistics.setdefault(
+                str(task.index_uid),
+                {
+                    "latencies": [],
+                    "failed": 0,
+                    "documents": 0,
+                    "first_enqueued": task.enqueued_at,
+                    "last_finished": task.finished_at,
+                },
+            )
+            stats["latencies"].append(latency)
+            stats["failed"] += task.status != "succeeded"
+            stats["documents"] += count_task_documents(task)
+            stats["first_enqueued"] = min(stats["first_enqueued"], task.enqueued_at)
+            stats["last_finished"] = max(stats["last_finished"], task.finished_at)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1) from None
+    except KeyboardInterrupt:
+        pass
+    if statistics:
+        print_watch_summary(statistics)
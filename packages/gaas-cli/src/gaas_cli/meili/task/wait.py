@@ -0,0 +1,157 @@
+import time
+from itertools import batched
+from typing import Dict, Generator, Iterable, List, Optional, Tuple
+
+from meilisearch.errors import MeilisearchTimeoutError
+
+from gaas_cli.profiling import stage
+
+FINISHED_STATUSES = ["succeeded", "failed", "canceled"]
+UNFINISHED_STATUSES = ["enqueued", "processing"]
+
+# Maximum number of task uids sent in a single `get_tasks` query
+TASK_UIDS_PER_REQUEST = 100
+
+
+def next_interval(
+    interval: float, progressed: bool, min_interval: float, max_interval: float
+) -> float:
+    """
+    Adaptive polling interval: back off while nothing changes, poll again
+    quickly as soon as tasks make progress.
+    """
+    if progressed:
+        return min_interval
+    return min(interval * 1.5, max_interval)
+
+
+def get_tasks_by_uids(
+    client, task_uids: Iterable[int], statuses: Optional[List[str]] = None
+) -> List:
+    """
+    Fetch tasks with `get_tasks` queries of at most `TASK_UIDS_PER_REQUEST`
+    uids, optionally filtered on their statuses.
+    """
+    tasks = []
+    for chunk in batched(sorted(task_uids), TASK_UIDS_PER_REQUEST, strict=False):
+        parameters = {"uids": [str(uid) for uid in chunk], "limit": len(chunk)}
+        if statuses is not None:
+            parameters["statuses"] = statuses
+        tasks.extend(client.get_tasks(parameters).results)
+    return tasks
+
+
+def wait_for_tasks(
+    client,
+    task_uids: Iterable[int],
+    timeout: Optional[float] = None,
+    interval: float = 0.5,
+    max_interval: float = 5.0,
+) -> List:
+    """
+    Wait until all the given tasks are finished.
+
+    Tasks are polled with batched `get_tasks` queries filtered on the task uids
+    and on the finished statuses, instead of one request per task. The polling
+    interval grows while no task finishes.
+
+    Args:
+      client: MeiliSearch client.
+      task_uids: Uids of the tasks to wait for.
+      timeout: Maximum number of seconds to wait. Wait forever if None.
+      interval: Initial number of seconds between two polls.
+      max_interval: Maximum number of seconds between two polls.
+    Returns:
+      list: The finished tasks, in the order of `task_uids`.
+    Raises:
+      ValueError: Some tasks do not exist.
+    """
+    task_uids = list(task_uids)
+    pending = set(task_uids)
+    finished: Dict[int, object] = {}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = interval
+    # The first poll is not filtered on statuses to detect unknown tasks
+    statuses = None
+    while True:
+        count_pending = len(pending)
+        with stage("network"):
+            tasks = get_tasks_by_uids(client, pending, statuses)
+        if statuses is None:
+            missing = pending - {task.uid for task in tasks}
+            if missing:
+                raise ValueError(f"Unknown task(s): {sorted(missing)}")
+            statuses = FINISHED_STATUSES
+        for task in tasks:
+            if task.status not in FINISHED_STATUSES:
+                continue
+            finished[task.uid] = task
+            pending.discard(task.uid)
+        if not pending:
+            return [finished[uid] for uid in task_uids]
+        if deadline is not None and time.monotonic() >= deadline:
+            raise MeilisearchTimeoutError(
+                f"timeout of {timeout}s exceeded while waiting for "
+                f"{len(pending)} task(s)"
+            )
+        delay = next_interval(
+            delay, len(pending) < count_pending, interval, max_interval
+        )
+        with stage("wait"):
+            time.sleep(delay)
+
+
+def gen_task_transitions(
+    client,
+    task_uids: Optional[Iterable[int]] = None,
+    index_uids: Optional[List[str]] = None,
+    interval: float = 0.5,
+    max_interval: float = 5.0,
+) -> Generator[Tuple[Optional[str], object], None, None]:
+    """
+    Generator of the status transitions of tasks, until all the watched tasks
+    are finished.
+
+    Without `task_uids`, the unfinished tasks (of `index_uids` if given) are
+    discovered at each poll and watched until they finish.
+
+    Yields:
+      tuple: The previous status (None for a newly seen task) and the task.
+    Raises:
+      ValueError: Some of the `task_uids` do not exist.
+    """
+    statuses: Dict[int, str] = {}
+    watched = set(task_uids) if task_uids is not None else set()
+    delay = interval
+    while True:
+        tasks = {}
+        if task_uids is None:
+            parameters = {"statuses": UNFINISHED_STATUSES, "limit": 1000}
+            if index_uids:
+                parameters["indexUids"] = index_uids
+            for task in client.get_tasks(parameters).results:
+                tasks[task.uid] = task
+                watched.add(task.uid)
+        unknown = [uid for uid in watched if uid not in tasks]
+        for task in get_tasks_by_uids(client, unknown):
+            tasks[task.uid] = task
+        missing = [uid for uid in unknown if uid not in tasks]
+        if any(uid not in statuses for uid in missing):
+            raise ValueError(f"Unknown task(s): {sorted(missing)}")
+        # Tasks that disappeared once seen have been deleted
+        watched.difference_update(missing)
+
+        progressed = False
+        for uid in sorted(tasks):
+            task = tasks[uid]
+            previous = statuses.get(uid)
+            if previous != task.status:
+                progressed = True
+                statuses[uid] = task.status
+                yield previous, task
+            if task.status in FINISHED_STATUSES:
+                watched.discard(uid)
+        if not watched:
+            return
+        delay = next_interval(delay, progressed, interval, max_interval)
+        time.sleep(delay)
@@ -0,0 +1,232 @@
+import cProfile
+import json
+import pstats
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+from rich.console import Console
+
+console = Console(stderr=True)
+
+T = TypeVar("T")
+
+# Number of functions of the cProfile statistics included in the trace
+PROFILE_TOP_FUNCTIONS = 30
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of the process since it started."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageCall:
+    """Bytes and items processed by one call of a stage, set by the caller."""
+
+    __slots__ = ("bytes", "items")
+
+    def __init__(self, bytes: int = 0, items: int = 0):
+        self.bytes = bytes
+        self.items = items
+
+
+class Tracer:
+    """
+    Wall time, bytes, items and memory of the stages of a command (read,
+    parse, transform, serialize, compress, network, wait, write).
+
+    Stages can nest and run in several threads at once: the time of a stage is
+    the sum of the time of its calls, and can exceed the wall time of the
+    command. The memory of a stage is the growth of the peak RSS of the process
+    during its calls.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, seconds: float, call: StageCall, rss_before: int):
+        rss = peak_rss_bytes()
+        with self.lock:
+            stats = self.stages.setdefault(
+                name,
+                {
+                    "calls": 0,
+                    "seconds": 0.0,
+                    "bytes": 0,
+                    "items": 0,
+                    "rss_growth_bytes": 0,
+                    "peak_rss_bytes": 0,
+                },
+            )
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["bytes"] += call.bytes
+            stats["items"] += call.items
+            stats["rss_growth_bytes"] += rss - rss_before
+            stats["peak_rss_bytes"] = max(stats["peak_rss_bytes"], rss)
+
+    def trace(self) -> Dict[str, Any]:
+        with self.lock:
+            stages = {
+                name: stats | {"seconds": round(stats["seconds"], 6)}
+                for name, stats in self.stages.items()
+            }
+        return {
+            "argv": sys.argv[1:],
+            "wall_seconds": round(time.perf_counter() - self.start, 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": stages,
+        }
+
+
+# Tracer of the running command, None unless profiling is enabled
+tracer: Optional[Tracer] = None
+
+
+@contextmanager
+def stage(name: str, bytes: int = 0, items: int = 0) -> Iterator[StageCall]:
+    """
+    Record the time of the enclosed code as a call of the stage `name`. The
+    bytes and items processed can be given upfront or set on the yielded
+    `StageCall`. Does nothing unless profiling is enabled.
+    """
+    call = StageCall(bytes, items)
+    current = tracer
+    if current is None:
+        yield call
+        return
+    rss = peak_rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        current.record(name, time.perf_counter() - start, call, rss)
+
+
+def gen_staged(
+    name: str, iterable: Iterable[T], size: Optional[Callable[[T], int]] = None
+) -> Generator[T, None, None]:
+    """
+    Generator of the items of `iterable`, recording the time taken to produce
+    each item as a call of the stage `name`.
+
+    Args:
+      name: Name of the stage.
+      iterable: Lazy iterable, typically a generator reading and parsing a file.
+      size: Number of items counted for each produced item. Defaults to 1.
+    """
+    current = tracer
+    if current is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        rss = peak_rss_bytes()
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        call = StageCall(items=size(item) if size else 1)
+        current.record(name, time.perf_counter() - start, call, rss)
+        yield item
+
+
+def profile_functions(profiler: cProfile.Profile, limit: int) -> list:
+    """The `limit` functions with the highest cumulative time."""
+    stats = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    functions = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "function": f"{file}:{line}({function})",
+            "calls": calls,
+            "own_seconds": round(own_time, 6),
+            "cumulative_seconds": round(cumulative_time, 6),
+        }
+        for (file, line, function), (_, calls, own_time, cumulative_time, _) in (
+            functions[:limit]
+        )
+    ]
+
+
+def print_trace(trace: Dict[str, Any]):
+    from rich.table import Table
+
+    table = Table(
+        title=f"{trace['wall_seconds']:.2f}s, "
+        f"peak RSS {trace['peak_rss_bytes'] / 1e6:.0f} MB"
+    )
+    for column in ("Stage", "Calls", "Seconds", "MB", "Items", "RSS growth MB"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for name, stats in sorted(
+        trace["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True
+    ):
+        table.add_row(
+            name,
+            str(stats["calls"]),
+            f"{stats['seconds']:.3f}",
+            f"{stats['bytes'] / 1e6:.1f}",
+            str(stats["items"]),
+            f"{stats['rss_growth_bytes'] / 1e6:.1f}",
+        )
+    console.print(table)
+
+
+def start_profiling(
+    ctx,
+    summary: bool = False,
+    trace_out: Optional[Path] = None,
+    cprofile_out: Optional[Path] = None,
+):
+    """
+    Trace the stages of the command, and run it under cProfile when
+    `cprofile_out` is given. The summary, trace and statistics are written when
+    the context closes, after the command finished or failed.
+
+    Args:
+      ctx: Context of the root command.
+      summary: Print a table of the stages.
+      trace_out: JSON file receiving the stages, and the top functions of
+        cProfile if enabled.
+      cprofile_out: File receiving the cProfile statistics, in the pstats
+        format.
+    """
+    global tracer
+    tracer = Tracer()
+    profiler = None
+    if cprofile_out is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def finish():
+        global tracer
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_out)
+        trace = tracer.trace()
+        tracer = None
+        if profiler is not None:
+            trace["profile"] = profile_functions(profiler, PROFILE_TOP_FUNCTIONS)
+        if trace_out is not None:
+            trace_out.write_text(json.dumps(trace, indent=2) + "\n")
+        if summary:
+            print_trace(trace)
+
+    ctx.call_on_close(finish)
@@ -0,0 +1,305 @@
+import json
+import tempfile
+from typing import Any, Dict, Generator, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.json as pajson
+
+from gaas_cli.schema.utils import NA_VALUES
+
+# Size in bytes of the blocks of NDJSON parsed at once by default
+NDJSON_BLOCK_SIZE = 1 << 20
+
+
+def parse_column_types(values: Optional[List[str]]) -> Dict[str, pa.DataType]:
+    """
+    Parse `name=type` column type declarations, where type is an Arrow type
+    alias such as `int64`, `float64`, `string`, `bool` or `timestamp[s]`.
+    """
+    column_types = {}
+    for value in values or []:
+        name, sep, type_alias = value.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Invalid column type '{value}', expected name=type")
+        column_types[name] = pa.type_for_alias(type_alias.strip())
+    return column_types
+
+
+def documents_to_table(
+    documents: List[Dict[str, Any]],
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> pa.Table:
+    """
+    Arrow table of a list of documents, with a column for every field found
+    in any document, in order of appearance. Each column is typed from all of
+    its values, or with its type in `column_types`, and is null where a
+    document lacks the field.
+
+    The values of a field with incompatible types (e.g. 1.5 and "na") are
+    kept in a string column, JSON-encoded when they are not strings, for the
+    schema coercions to parse them.
+
+    Raises:
+      ValueError: The values of a field do not match its type in
+        `column_types`.
+    """
+    names = list(dict.fromkeys(name for document in documents for name in document))
+    columns = []
+    for name in names:
+        values = [document.get(name) for document in documents]
+        type = (column_types or {}).get(name)
+        try:
+            columns.append(pa.array(values, type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            if type is not None and not is_string_type(type):
+                raise ValueError(f"Field '{name}' does not match {type}: {e}") from e
+            columns.append(json_strings(values, type or pa.large_string()))
+    return pa.Table.from_arrays(columns, names=names)
+
+
+def is_string_type(type: pa.DataType) -> bool:
+    return pa.types.is_string(type) or pa.types.is_large_string(type)
+
+
+def json_strings(values: List[Any], type: pa.DataType) -> pa.Array:
+    """
+    String column of values of any type: strings are kept, the other values
+    are JSON-encoded.
+    """
+    return pa.array(
+        [
+            (
+                value
+                if value is None or isinstance(value, str)
+                else json.dumps(value, ensure_ascii=False)
+            )
+            for value in values
+        ],
+        type,
+    )
+
+
+def cast_column(values, type: pa.DataType):
+    """
+    Cast a column to `type`. Values that Arrow cannot cast to a string column
+    (lists, structs) are JSON-encoded.
+    """
+    if values.type == type:
+        return values
+    try:
+        return values.cast(type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        if not is_string_type(type):
+            raise
+        return json_strings(values.to_pylist(), type)
+
+
+def conform_table(table: pa.Table | pa.RecordBatch, schema: pa.Schema) -> pa.Table:
+    """
+    Table with the columns of `schema`, in its order and cast to its types.
+    The columns missing from `table` are nulls, the columns not in `schema`
+    are left out.
+    """
+    columns = [
+        (
+            cast_column(table[field.name], field.type)
+            if field.name in table.column_names
+            else pa.nulls(table.num_rows, field.type)
+        )
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def unify_schemas(
+    schemas: Iterable[pa.Schema],
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> pa.Schema:
+    """
+    Schema holding the fields of all the schemas, with the types of the
+    same field promoted to a common type (e.g. int64 and double to double,
+    null to any type). The fields whose types have no common type (e.g.
+    double and string) are typed as strings. The types of `column_types`
+    replace the inferred ones.
+    """
+    schemas = [
+        pa.schema(
+            (
+                field.with_type(column_types[field.name])
+                if column_types and field.name in column_types
+                else field
+            )
+            for field in schema
+        )
+        for schema in schemas
+    ]
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    fields: Dict[str, List[pa.Field]] = {}
+    for schema in schemas:
+        for field in schema:
+            fields.setdefault(field.name, []).append(field)
+    unified = []
+    for name, same_fields in fields.items():
+        try:
+            unified.append(
+                pa.unify_schemas(
+                    [pa.schema([field]) for field in same_fields],
+                    promote_options="permissive",
+                ).field(0)
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            unified.append(pa.field(name, pa.large_string()))
+    return pa.schema(unified)
+
+
+def gen_unified_batches(
+    record_batches: Iterable[pa.RecordBatch],
+) -> Generator[pa.RecordBatch, None, None]:
+    """
+    Generator of a stream of record batches of varying schemas, all cast to
+    the schema unifying them.
+
+    That schema is only known at the end of the stream, so the batches are
+    spilled to a temporary Arrow IPC file as they come, one IPC stream per
+    run of batches of the same schema, and read back once it is known. The
+    input is parsed once, the spill costs a sequential write and read of the
+    Arrow data.
+    """
+    with tempfile.TemporaryFile() as spill:
+        schema = None
+        writer = None
+        stream_schema = None
+        count_streams = 0
+        for record_batch in record_batches:
+            if writer is None or record_batch.schema != stream_schema:
+                if writer is not None:
+                    writer.close()
+                stream_schema = record_batch.schema
+                writer = pa.ipc.new_stream(spill, stream_schema)
+                count_streams += 1
+                schema = unify_schemas(
+                    [stream_schema] if schema is None else [schema, stream_schema]
+                )
+            writer.write_batch(record_batch)
+        if writer is None:
+            return
+        writer.close()
+        spill.seek(0)
+        for _ in range(count_streams):
+            for record_batch in pa.ipc.open_stream(spill):
+                if record_batch.schema == schema:
+                    yield record_batch
+                else:
+                    yield from conform_table(record_batch, schema).to_batches()
+
+
+def csv_read_options(block_size: Optional[int] = None) -> pacsv.ReadOptions:
+    options = pacsv.ReadOptions(use_threads=True)
+    if block_size is not None:
+        options.block_size = block_size
+    return options
+
+
+def csv_convert_options(
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> pacsv.ConvertOptions:
+    """
+    CSV conversion options turning the values of `NA_VALUES` into nulls for
+    every column type, strings included.
+    """
+    return pacsv.ConvertOptions(
+        column_types=column_types or {},
+        null_values=list(NA_VALUES),
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=True,
+    )
+
+
+def read_csv(
+    source,
+    block_size: Optional[int] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> pa.Table:
+    """
+    Read a whole CSV file into an Arrow table, parsing blocks on all cores.
+    """
+    return pacsv.read_csv(
+        source,
+        read_options=csv_read_options(block_size),
+        convert_options=csv_convert_options(column_types),
+    )
+
+
+def open_csv(
+    source,
+    block_size: Optional[int] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> pacsv.CSVStreamingReader:
+    """
+    Open a CSV file as a stream of record batches of about `block_size` bytes.
+    """
+    return pacsv.open_csv(
+        source,
+        read_options=csv_read_options(block_size),
+        convert_options=csv_convert_options(column_types),
+    )
+
+
+def gen_ndjson_blocks(path, block_size: int) -> Generator[bytes, None, None]:
+    """Blocks of complete lines of about `block_size` bytes of a file."""
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            yield block + f.readline()
+
+
+def gen_ndjson_record_batches(
+    path,
+    block_size: Optional[int] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+) -> Generator[pa.RecordBatch, None, None]:
+    """
+    Generator of the record batches of a newline-delimited JSON file, block by
+    block. Each block is typed from its own rows, rather than from the first
+    block as the streaming Arrow JSON reader does, so that fields first seen
+    after the first block are kept. The types of `column_types` replace the
+    inferred ones.
+    """
+    read_options = pajson.ReadOptions(use_threads=True)
+    parse_options = pajson.ParseOptions(unexpected_field_behavior="infer")
+    if column_types:
+        parse_options.explicit_schema = pa.schema(column_types)
+    for block in gen_ndjson_blocks(path, block_size or NDJSON_BLOCK_SIZE):
+        yield from pajson.read_json(
+            pa.BufferReader(block),
+            read_options=read_options,
+            parse_options=parse_options,
+        ).to_batches()
+
+
+def gen_rebatched(
+    record_batches: Iterable[pa.RecordBatch], batch_size: int
+) -> Generator[pa.Table, None, None]:
+    """
+    Generator regrouping a stream of record batches into tables of exactly
+    `batch_size` rows, the last one possibly smaller.
+    """
+    pending: List[pa.RecordBatch] = []
+    count_pending = 0
+    for record_batch in record_batches:
+        pending.append(record_batch)
+        count_pending += record_batch.num_rows
+        if count_pending < batch_size:
+            continue
+        table = pa.Table.from_batches(pending)
+        offset = 0
+        while count_pending - offset >= batch_size:
+            yield table.slice(offset, batch_size)
+            offset += batch_size
+        pending = table.slice(offset).to_batches()
+        count_pending -= offset
+    if count_pending:
+        yield pa.Table.from_batches(pending)
@@ -0,0 +1,286 @@
+import importlib
+import importlib.util
+import json
+import types
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    get_args,
+    get_origin,
+)
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from pydantic import BaseModel, BeforeValidator
+
+from gaas_cli.profiling import stage
+from gaas_cli.schema.utils import (
+    NA_VALUES,
+    comma_split,
+    na_float_to_none,
+    na_string_to_none,
+)
+
+FLOAT_PATTERN = r"(?i)^\s*[+-]?((\d+(\.\d*)?|\.\d+)(e[+-]?\d+)?|inf|infinity|nan)\s*$"
+INT_PATTERN = r"^\s*[+-]?\d+\s*$"
+BOOL_PATTERN = r"(?i)^\s*(true|false|1|0)\s*$"
+JSON_ARRAY_PATTERN = r"^\s*\["
+
+# Number of failing values kept as examples for each column
+MAX_FAILURE_EXAMPLES = 5
+
+# A column coercion returns the coerced column and the mask of the values that
+# could not be coerced (and were replaced by nulls)
+Coercion = Callable[[pa.Array], Tuple[pa.Array, pa.Array]]
+
+
+def _null_sentinels(values: pa.Array) -> pa.Array:
+    """Replace the `NA_VALUES` strings by nulls."""
+    is_sentinel = pc.is_in(values, value_set=pa.array(NA_VALUES, values.type))
+    return pc.if_else(is_sentinel, None, values)
+
+
+def _no_failures(values: pa.Array) -> pa.Array:
+    return pa.nulls(len(values), pa.bool_()).fill_null(False)
+
+
+def _parse_strings(
+    values: pa.Array, pattern: str, target: pa.DataType
+) -> Tuple[pa.Array, pa.Array]:
+    """Cast the strings matching `pattern`, the others become nulls."""
+    valid = pc.match_substring_regex(values, pattern)
+    failed = pc.fill_null(pc.invert(valid), False)
+    strings = pc.utf8_trim_whitespace(pc.if_else(valid, values, None))
+    if pa.types.is_integer(target):
+        # Arrow parses a leading plus sign for floats only
+        strings = pc.replace_substring_regex(strings, r"^\+", "")
+    return pc.cast(strings, target), failed
+
+
+def _as_strings(values: pa.Array) -> pa.Array:
+    if pa.types.is_dictionary(values.type):
+        values = values.dictionary_decode()
+    if pa.types.is_large_string(values.type) or pa.types.is_string(values.type):
+        return values
+    return pc.cast(values, pa.string())
+
+
+def coerce_na_float(values: pa.Array) -> Tuple[pa.Array, pa.Array]:
+    """Column-wise `na_float_to_none`: sentinels and NaN become nulls."""
+    if pa.types.is_floating(values.type) or pa.types.is_integer(values.type):
+        parsed, failed = pc.cast(values, pa.float64()), _no_failures(values)
+    else:
+        strings = _null_sentinels(_as_strings(values))
+        parsed, failed = _parse_strings(strings, FLOAT_PATTERN, pa.float64())
+    return pc.if_else(pc.is_nan(parsed), None, parsed), failed
+
+
+def coerce_na_string(values: pa.Array) -> Tuple[pa.Array, pa.Array]:
+    """Column-wise `na_string_to_none`: sentinels become nulls."""
+    return _null_sentinels(_as_strings(values)), _no_failures(values)
+
+
+def _decode_json_list(value: str, items: Optional[List[str]]) -> Optional[List]:
+    try:
+        decoded = json.loads(value)
+    except ValueError:
+        return items
+    if not isinstance(decoded, list):
+        return items
+    return [
+        item if item is None or isinstance(item, str) else json.dumps(item)
+        for item in decoded
+    ]
+
+
+def _split_commas(strings: pa.Array) -> pa.Array:
+    """
+    Split strings on commas into lists. The strings holding a JSON array, such
+    as the lists of a JSON field mixing strings and lists, are decoded instead.
+    """
+    lists = pc.split_pattern(strings, ",")
+    is_json = pc.match_substring_regex(strings, JSON_ARRAY_PATTERN)
+    if not pc.any(is_json).as_py():
+        return lists
+    return pa.array(
+        [
+            _decode_json_list(value, items) if json_array else items
+            for value, items, json_array in zip(
+                strings.to_pylist(),
+                lists.to_pylist(),
+                is_json.to_pylist(),
+                strict=True,
+            )
+        ],
+        pa.list_(pa.string()),
+    )
+
+
+def coerce_comma_list(values: pa.Array) -> Tuple[pa.Array, pa.Array]:
+    """
+    Column-wise `comma_split`: strings are split on commas into list columns,
+    items are stripped, empty items dropped and nulls become empty lists.
+    """
+    if pa.types.is_list(values.type) or pa.types.is_large_list(values.type):
+        lists = values
+    else:
+        lists = _split_commas(_as_strings(values))
+    lists = pc.fill_null(lists, pa.scalar([], lists.type))
+    items = pc.utf8_trim_whitespace(_as_strings(pc.list_flatten(lists)))
+    parents = pc.list_parent_indices(lists)
+    keep = pc.not_equal(items, "")
+    kept_parents = pc.filter(parents, keep).to_numpy(zero_copy_only=False)
+    counts = np.bincount(kept_parents, minlength=len(lists))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+    return (
+        pa.ListArray.from_arrays(pa.array(offsets), pc.filter(items, keep)),
+        _no_failures(values),
+    )
+
+
+def _coerce_cast(
+    pattern: str, target: pa.DataType
+) -> Callable[[pa.Array], Tuple[pa.Array, pa.Array]]:
+    def coerce(values: pa.Array) -> Tuple[pa.Array, pa.Array]:
+        if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+            return _parse_strings(values, pattern, target)
+        try:
+            return pc.cast(values, target), _no_failures(values)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return _parse_strings(_as_strings(values), pattern, target)
+
+    return coerce
+
+
+VALIDATOR_COERCIONS: Dict[Callable, Coercion] = {
+    na_float_to_none: coerce_na_float,
+    na_string_to_none: coerce_na_string,
+    comma_split: coerce_comma_list,
+}
+
+TYPE_COERCIONS: Dict[type, Coercion] = {
+    float: _coerce_cast(FLOAT_PATTERN, pa.float64()),
+    int: _coerce_cast(INT_PATTERN, pa.int64()),
+    bool: _coerce_cast(BOOL_PATTERN, pa.bool_()),
+    str: lambda values: (_as_strings(values), _no_failures(values)),
+}
+
+
+def _unwrap_optional(annotation):
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def compile_model(model: type[BaseModel]) -> Dict[str, Coercion]:
+    """
+    Compile a pydantic model built from the `schema.utils` annotated types
+    into one column-wise Arrow coercion per field.
+
+    Fields are keyed by their alias when they have one. Fields whose type has
+    no column-wise equivalent are left untouched.
+    """
+    coercions = {}
+    for name, field in model.model_fields.items():
+        column = field.alias or name
+        validators = [
+            metadata.func
+            for metadata in field.metadata
+            if isinstance(metadata, BeforeValidator)
+        ]
+        coercion = next(
+            (VALIDATOR_COERCIONS[v] for v in validators if v in VALIDATOR_COERCIONS),
+            None,
+        )
+        if coercion is None:
+            coercion = TYPE_COERCIONS.get(_unwrap_optional(field.annotation))
+        if coercion is not None:
+            coercions[column] = coercion
+    return coercions
+
+
+def load_model(spec: str) -> type[BaseModel]:
+    """
+    Import a pydantic model from a `module:Model` or `path/to/file.py:Model`
+    specification.
+    """
+    module_name, sep, model_name = spec.rpartition(":")
+    if not sep or not module_name or not model_name:
+        raise ValueError(f"Invalid schema '{spec}', expected module:Model")
+    if module_name.endswith(".py"):
+        path = Path(module_name)
+        module_spec = importlib.util.spec_from_file_location(path.stem, path)
+        if module_spec is None or module_spec.loader is None:
+            raise ValueError(f"Cannot import schema module '{module_name}'")
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    model = getattr(module, model_name, None)
+    if not (isinstance(model, type) and issubclass(model, BaseModel)):
+        raise ValueError(f"'{spec}' is not a pydantic model")
+    return model
+
+
+class SchemaCoercer:
+    """
+    Apply the compiled coercions of a pydantic model to Arrow tables, batch
+    after batch, and accumulate the coercion failures of each column instead
+    of raising on the first bad value.
+    """
+
+    def __init__(self, model: type[BaseModel]):
+        self.coercions = compile_model(model)
+        self.required = [
+            field.alias or name
+            for name, field in model.model_fields.items()
+            if field.is_required()
+        ]
+        self.failures: Dict[str, int] = {}
+        self.examples: Dict[str, List] = {}
+        self.missing: List[str] = []
+
+    def __call__(self, table: pa.Table) -> pa.Table:
+        with stage("transform", table.nbytes, table.num_rows):
+            return self.coerce(table)
+
+    def coerce(self, table: pa.Table) -> pa.Table:
+        for column in self.required:
+            if column not in table.column_names and column not in self.missing:
+                self.missing.append(column)
+        for column, coercion in self.coercions.items():
+            if column not in table.column_names:
+                continue
+            values = table[column].combine_chunks()
+            coerced, failed = coercion(values)
+            count_failed = pc.sum(failed).as_py() or 0
+            if count_failed:
+                self.failures[column] = self.failures.get(column, 0) + count_failed
+                examples = self.examples.setdefault(column, [])
+                if len(examples) < MAX_FAILURE_EXAMPLES:
+                    examples.extend(
+                        pc.filter(values, failed)
+                        .slice(0, MAX_FAILURE_EXAMPLES - len(examples))
+                        .to_pylist()
+                    )
+            table = table.set_column(table.column_names.index(column), column, coerced)
+        return table
+
+    def report(self) -> List[str]:
+        """Human readable summary of the coercion failures."""
+        lines = [f"Required column '{column}' is missing" for column in self.missing]
+        for column, count in self.failures.items():
+            examples = ", ".join(repr(value) for value in self.examples[column])
+            lines.append(
+                f"Column '{column}': {count} value(s) could not be coerced "
+                f"and were set to null (e.g. {examples})"
+            )
+        return lines
@@ -0,0 +1,80 @@
+import json
+from typing import Any, Generator, TextIO
+
+# Size of the text blocks read from JSON inputs in streaming mode
+JSON_READ_SIZE = 1 << 20
+
+
+def gen_json_values(stream: TextIO) -> Generator[Any, None, None]:
+    """
+    Incrementally parse a JSON array or a stream of JSON values
+    (newline-delimited JSON) without loading the whole input.
+
+    Yields:
+      Any: Each element of the top-level array, or each top-level value.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = stream.read(JSON_READ_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if not fill():
+                return False
+
+    if not skip_whitespace():
+        return
+    in_array = buffer[pos] == "["
+    if in_array:
+        pos += 1
+        if not skip_whitespace():
+            raise ValueError("Unexpected end of JSON input")
+        if buffer[pos] == "]":
+            return
+
+    while True:
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if fill():
+                continue
+            raise
+        # A value touching the end of the buffer may be truncated (e.g. a number)
+        if end == len(buffer) and fill():
+            continue
+        pos = end
+        yield value
+
+        has_more = skip_whitespace()
+        if in_array:
+            if not has_more:
+                raise ValueError("Unexpected end of JSON input")
+            if buffer[pos] == "]":
+                return
+            if buffer[pos] != ",":
+                raise ValueError(
+                    f"Expected ',' or ']' in JSON array, got {buffer[pos]!r}"
+                )
+            pos += 1
+            if not skip_whitespace():
+                raise ValueError("Unexpected end of JSON input")
+        elif not has_more:
+            return
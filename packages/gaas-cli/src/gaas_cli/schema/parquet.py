@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class ParquetCompression(str, Enum):
+    snappy = "snappy"
+    zstd = "zstd"
+    gzip = "gzip"
+    brotli = "brotli"
+    lz4 = "lz4"
+    none = "none"
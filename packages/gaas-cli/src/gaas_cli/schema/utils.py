@@ -3,9 +3,12 @@ from typing import Annotated, Optional, Union
 
 from pydantic import BeforeValidator
 
+# String values standing for a missing value
+NA_VALUES = ("", "na", "nan")
+
 
 def na_float_to_none(v: Union[str, float, None]) -> Optional[float]:
-    if v is None or v in ("", "na", "nan"):
+    if v is None or v in NA_VALUES:
         return None
     try:
         float_val = float(v)
@@ -15,7 +18,7 @@ def na_float_to_none(v: Union[str, float, None]) -> Optional[float]:
 
 
 def na_string_to_none(v: Union[str, None]) -> Optional[str]:
-    if v is None or v in ("", "na", "nan"):
+    if v is None or v in NA_VALUES:
         return None
     if isinstance(v, str):
         return v
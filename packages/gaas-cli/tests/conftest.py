@@ -0,0 +1,50 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from gaas_cli.main import app
+
+BENCHMARKS = Path(__file__).parents[1] / "benchmarks"
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    """Run the gaas command in an empty directory and return its result."""
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+
+    def invoke(*args: str):
+        return runner.invoke(app, list(args))
+
+    return invoke
+
+
+@pytest.fixture(scope="session")
+def standin():
+    """
+    Base URL of the local stand-in of the Meilisearch API of the benchmarks,
+    running for the whole test session.
+    """
+    process = subprocess.Popen(
+        [sys.executable, str(BENCHMARKS / "standin.py"), "--port", "0"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        yield process.stdout.readline().strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture
+def meili(cli, standin):
+    """Run a gaas meili command against the stand-in."""
+
+    def invoke(*args: str):
+        return cli("meili", "--host", standin, "--key", "test", *args)
+
+    return invoke
@@ -0,0 +1,122 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from pydantic import BaseModel, Field
+
+from gaas_cli.meili.document.loader import transform_documents
+from gaas_cli.schema.coerce import SchemaCoercer, load_model
+from gaas_cli.schema.utils import CommaList, NaFloat, NaString
+
+MODEL = """
+from pydantic import BaseModel
+
+from gaas_cli.schema.utils import CommaList, NaFloat
+
+
+class Product(BaseModel):
+    price: NaFloat
+    tags: CommaList
+"""
+
+
+class Product(BaseModel):
+    price: NaFloat
+    label: NaString = None
+    tags: CommaList = []
+
+
+def test_mixed_type_fields_are_coerced():
+    coercer = SchemaCoercer(Product)
+    documents = transform_documents(
+        [
+            {"id": 1, "price": 1.5, "tags": "a, b"},
+            {"id": 2, "price": "na", "tags": ["c", "d"]},
+            {"id": 3, "price": "abc", "label": "nan"},
+        ],
+        coercer,
+    )
+    assert documents == [
+        {"id": 1, "price": 1.5, "tags": ["a", "b"]},
+        {"id": 2, "price": None, "tags": ["c", "d"]},
+        {"id": 3, "price": None, "label": None},
+    ]
+    assert coercer.failures == {"price": 1}
+    assert coercer.examples == {"price": ["abc"]}
+
+
+def test_missing_required_column_is_reported():
+    coercer = SchemaCoercer(Product)
+    coercer(pa.table({"label": ["x"]}))
+    assert coercer.report() == ["Required column 'price' is missing"]
+
+
+def test_to_parquet_coerces_mixed_type_json(cli, tmp_path):
+    (tmp_path / "model.py").write_text(MODEL)
+    documents = [
+        {"id": 1, "price": 1.5, "tags": "a,b"},
+        {"id": 2, "price": "na", "tags": ["c"]},
+        {"id": 3, "price": "bad", "tags": None},
+    ]
+    (tmp_path / "na.json").write_text(json.dumps(documents))
+
+    result = cli("content", "to-parquet", "na.json", "--schema", "model.py:Product")
+
+    assert result.exit_code == 0, result.output
+    assert "Column 'price': 1 value(s) could not be coerced" in result.output
+    assert pq.read_table(tmp_path / "na.parquet").to_pylist() == [
+        {"id": 1, "price": 1.5, "tags": ["a", "b"]},
+        {"id": 2, "price": None, "tags": ["c"]},
+        {"id": 3, "price": None, "tags": []},
+    ]
+
+
+def test_column_coercions_match_the_pydantic_validators():
+    class Model(BaseModel):
+        price: NaFloat
+        count: int
+        enabled: bool
+        tags: CommaList
+        name: NaString = Field(None, alias="Name")
+
+    coercer = SchemaCoercer(Model)
+    table = coercer(
+        pa.table(
+            {
+                "price": ["1.5", " 2e3 ", "na", "", "nan", "x"],
+                "count": ["1", "+2", " 3 ", "4.5", None, "x"],
+                "enabled": ["true", "False", "1", "0", "yes", None],
+                "tags": ["a, b", " c ,, d", "", None, "e", ","],
+                "Name": ["x", "na", "", None, "nan", "y"],
+            }
+        )
+    )
+
+    assert table.to_pydict() == {
+        "price": [1.5, 2000.0, None, None, None, None],
+        "count": [1, 2, 3, None, None, None],
+        "enabled": [True, False, True, False, None, None],
+        "tags": [["a", "b"], ["c", "d"], [], [], ["e"], []],
+        "Name": ["x", None, None, None, None, "y"],
+    }
+    assert coercer.failures == {"price": 1, "count": 2, "enabled": 1}
+    assert coercer.examples["count"] == ["4.5", "x"]
+
+
+def test_failures_accumulate_over_batches():
+    coercer = SchemaCoercer(Product)
+    for _ in range(3):
+        coercer(pa.table({"price": ["1", "bad", "worse"]}))
+    assert coercer.failures == {"price": 6}
+    assert coercer.examples == {"price": ["bad", "worse", "bad", "worse", "bad"]}
+
+
+def test_load_model(tmp_path):
+    path = tmp_path / "model.py"
+    path.write_text(MODEL)
+    assert load_model(f"{path}:Product").model_fields.keys() == {"price", "tags"}
+    with pytest.raises(ValueError, match="not a pydantic model"):
+        load_model(f"{path}:BaseModel.__init__")
+    with pytest.raises(ValueError, match="expected module:Model"):
+        load_model("no_model")
@@ -0,0 +1,93 @@
+import pytest
+import requests
+
+from gaas_cli.biblio import crossref
+
+
+def test_resolve_dois_reports_request_failures_per_doi(monkeypatch, standin):
+    monkeypatch.setattr(crossref, "CROSSREF_WORKS_URL", f"{standin}/works/")
+    request = crossref.request_crossref_record
+
+    def request_crossref_record(doi, *args, **kwargs):
+        if doi == "10.1/redirects":
+            raise requests.TooManyRedirects("Exceeded 30 redirects.")
+        return request(doi, *args, **kwargs)
+
+    monkeypatch.setattr(crossref, "request_crossref_record", request_crossref_record)
+
+    records, errors = crossref.resolve_dois(["10.1/a", "10.1/redirects", "10.1/b"])
+
+    assert [record["message"]["DOI"] for record in records] == ["10.1/a", "10.1/b"]
+    assert errors == {"10.1/redirects": "Request failed: Exceeded 30 redirects."}
+
+
+def test_cache_normalizes_dois(tmp_path):
+    cache = crossref.CrossrefCache(tmp_path / "crossref.sqlite")
+    cache.put("https://doi.org/10.1/ABC", 200, {"message": {"DOI": "10.1/abc"}})
+    assert cache.get("10.1/abc") == (200, {"message": {"DOI": "10.1/abc"}})
+    assert cache.get("doi:10.1/Abc") == (200, {"message": {"DOI": "10.1/abc"}})
+    assert cache.get("10.1/other") is None
+    cache.close()
+
+
+def test_cache_expiry(tmp_path, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(crossref.time, "time", lambda: now)
+    cache = crossref.CrossrefCache(
+        tmp_path / "crossref.sqlite", ttl=100, negative_ttl=10
+    )
+    cache.put("10.1/found", 200, {"message": {}})
+    cache.put("10.1/unknown", 404)
+
+    now += 50
+    assert cache.get("10.1/found") == (200, {"message": {}})
+    assert cache.get("10.1/unknown") is None
+    now += 100
+    assert cache.get("10.1/found") is None
+    cache.close()
+
+
+def test_fetch_uses_the_cache_and_caches_only_final_answers(tmp_path):
+    cache = crossref.CrossrefCache(tmp_path / "crossref.sqlite")
+    cache.put("10.1/cached", 200, {"message": {"DOI": "from cache"}})
+    cache.put("10.1/unknown", 404)
+    statuses = {"10.1/error": 500, "10.1/missing": 404}
+
+    class Session:
+        def get(self, url, params=None, timeout=None):
+            doi = url.removeprefix(crossref.CROSSREF_WORKS_URL)
+            response = requests.Response()
+            response.status_code = statuses.get(doi, 200)
+            response._content = b'{"message": {"DOI": "%s"}}' % doi.encode()
+            return response
+
+    assert crossref.fetch_crossref_record("10.1/cached", cache, Session()) == {
+        "message": {"DOI": "from cache"}
+    }
+    with pytest.raises(crossref.CrossrefError):
+        crossref.fetch_crossref_record("10.1/unknown", cache, Session())
+    with pytest.raises(crossref.CrossrefError):
+        crossref.fetch_crossref_record("10.1/error", cache, Session())
+    with pytest.raises(crossref.CrossrefError):
+        crossref.fetch_crossref_record("10.1/missing", cache, Session())
+    crossref.fetch_crossref_record("10.1/new", cache, Session())
+
+    assert cache.get("10.1/error") is None
+    assert cache.get("10.1/missing") == (404, None)
+    assert cache.get("10.1/new") == (200, {"message": {"DOI": "10.1/new"}})
+    cache.close()
+
+
+def test_rate_limiter_follows_the_crossref_headers(monkeypatch):
+    limiter = crossref.CrossrefRateLimiter()
+    limiter.update({"X-Rate-Limit-Limit": "50", "X-Rate-Limit-Interval": "1s"})
+    assert limiter.delay == pytest.approx(0.02)
+    limiter.update({"X-Rate-Limit-Limit": "invalid", "X-Rate-Limit-Interval": "1s"})
+    assert limiter.delay == pytest.approx(0.02)
+
+    sleeps = []
+    monkeypatch.setattr(crossref.time, "monotonic", lambda: 10.0)
+    monkeypatch.setattr(crossref.time, "sleep", sleeps.append)
+    for _ in range(3):
+        limiter.wait()
+    assert sleeps == pytest.approx([0.02, 0.04])
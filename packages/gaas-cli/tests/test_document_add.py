@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def documents(tmp_path):
+    path = tmp_path / "documents.json"
+    path.write_text(json.dumps([{"id": i, "title": f"t{i}"} for i in range(250)]))
+    return path
+
+
+@pytest.mark.parametrize("compress", [None, "gzip", "deflate", "br"])
+def test_add_documents(meili, documents, compress):
+    options = ["--chunk-size", "100"]
+    if compress is not None:
+        if compress == "br":
+            pytest.importorskip("brotli")
+        options += ["--compress", compress]
+
+    result = meili("document", "add", "add", str(documents), *options)
+
+    assert result.exit_code == 0, result.output
+    assert "Enqueued 250 documents in 3 task(s)" in result.output
+
+
+def test_add_mixed_type_documents_with_schema(meili, tmp_path):
+    (tmp_path / "model.py").write_text(
+        "from pydantic import BaseModel\n\n"
+        "from gaas_cli.schema.utils import NaFloat\n\n\n"
+        "class Product(BaseModel):\n"
+        "    price: NaFloat\n"
+    )
+    path = tmp_path / "na.json"
+    path.write_text(
+        json.dumps([{"id": 1, "price": 1.5}, {"id": 2, "price": "na"}, {"id": 3}])
+    )
+
+    result = meili(
+        "document", "add", "add_schema", str(path), "--schema", "model.py:Product"
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Enqueued 3 documents" in result.output
+    assert "could not be coerced" not in result.output
@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from gaas_cli.schema import json_stream
+from gaas_cli.schema.json_stream import gen_json_values
+
+DOCUMENTS = [
+    {"id": 1, "title": "a, [b]", "price": 1234567.5},
+    {"id": 2, "title": 'é "quoted" \\n', "tags": ["x", "y"]},
+    {"id": 3, "nested": {"list": [1, 2, {"deep": None}]}},
+]
+
+
+@pytest.fixture(params=[3, 1 << 20], ids=["small-reads", "one-read"])
+def read_size(request, monkeypatch):
+    """Parse with reads of a few characters, so that values span several reads."""
+    monkeypatch.setattr(json_stream, "JSON_READ_SIZE", request.param)
+
+
+def parse(text: str) -> list:
+    return list(gen_json_values(io.StringIO(text)))
+
+
+def test_array(read_size):
+    assert parse(json.dumps(DOCUMENTS, indent=2)) == DOCUMENTS
+
+
+def test_ndjson(read_size):
+    text = "".join(json.dumps(document) + "\n" for document in DOCUMENTS)
+    assert parse(text) == DOCUMENTS
+
+
+def test_numbers_split_across_reads(read_size):
+    assert parse("[123456, 7.25e3]") == [123456, 7250.0]
+    assert parse("123456\n789") == [123456, 789]
+
+
+@pytest.mark.parametrize("text", ["", "  \n", "[]", " [ ] "])
+def test_empty_inputs(read_size, text):
+    assert parse(text) == []
+
+
+@pytest.mark.parametrize(
+    "text", ["[", "[{}", '[{"id": 1},', '[{"id": 1} {"id": 2}]', '[{"id": ]']
+)
+def test_invalid_arrays(read_size, text):
+    with pytest.raises(ValueError):
+        parse(text)
@@ -0,0 +1,101 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from gaas_cli.meili.document.loader import (
+    gen_csv_batches,
+    gen_json_batches,
+    gen_parquet_batches,
+    gen_parquet_ndjson_batches,
+)
+from gaas_cli.schema.arrow import (
+    documents_to_table,
+    gen_ndjson_record_batches,
+    gen_rebatched,
+    gen_unified_batches,
+    unify_schemas,
+)
+
+DOCUMENTS = [{"id": i, "title": f"t{i}", "price": i / 2} for i in range(10)]
+
+
+def test_rebatched_tables_have_exactly_the_batch_size():
+    batches = [
+        pa.record_batch({"id": pa.array(range(n), pa.int64())}) for n in [3, 1, 7, 0, 2]
+    ]
+    assert [table.num_rows for table in gen_rebatched(batches, 4)] == [4, 4, 4, 1]
+    tables = gen_rebatched(batches, 4)
+    assert sum((table["id"].to_pylist() for table in tables), []) == sum(
+        (batch["id"].to_pylist() for batch in batches), []
+    )
+
+
+def test_json_batches(tmp_path):
+    path = tmp_path / "documents.json"
+    path.write_text(json.dumps(DOCUMENTS))
+    batches = list(gen_json_batches(path, 4))
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert sum(batches, []) == DOCUMENTS
+
+
+def test_csv_batches(tmp_path):
+    path = tmp_path / "documents.csv"
+    path.write_text(
+        "id,title,price\n"
+        + "".join(f"{d['id']},{d['title']},{d['price']}\n" for d in DOCUMENTS)
+    )
+    batches = list(gen_csv_batches(path, 4, block_size=32))
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert sum(batches, []) == DOCUMENTS
+
+
+def test_parquet_batches(tmp_path):
+    path = tmp_path / "documents.parquet"
+    pq.write_table(pa.Table.from_pylist(DOCUMENTS), path)
+
+    batches = list(gen_parquet_batches(path, 4))
+    assert sum(batches, []) == DOCUMENTS
+
+    payloads = list(gen_parquet_ndjson_batches(path, 4))
+    assert [count for count, _ in payloads] == [4, 4, 2]
+    lines = b"".join(payload for _, payload in payloads).decode().splitlines()
+    assert [json.loads(line) for line in lines] == DOCUMENTS
+
+
+def test_documents_to_table_keeps_every_field():
+    table = documents_to_table([{"id": 1}, {"id": 2, "late": "x"}])
+    assert table.to_pylist() == [{"id": 1, "late": None}, {"id": 2, "late": "x"}]
+
+
+def test_unify_schemas_promotes_or_falls_back_to_strings():
+    schema = unify_schemas(
+        [
+            pa.schema({"a": pa.int64(), "b": pa.null(), "c": pa.float64()}),
+            pa.schema({"a": pa.float64(), "b": pa.string(), "c": pa.string()}),
+        ]
+    )
+    assert schema == pa.schema(
+        {"a": pa.float64(), "b": pa.string(), "c": pa.large_string()}
+    )
+
+
+def test_ndjson_blocks_keep_late_fields_and_type_changes(tmp_path):
+    path = tmp_path / "documents.ndjson"
+    first = "".join(json.dumps({"id": i, "value": i}) + "\n" for i in range(200))
+    rows = [{"id": i, "value": f"v{i}", "late": [i]} for i in range(200, 400)]
+    path.write_text(first + "".join(json.dumps(row) + "\n" for row in rows))
+
+    # The first block ends with the last line of numbers
+    block_size = len(first) - 1
+    batches = gen_unified_batches(gen_ndjson_record_batches(path, block_size))
+    table = pa.Table.from_batches(list(batches))
+
+    assert table.schema == pa.schema(
+        {"id": pa.int64(), "value": pa.large_string(), "late": pa.list_(pa.int64())}
+    )
+    assert table.num_rows == 400
+    assert table.slice(199, 2).to_pylist() == [
+        {"id": 199, "value": "199", "late": None},
+        {"id": 200, "value": "v200", "late": [200]},
+    ]
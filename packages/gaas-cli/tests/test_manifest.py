@@ -0,0 +1,76 @@
+import pytest
+
+from gaas_cli.meili.document import manifest
+from gaas_cli.meili.document.manifest import (
+    commit_manifest,
+    document_hash,
+    gen_changed_batches,
+    gen_removed_keys,
+    open_manifest,
+)
+
+
+def sync(path, batches, primary_key="id"):
+    """Run a sync with the manifest, returning the changed ids and removed keys."""
+    conn = open_manifest(path)
+    try:
+        changed = [
+            document[primary_key]
+            for batch in gen_changed_batches(conn, batches, primary_key)
+            for document in batch
+        ]
+        removed = sorted(gen_removed_keys(conn))
+        commit_manifest(conn)
+    finally:
+        conn.close()
+    return changed, removed
+
+
+def test_document_hash_ignores_key_order():
+    assert document_hash({"id": 1, "a": [1, 2]}) == document_hash(
+        {"a": [1, 2], "id": 1}
+    )
+    assert document_hash({"id": 1, "a": [1, 2]}) != document_hash(
+        {"id": 1, "a": [2, 1]}
+    )
+
+
+def test_changed_and_removed_documents(tmp_path):
+    path = tmp_path / "index.manifest.sqlite"
+    documents = [{"id": i, "title": f"t{i}"} for i in range(5)]
+    assert sync(path, [documents[:3], documents[3:]]) == ([0, 1, 2, 3, 4], [])
+    assert sync(path, [documents]) == ([], [])
+
+    documents[1] = {"id": 1, "title": "changed"}
+    documents.append({"id": 5, "title": "new"})
+    del documents[3]
+    assert sync(path, [documents]) == ([1, 5], ["3"])
+    assert sync(path, [documents]) == ([], [])
+
+
+def test_uncommitted_sync_leaves_the_manifest_unchanged(tmp_path):
+    path = tmp_path / "index.manifest.sqlite"
+    sync(path, [[{"id": 1, "title": "a"}]])
+
+    conn = open_manifest(path)
+    list(gen_changed_batches(conn, [[{"id": 1, "title": "b"}]], "id"))
+    conn.close()
+
+    assert sync(path, [[{"id": 1, "title": "b"}]]) == ([1], [])
+
+
+def test_document_without_primary_key(tmp_path):
+    conn = open_manifest(tmp_path / "index.manifest.sqlite")
+    with pytest.raises(ValueError, match="primary key 'id'"):
+        list(gen_changed_batches(conn, [[{"id": 1}, {"title": "a"}]], "id"))
+    conn.close()
+
+
+def test_batches_larger_than_the_sqlite_variable_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "SQLITE_MAX_VARIABLES", 7)
+    path = tmp_path / "index.manifest.sqlite"
+    documents = [{"id": i} for i in range(30)]
+    sync(path, [documents])
+
+    documents[20] = {"id": 20, "title": "changed"}
+    assert sync(path, [documents]) == ([20], [])
@@ -0,0 +1,52 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from gaas_cli.biblio.output import CSL_SCHEMA, csl_items_to_table, write_bulk_output
+from gaas_cli.biblio.state import BiblioOutputFormat
+
+ITEM = {
+    "id": "1/ITEM1",
+    "type": "article-journal",
+    "title": "Letters",
+    "author": [
+        {"family": "Gogh", "given": "Vincent", "non-dropping-particle": "van"},
+        {
+            "family": "King",
+            "given": "Martin Luther",
+            "suffix": "Jr.",
+            "comma-suffix": True,
+        },
+        {"family": "Fontaine", "given": "Jean", "dropping-particle": "de La"},
+    ],
+    "issued": {"date-parts": [[1888, 9]]},
+}
+
+
+def test_csl_names_keep_particles_and_suffixes():
+    (row,) = csl_items_to_table([ITEM]).to_pylist()
+    gogh, king, fontaine = row["author"]
+    assert gogh["non-dropping-particle"] == "van"
+    assert king["suffix"] == "Jr."
+    assert json.loads(king["extra"]) == {"comma-suffix": True}
+    assert fontaine["dropping-particle"] == "de La"
+    assert row["issued"] == "1888-09"
+    assert json.loads(row["extra"]) == {"issued": ITEM["issued"]}
+
+
+def test_merge_reads_files_written_with_fewer_name_parts(tmp_path):
+    path = tmp_path / "items.parquet"
+    name = pa.struct([("family", pa.string()), ("given", pa.string())])
+    previous = pa.table(
+        {"id": ["1/ITEM0"], "author": [[{"family": "Curie", "given": "Marie"}]]},
+        schema=pa.schema([("id", pa.string()), ("author", pa.list_(name))]),
+    )
+    pq.write_table(previous, path)
+
+    count = write_bulk_output(path, BiblioOutputFormat.parquet, [ITEM], set(), True)
+
+    table = pq.read_table(path)
+    assert count == 2
+    assert table.schema == CSL_SCHEMA
+    assert table["author"][0].as_py()[0]["family"] == "Curie"
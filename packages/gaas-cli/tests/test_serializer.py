@@ -0,0 +1,79 @@
+import datetime
+import json
+import math
+
+import pyarrow as pa
+
+from gaas_cli.meili.document.serializer import json_values, record_batch_to_ndjson
+
+
+def parse_lines(payload: bytes) -> list:
+    return [json.loads(line) for line in payload.decode().splitlines()]
+
+
+def test_flat_columns_match_json_dumps():
+    table = pa.table(
+        {
+            "id": pa.array([1, 2, None], pa.int64()),
+            "title": ["plain", 'é "quoted" \\ back\nslash\t', None],
+            "price": [1.5, math.nan, math.inf],
+            "available": [True, False, None],
+            "category": pa.array(["a", "b", "a"]).dictionary_encode(),
+            "empty": pa.nulls(3),
+        }
+    )
+
+    assert parse_lines(record_batch_to_ndjson(table)) == [
+        {
+            "id": 1,
+            "title": "plain",
+            "price": 1.5,
+            "available": True,
+            "category": "a",
+            "empty": None,
+        },
+        {
+            "id": 2,
+            "title": 'é "quoted" \\ back\nslash\t',
+            "price": None,
+            "available": False,
+            "category": "b",
+            "empty": None,
+        },
+        {
+            "id": None,
+            "title": None,
+            "price": None,
+            "available": None,
+            "category": "a",
+            "empty": None,
+        },
+    ]
+
+
+def test_control_characters_and_nested_columns_fall_back_to_json_dumps():
+    table = pa.table(
+        {
+            "text": ["bell\x07", "ok"],
+            "tags": [["x", "y"], None],
+            "point": [{"x": 1, "y": 2.5}, {"x": None, "y": None}],
+        }
+    )
+
+    assert parse_lines(record_batch_to_ndjson(table)) == table.to_pylist()
+
+
+def test_temporal_values_are_quoted():
+    values = pa.array([datetime.date(2024, 1, 31), None])
+    assert json_values(values).to_pylist() == ['"2024-01-31"', "null"]
+
+
+def test_sliced_batches_and_edge_sizes():
+    batch = pa.record_batch({"id": list(range(5)), "name": list("abcde")})
+
+    assert parse_lines(record_batch_to_ndjson(batch.slice(2, 2))) == [
+        {"id": 2, "name": "c"},
+        {"id": 3, "name": "d"},
+    ]
+    assert record_batch_to_ndjson(batch.slice(0, 0)) == b""
+    assert record_batch_to_ndjson(batch.select([])) == b"{}\n" * 5
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import pytest
+from meilisearch.errors import MeilisearchApiError
+
+from gaas_cli.meili.settings import (
+    apply_settings,
+    diff_settings,
+    get_current_settings,
+    load_settings_file,
+)
+
+CURRENT = {
+    "rankingRules": ["words", "typo", "proximity"],
+    "filterableAttributes": ["year", "author"],
+    "synonyms": {"car": ["automobile", "auto"]},
+    "typoTolerance": {
+        "enabled": True,
+        "minWordSizeForTypos": {"oneTypo": 5, "twoTypos": 9},
+        "disableOnWords": ["gaas", "cli"],
+        "disableOnAttributes": [],
+    },
+    "pagination": {"maxTotalHits": 1000},
+}
+
+
+def test_unordered_settings_compare_in_any_order():
+    desired = {
+        "filterableAttributes": ["author", "year"],
+        "synonyms": {"car": ["auto", "automobile"]},
+        "typoTolerance": {"disableOnWords": ["cli", "gaas"]},
+    }
+    assert diff_settings(desired, CURRENT) == {}
+
+
+def test_ordered_settings_are_replaced():
+    desired = {"rankingRules": ["typo", "words", "proximity"]}
+    assert diff_settings(desired, CURRENT) == desired
+
+
+def test_merged_settings_keep_only_the_changed_keys():
+    desired = {
+        "typoTolerance": {
+            "enabled": True,
+            "minWordSizeForTypos": {"oneTypo": 4},
+            "disableOnWords": ["gaas"],
+        },
+        "pagination": {"maxTotalHits": 1000},
+    }
+    assert diff_settings(desired, CURRENT) == {
+        "typoTolerance": {
+            "minWordSizeForTypos": {"oneTypo": 4},
+            "disableOnWords": ["gaas"],
+        }
+    }
+
+
+def test_settings_of_a_new_index_are_all_sent():
+    desired = {"filterableAttributes": ["year"], "pagination": {"maxTotalHits": 10}}
+    assert diff_settings(desired, {}) == desired
+
+
+class FakeIndex:
+    def __init__(self, settings=None):
+        self.settings = settings
+        self.updates = []
+
+    def get_settings(self):
+        if self.settings is None:
+            response = SimpleNamespace(
+                status_code=404,
+                text='{"message": "Index not found", "code": "index_not_found"}',
+            )
+            raise MeilisearchApiError("Index not found", response)
+        return self.settings
+
+    def update_settings(self, changes):
+        self.updates.append(changes)
+        return "task"
+
+
+def test_apply_settings_sends_nothing_when_up_to_date():
+    index = FakeIndex(CURRENT)
+    assert apply_settings(index, {"filterableAttributes": ["author", "year"]}) == (
+        {},
+        None,
+    )
+    assert index.updates == []
+
+
+def test_apply_settings_sends_the_changes_in_one_update():
+    index = FakeIndex(CURRENT)
+    desired = {
+        "filterableAttributes": ["year"],
+        "rankingRules": CURRENT["rankingRules"],
+    }
+    assert apply_settings(index, desired) == (
+        {"filterableAttributes": ["year"]},
+        "task",
+    )
+    assert index.updates == [{"filterableAttributes": ["year"]}]
+
+
+def test_current_settings_of_a_missing_index():
+    assert get_current_settings(FakeIndex()) == {}
+
+
+def test_settings_file_must_hold_an_object(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text("[]")
+    with pytest.raises(ValueError, match="JSON object"):
+        load_settings_file(path)
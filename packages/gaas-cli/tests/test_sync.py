@@ -0,0 +1,56 @@
+import json
+import sqlite3
+
+
+def write_documents(path, documents):
+    path.write_text(json.dumps(documents))
+
+
+def read_manifest(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT pk, hash FROM documents"))
+
+
+def test_sync_sends_only_changes(meili, tmp_path):
+    documents = tmp_path / "documents.json"
+    write_documents(documents, [{"id": i, "title": f"t{i}"} for i in range(4)])
+    result = meili("document", "sync", "sync_changes", str(documents))
+    assert result.exit_code == 0, result.output
+    assert "4 documents added or updated, 0 deleted, 0 unchanged" in result.output
+
+    write_documents(
+        documents,
+        [
+            {"id": 0, "title": "t0"},
+            {"id": 1, "title": "changed"},
+            {"id": 2, "title": "t2"},
+            {"id": 4, "title": "t4"},
+        ],
+    )
+    result = meili("document", "sync", "sync_changes", str(documents))
+    assert result.exit_code == 0, result.output
+    assert "2 documents added or updated, 1 deleted, 2 unchanged" in result.output
+    assert set(read_manifest(tmp_path / "sync_changes.manifest.sqlite")) == {
+        "0",
+        "1",
+        "2",
+        "4",
+    }
+
+    result = meili("document", "sync", "sync_changes", str(documents))
+    assert "0 documents added or updated, 0 deleted, 4 unchanged" in result.output
+
+
+def test_sync_without_primary_key_keeps_the_manifest(meili, tmp_path):
+    documents = tmp_path / "documents.json"
+    write_documents(documents, [{"id": 1, "title": "a"}])
+    assert meili("document", "sync", "sync_nopk", str(documents)).exit_code == 0
+    manifest = read_manifest(tmp_path / "sync_nopk.manifest.sqlite")
+
+    write_documents(documents, [{"id": 1, "title": "b"}, {"title": "no id"}])
+    result = meili("document", "sync", "sync_nopk", str(documents), "--chunk-size", "1")
+
+    assert result.exit_code == 1
+    assert "Document without primary key 'id'" in result.output
+    assert "Traceback" not in result.output
+    assert read_manifest(tmp_path / "sync_nopk.manifest.sqlite") == manifest
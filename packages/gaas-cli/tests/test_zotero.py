@@ -0,0 +1,51 @@
+from gaas_cli.biblio import zotero
+
+
+def crossref_record(doi):
+    return {
+        "message": {
+            "DOI": doi,
+            "type": "journal-article",
+            "title": [f"Title of {doi}"],
+            "author": [{"given": "Ada", "family": "Lovelace"}],
+            "resource": {"primary": {"URL": f"https://doi.org/{doi}"}},
+            "published": {"date-parts": [[2020, 5, 17]]},
+        }
+    }
+
+
+class FakeZotero:
+    """Zotero API refusing to create the items whose DOI ends with 'bad'."""
+
+    request = None
+
+    def __init__(self):
+        self.created = []
+
+    def item_template(self, itemtype):
+        return {"itemType": itemtype, "creators": []}
+
+    def check_items(self, items):
+        pass
+
+    def create_items(self, items):
+        response = {"successful": {}, "failed": {}}
+        for position, item in enumerate(items):
+            if item["DOI"].endswith("bad"):
+                response["failed"][str(position)] = {"code": 400, "message": "bad"}
+            else:
+                self.created.append(item)
+                response["successful"][str(position)] = {"data": item}
+        return response
+
+
+def test_crossref_to_zotero_counts_failed_items(monkeypatch):
+    zot = FakeZotero()
+    monkeypatch.setattr(zotero, "thread_local_zotero", lambda *args: lambda: zot)
+    records = [crossref_record(doi) for doi in ["10.1/a", "10.1/bad", "10.1/b"]]
+
+    created, failed = zotero.crossref_to_zotero(records, "key", "1", "COLL")
+
+    assert (created, failed) == (2, 1)
+    assert [item["DOI"] for item in zot.created] == ["10.1/a", "10.1/b"]
+    assert all(item["collections"] == ["COLL"] for item in zot.created)